@@ -0,0 +1,102 @@
+"""
+Plugin cold start: import time and RSS of the plugin's modules, and the
+latency of the first API request with and without a prewarmed connection.
+
+Every import measurement runs in a fresh interpreter; the median of
+``--runs`` is reported. The first-request comparison uses the mock Ark
+server, so it shows the TCP connect share only; against the real API the
+DNS lookup and TLS handshake add considerably more.
+
+Usage: ``python -m benchmarks.bench_cold_start --runs 5``
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+
+from benchmarks.mock_ark import MockArkServer
+
+# dify_plugin 自身已导入 httpx 与 requests，先导入 httpx 只改变顺序，不改变总量
+SCENARIOS = (
+    ("dify_plugin", ["httpx", "dify_plugin"]),
+    (
+        "plugin (provider + tools)",
+        [
+            "httpx",
+            "dify_plugin",
+            "provider.doubao_provider",
+            "tools.text2image",
+            "tools.text2video",
+            "tools.image2video",
+            "tools.video_task_status",
+        ],
+    ),
+    ("openai (no longer imported)", ["openai"]),
+)
+
+_MEASURE = """
+import json, resource, sys, time
+start = time.perf_counter()
+for name in sys.argv[1:]:
+    __import__(name)
+print(json.dumps({
+    "seconds": time.perf_counter() - start,
+    "rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+}))
+"""
+
+
+def _measure_imports(modules, runs: int):
+    seconds, rss = [], []
+    for _ in range(runs):
+        completed = subprocess.run(
+            [sys.executable, "-c", _MEASURE, *modules], capture_output=True, text=True
+        )
+        if completed.returncode != 0:
+            return None
+        result = json.loads(completed.stdout.strip().splitlines()[-1])
+        seconds.append(result["seconds"])
+        rss.append(result["rss_kb"])
+    return statistics.median(seconds), statistics.median(rss) / 1024
+
+
+def _first_request(server: MockArkServer, warm: bool) -> float:
+    from tools.doubao_app import DoubaoApp, configure_session, prewarm
+    from tools.rate_limiter import RateLimiter
+    from tools.video_task import TASKS_PATH
+
+    # 每次使用新的连接池，模拟刚启动的进程
+    configure_session()
+    if warm:
+        prewarm(server.base_url)
+    client = DoubaoApp(api_key="mock", base_url=server.base_url, rate_limiter=RateLimiter({}))
+    start = time.perf_counter()
+    client.request("GET", TASKS_PATH, params={"page_size": 1})
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'imports':<30}{'seconds':>9}{'peak MB':>9}")
+    for name, modules in SCENARIOS:
+        result = _measure_imports(modules, args.runs)
+        if result is None:
+            print(f"{name:<30}{'failed':>9}")
+            continue
+        print(f"{name:<30}{result[0]:>9.3f}{result[1]:>9.1f}")
+
+    with MockArkServer() as server:
+        print(f"\n{'first request':<30}{'ms':>9}")
+        for name, warm in (("cold connection", False), ("prewarmed", True)):
+            elapsed = statistics.median(_first_request(server, warm) for _ in range(args.runs))
+            print(f"{name:<30}{elapsed * 1000:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Tail latency of image generation with and without hedged requests.
+
+The mock server answers most generations after ``--latency`` seconds and a
+fraction ``--slow-rate`` after ``--slow-latency`` seconds. Each mode starts
+with a fresh latency history, so its first ``--min-samples`` requests are
+never hedged. Reported: p50, p99 and max latency, the extra load hedging
+added and how often the hedge won.
+
+Usage: ``python -m benchmarks.bench_hedging --requests 300 --threads 4``
+"""
+
+import argparse
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.mock_ark import MockArkServer
+from tools.doubao_app import DoubaoApp
+from tools.hedging import HedgeBudget, Hedger
+from tools.rate_limiter import RateLimiter
+
+
+def _percentile(values, fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=0.1)
+    parser.add_argument("--slow-rate", type=float, default=0.05)
+    parser.add_argument("--slow-latency", type=float, default=2.0)
+    parser.add_argument("--percentile", type=float, default=0.9)
+    parser.add_argument("--budget", type=float, default=0.1)
+    parser.add_argument("--min-samples", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'mode':<10}{'p50 s':>8}{'p99 s':>8}{'max s':>8}{'extra %':>9}{'hedge won':>11}")
+    for hedge in (False, True):
+        server = MockArkServer(
+            latency=args.latency, slow_rate=args.slow_rate, slow_latency=args.slow_latency, seed=0
+        )
+        with server:
+            hedger = Hedger(
+                percentile=args.percentile,
+                budget=HedgeBudget(args.budget),
+                min_samples=args.min_samples,
+            )
+            client = DoubaoApp(
+                api_key="bench", base_url=server.base_url, rate_limiter=RateLimiter({}), hedger=hedger
+            )
+
+            def call(i):
+                start = time.perf_counter()
+                client.generate_image(f"bench {i}", coalesce=False, hedge=hedge)
+                return time.perf_counter() - start
+
+            with ThreadPoolExecutor(max_workers=args.threads) as executor:
+                latencies = list(executor.map(call, range(args.requests)))
+            # 等待被丢弃的慢请求结束，计入服务端请求数
+            time.sleep(args.slow_latency)
+            won = hedger.stats()["hedge_won"]
+            extra = (server.request_count - args.requests) / args.requests * 100
+            print(
+                f"{'hedged' if hedge else 'plain':<10}{_percentile(latencies, 0.5):>8.2f}"
+                f"{_percentile(latencies, 0.99):>8.2f}{max(latencies):>8.2f}{extra:>9.1f}{won:>11}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Compare bare ``requests.post`` against the pooled DoubaoApp session.
+
+Usage: ``python -m benchmarks.bench_http_pool --requests 500 --threads 8``
+"""
+
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from benchmarks.mock_ark import MockArkServer
+from tools.doubao_app import DoubaoApp
+from tools.rate_limiter import RateLimiter
+
+PAYLOAD = {"model": "mock", "prompt": "benchmark", "n": 1}
+
+
+def _run(call, total: int, threads: int) -> float:
+    start = time.perf_counter()
+    if threads <= 1:
+        for _ in range(total):
+            call()
+    else:
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            list(executor.map(lambda _: call(), range(total)))
+    return total / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--threads", type=int, default=1)
+    args = parser.parse_args()
+
+    with MockArkServer() as server:
+        url = f"{server.base_url}/images/generations"
+        headers = {"Authorization": "Bearer mock", "Content-Type": "application/json"}
+
+        def bare():
+            requests.post(url, headers=headers, json=PAYLOAD).raise_for_status()
+
+        # 不限速，只测量客户端本身的开销
+        client = DoubaoApp(
+            api_key="mock", base_url=server.base_url, rate_limiter=RateLimiter({})
+        )
+
+        def pooled():
+            client.request("POST", "/images/generations", json=PAYLOAD).raise_for_status()
+
+        results = []
+        for name, call in (("requests.post", bare), ("DoubaoApp pooled", pooled)):
+            server.reset_counters()
+            rps = _run(call, args.requests, args.threads)
+            results.append((name, rps, server.connection_count))
+
+    print(f"{'client':<20}{'req/s':>12}{'connections':>14}")
+    for name, rps, connections in results:
+        print(f"{name:<20}{rps:>12.1f}{connections:>14}")
+    print(f"speedup: {results[1][1] / results[0][1]:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Bytes on the wire and end-to-end upload latency with and without the
+image2video preprocessing stage.
+
+Synthetic phone-sized photos are uploaded to the mock Ark server over a
+simulated uplink. Requires Pillow.
+
+Usage: ``python -m benchmarks.bench_image_preprocess --bandwidth-mbps 20``
+"""
+
+import argparse
+import io
+import time
+
+from benchmarks.mock_ark import MockArkServer
+from tools.doubao_app import DoubaoApp
+from tools.rate_limiter import RateLimiter
+from tools.image_preprocess import ImagePreprocessor, sniff_mime
+from tools.streaming_body import IMAGE_PLACEHOLDER, Base64JSONBody
+
+PAYLOAD = {
+    "model": "doubao-seedance-1-0-lite-i2v-250428",
+    "content": [
+        {"type": "text", "text": "benchmark --ratio adaptive --duration 5"},
+        {"type": "image_url", "image_url": {"url": IMAGE_PLACEHOLDER}},
+    ],
+}
+
+
+def _photo(width: int, height: int, fmt: str) -> bytes:
+    from PIL import Image
+
+    # 渐变叠加噪声，压缩特性接近真实照片
+    gradient = Image.linear_gradient("L").resize((width, height))
+    noise = Image.effect_noise((width, height), 40)
+    image = Image.merge("RGB", (gradient, noise, gradient.rotate(90).resize((width, height))))
+    output = io.BytesIO()
+    image.save(output, format=fmt, quality=95)
+    return output.getvalue()
+
+
+def _upload(client: DoubaoApp, data: bytes, mime_type: str):
+    body = Base64JSONBody(PAYLOAD, data, mime_type=mime_type)
+    client.request("POST", "/contents/generations/tasks", data=body).raise_for_status()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--bandwidth-mbps", type=float, default=20.0)
+    args = parser.parse_args()
+
+    samples = [
+        ("4032x3024 JPEG", _photo(4032, 3024, "JPEG")),
+        ("3024x4032 PNG", _photo(3024, 4032, "PNG")),
+        ("1280x720 JPEG", _photo(1280, 720, "JPEG")),
+    ]
+    bandwidth = args.bandwidth_mbps * 1e6 / 8
+
+    with MockArkServer(upload_bandwidth=bandwidth) as server:
+        # 不限速，只测量客户端本身的开销
+        client = DoubaoApp(
+            api_key="mock", base_url=server.base_url, rate_limiter=RateLimiter({})
+        )
+        print(
+            f"{'image':<16}{'before KB':>11}{'after KB':>10}"
+            f"{'before s':>10}{'after s':>9}{'cached s':>10}"
+        )
+        for name, data in samples:
+            server.reset_counters()
+            start = time.perf_counter()
+            _upload(client, data, sniff_mime(data))
+            before_time = time.perf_counter() - start
+            before_bytes = server.bytes_received
+
+            preprocessor = ImagePreprocessor()
+            server.reset_counters()
+            start = time.perf_counter()
+            image = preprocessor.process(data)
+            _upload(client, image.data, image.mime_type)
+            after_time = time.perf_counter() - start
+            after_bytes = server.bytes_received
+
+            start = time.perf_counter()
+            image = preprocessor.process(data)
+            _upload(client, image.data, image.mime_type)
+            cached_time = time.perf_counter() - start
+
+            print(
+                f"{name:<16}{before_bytes / 1024:>11.0f}{after_bytes / 1024:>10.0f}"
+                f"{before_time:>10.2f}{after_time:>9.2f}{cached_time:>10.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
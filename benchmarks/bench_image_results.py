@@ -0,0 +1,72 @@
+"""
+Compare the two text2image result paths: b64_json vs URL + binary download.
+
+Reports bytes sent by the mock server, client-side decode time and total
+time per image for a 1792x1024 image. Requires Pillow to build the sample.
+
+Usage: ``python -m benchmarks.bench_image_results --images 20``
+"""
+
+import argparse
+import base64
+import io
+import time
+
+from benchmarks.mock_ark import MockArkServer
+from tools.doubao_app import DoubaoApp
+from tools.rate_limiter import RateLimiter
+
+
+def _sample_image() -> bytes:
+    from PIL import Image
+
+    width, height = 1792, 1024
+    gradient = Image.linear_gradient("L").resize((width, height))
+    noise = Image.effect_noise((width, height), 30)
+    image = Image.merge("RGB", (gradient, noise, gradient.transpose(Image.FLIP_LEFT_RIGHT)))
+    output = io.BytesIO()
+    image.save(output, format="PNG")
+    return output.getvalue()
+
+
+def _b64(client: DoubaoApp) -> float:
+    result = client.generate_image("benchmark", response_format="b64_json")
+    start = time.perf_counter()
+    base64.b64decode(result["b64_json"])
+    return time.perf_counter() - start
+
+
+def _url(client: DoubaoApp) -> float:
+    result = client.generate_image("benchmark", response_format="url")
+    client.download_image(result["url"])
+    return 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--images", type=int, default=20)
+    args = parser.parse_args()
+
+    image = _sample_image()
+    print(f"sample image: {len(image) / 1024:.0f} KB")
+    with MockArkServer(image=image) as server:
+        # 不限速，只测量客户端本身的开销
+        client = DoubaoApp(
+            api_key="mock", base_url=server.base_url, rate_limiter=RateLimiter({})
+        )
+        print(f"{'mode':<10}{'KB/image':>10}{'decode ms':>11}{'total ms':>10}")
+        for name, run in (("b64_json", _b64), ("url", _url)):
+            server.reset_counters()
+            decode = 0.0
+            start = time.perf_counter()
+            for _ in range(args.images):
+                decode += run(client)
+            total = time.perf_counter() - start
+            print(
+                f"{name:<10}{server.bytes_sent / args.images / 1024:>10.0f}"
+                f"{decode / args.images * 1000:>11.2f}{total / args.images * 1000:>10.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
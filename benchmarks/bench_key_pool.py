@@ -0,0 +1,91 @@
+"""
+Spread requests over several API keys and endpoints with the key pool.
+
+Two mock Ark servers stand in for two endpoints; each admits
+``--server-qps`` requests per second and API key, and the client-side rate
+limit is set to the same quota. Image jobs are run with one key, with two
+keys through the pool, and with two keys on both endpoints while the second
+endpoint answers every request with a 500, which shows the circuit breaker
+moving traffic away from it. A final run creates video tasks through the
+pool and waits for them; the mock only shows a task to the key and
+endpoint that created it, so every poll must be pinned correctly.
+
+Usage: ``python -m benchmarks.bench_key_pool --jobs 60 --threads 8``
+"""
+
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.mock_ark import MockArkServer
+from tools.doubao_app import DoubaoApp
+from tools.key_pool import KeyPool
+from tools.rate_limiter import ENDPOINT_IMAGES, ENDPOINT_TASK_CREATE, ENDPOINT_TASK_POLL, RateLimiter
+
+T2V_MODEL = "doubao-seedance-1-0-lite-t2v-250428"
+KEYS = ["bench-1", "bench-2"]
+
+
+def _run(client: DoubaoApp, job, jobs: int, threads: int):
+    def timed(i):
+        try:
+            return job(client, i)
+        except Exception:
+            return False
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        failures = sum(not ok for ok in executor.map(timed, range(jobs)))
+    return failures, time.perf_counter() - start
+
+
+def _image_job(client: DoubaoApp, i: int) -> bool:
+    return "url" in client.generate_image(f"bench {i}", coalesce=False)
+
+
+def _video_job(client: DoubaoApp, i: int) -> bool:
+    content = [{"type": "text", "text": f"bench {i}"}]
+    task_id = client.create_video_task(T2V_MODEL, content, dedup=False)
+    return client.wait_task(task_id, T2V_MODEL, deadline=30).succeeded
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--jobs", type=int, default=60)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--server-qps", type=float, default=10.0)
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds per image generation")
+    args = parser.parse_args()
+
+    print(
+        f"{'scenario':<26}{'failed':>8}{'jobs/s':>9}"
+        f"{'req A':>7}{'req B':>7}{'429':>6}{'500':>6}"
+    )
+    scenarios = (
+        ("one key", _image_job, KEYS[:1], False, 0.0),
+        ("two keys", _image_job, KEYS, False, 0.0),
+        ("two keys, B failing", _image_job, KEYS, True, 1.0),
+        ("two keys, video tasks", _video_job, KEYS, True, 0.0),
+    )
+    rates = {ENDPOINT_IMAGES: args.server_qps, ENDPOINT_TASK_CREATE: args.server_qps, ENDPOINT_TASK_POLL: 0}
+    for name, job, keys, both_endpoints, failure_rate in scenarios:
+        options = dict(rate_limit=args.server_qps, latency=args.latency, task_duration=0.5, seed=0)
+        with MockArkServer(**options) as a, MockArkServer(failure_rate=failure_rate, **options) as b:
+            urls = [a.base_url, b.base_url] if both_endpoints else [a.base_url]
+            # 每个场景使用新的密钥池与限流器，状态不在场景之间延续
+            client = DoubaoApp(
+                api_key=keys,
+                key_pool=KeyPool(keys, urls),
+                rate_limiter=RateLimiter(rates),
+                journal=None,
+            )
+            failures, elapsed = _run(client, job, args.jobs, args.threads)
+            print(
+                f"{name:<26}{failures:>8}{args.jobs / elapsed:>9.2f}"
+                f"{a.request_count:>7}{b.request_count:>7}"
+                f"{a.throttled_count + b.throttled_count:>6}{a.failed_count + b.failed_count:>6}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Peak memory of a burst of b64_json image generations with and without the
+payload memory budget.
+
+Every job does what Text2ImageTool does for one b64_json image: charge the
+estimated footprint, generate, decode the image and hold it briefly while
+the blob message is sent. Without a budget all jobs hold their payloads at
+once; with one, jobs beyond the budget queue. The mock server runs in the
+same process, so its response encoding is part of the traced peak as well.
+Reported: wall time, peak traced memory, the most bytes charged at once and
+the deepest queue.
+
+Usage: ``python -m benchmarks.bench_memory_budget --jobs 32 --threads 32 --budget-images 4``
+"""
+
+import argparse
+import base64
+import os
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.mock_ark import MockArkServer
+from tools.doubao_app import DoubaoApp
+from tools.memory_budget import GENERATED_BYTES_PER_PIXEL, MemoryBudget, generated_image_footprint, parse_size
+from tools.rate_limiter import RateLimiter
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--jobs", type=int, default=32)
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--size", default="2048x2048")
+    parser.add_argument("--budget-images", type=float, default=4.0, help="budget in b64_json image footprints")
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--hold", type=float, default=0.05, help="seconds each decoded image is kept")
+    args = parser.parse_args()
+
+    width, height = parse_size(args.size)
+    # 模拟图片大小与预算的估算一致
+    image = os.urandom(int(width * height * GENERATED_BYTES_PER_PIXEL))
+    footprint = generated_image_footprint(args.size, "b64_json")
+
+    print(f"{'mode':<10}{'wall s':>8}{'peak MB':>9}{'charged MB':>12}{'queue':>7}")
+    with MockArkServer(image=image, latency=args.latency) as server:
+        client = DoubaoApp(api_key="bench", base_url=server.base_url, rate_limiter=RateLimiter({}))
+        for name, capacity in (("none", 0), ("budget", int(footprint * args.budget_images))):
+            budget = MemoryBudget(capacity)
+            peak = {"charged": 0, "queue": 0}
+            lock = threading.Lock()
+
+            def job(i):
+                with budget.reserve(footprint):
+                    with lock:
+                        peak["charged"] = max(peak["charged"], budget.in_use)
+                        peak["queue"] = max(peak["queue"], budget.queued)
+                    response = client.generate_image(
+                        f"bench {i}", size=args.size, response_format="b64_json", coalesce=False
+                    )
+                    data = base64.b64decode(response["b64_json"])
+                    del response
+                    time.sleep(args.hold)
+                    return len(data)
+
+            tracemalloc.start()
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=args.threads) as executor:
+                list(executor.map(job, range(args.jobs)))
+            elapsed = time.perf_counter() - start
+            traced = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            print(
+                f"{name:<10}{elapsed:>8.2f}{traced / 1024 / 1024:>9.1f}"
+                f"{peak['charged'] / 1024 / 1024:>12.1f}{peak['queue']:>7}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+"""
+Fire the same image request from many threads at once and count how many
+reach the server with and without single-flight coalescing.
+
+Usage: ``python -m benchmarks.bench_single_flight --threads 8 --latency 0.5``
+"""
+
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.mock_ark import MockArkServer
+from tools.doubao_app import DoubaoApp, coalescing_stats
+from tools.rate_limiter import RateLimiter
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0.5)
+    args = parser.parse_args()
+
+    with MockArkServer(latency=args.latency) as server:
+        client = DoubaoApp(
+            api_key="mock", base_url=server.base_url, rate_limiter=RateLimiter({})
+        )
+        print(f"{'mode':<14}{'requests':>10}{'elapsed s':>11}")
+        for name, coalesce in (("independent", False), ("single-flight", True)):
+            server.reset_counters()
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=args.threads) as executor:
+                results = list(
+                    executor.map(
+                        lambda _: client.generate_image("same asset", coalesce=coalesce),
+                        range(args.threads),
+                    )
+                )
+            elapsed = time.perf_counter() - start
+            assert all("url" in result for result in results)
+            print(f"{name:<14}{server.request_count:>10}{elapsed:>11.2f}")
+        print(f"coalescing stats: {coalescing_stats()['images']}")
+
+
+if __name__ == "__main__":
+    main()
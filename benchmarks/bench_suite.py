@@ -0,0 +1,233 @@
+"""
+End-to-end benchmark of the client and the three tools against the mock
+Ark server, at several concurrency levels.
+
+Each target and concurrency level runs in a fresh subprocess pointed at the
+mock server through DOUBAO_BASE_URL, so peak RSS covers only that run and
+the server's own memory is not counted. Reported per run: throughput, p50
+and p99 job latency, peak RSS, and HTTP requests per job (API calls,
+retries and image downloads).
+
+Targets:
+    app_image    DoubaoApp.generate_image plus the image download
+    app_video    DoubaoApp.create_video_task plus wait_task
+    text2image   Text2ImageTool.invoke (needs dify_plugin)
+    text2video   Text2VideoTool.invoke (needs dify_plugin)
+    image2video  Image2VideoTool.invoke with a local 1280x720 JPEG (needs dify_plugin)
+
+The client-side rate limits are lifted unless ``--rate-limited`` is given,
+and the task journal is disabled so every job creates its own task. Note
+that importing dify_plugin applies gevent's monkey patching, so in the tool
+targets the worker threads are greenlets, as in the plugin runtime.
+
+Usage: ``python -m benchmarks.bench_suite --targets app_image text2image
+--concurrency 1 4 16 --jobs 32 --latency 0.2 --failure-rate 0.05``
+"""
+
+import argparse
+import io
+import json
+import math
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List
+
+from benchmarks.mock_ark import MockArkServer
+
+TARGETS = ("app_image", "app_video", "text2image", "text2video", "image2video")
+API_KEY = "bench"
+T2V_MODEL = "doubao-seedance-1-0-lite-t2v-250428"
+
+
+def _percentile(values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+
+def _sample_image() -> str:
+    from PIL import Image
+
+    buffer = io.BytesIO()
+    Image.new("RGB", (1280, 720), (90, 140, 200)).save(buffer, "JPEG", quality=90)
+    fd, path = tempfile.mkstemp(suffix=".jpg")
+    with os.fdopen(fd, "wb") as f:
+        f.write(buffer.getvalue())
+    return path
+
+
+def _tool_job(tool_class: Any, parameters: Callable[[int], Dict[str, Any]]) -> Callable[[int], bool]:
+    from dify_plugin.entities.tool import ToolInvokeMessage
+
+    MessageType = ToolInvokeMessage.MessageType
+    tool = tool_class.from_credentials({"api_key": API_KEY})
+
+    def job(i: int) -> bool:
+        # 成功的调用会返回图片（blob 或链接）或带 url 的 JSON 结果
+        succeeded = False
+        for message in tool.invoke(tool_parameters=parameters(i)):
+            if message.type in (MessageType.BLOB, MessageType.IMAGE_LINK):
+                succeeded = True
+            elif message.type == MessageType.JSON and "url" in message.message.json_object:
+                succeeded = True
+        return succeeded
+
+    return job
+
+
+def _make_job(target: str) -> Callable[[int], bool]:
+    """Build the job for a target; jobs use distinct prompts so none coalesce"""
+    if target in ("app_image", "app_video"):
+        from tools.doubao_app import DoubaoApp
+
+        client = DoubaoApp(api_key=API_KEY)
+        if target == "app_image":
+            def job(i: int) -> bool:
+                result = client.generate_image(f"bench {i}")
+                if "url" not in result:
+                    return False
+                client.download_image(result["url"])
+                return True
+        else:
+            def job(i: int) -> bool:
+                content = [{"type": "text", "text": f"bench {i}"}]
+                task_id = client.create_video_task(T2V_MODEL, content)
+                return client.wait_task(task_id, T2V_MODEL).succeeded
+        return job
+
+    if target == "text2image":
+        from tools.text2image import Text2ImageTool
+
+        return _tool_job(Text2ImageTool, lambda i: {"prompt": f"bench {i}"})
+    if target == "text2video":
+        from tools.text2video import Text2VideoTool
+
+        return _tool_job(Text2VideoTool, lambda i: {"prompt": f"bench {i}"})
+
+    from tools.image2video import Image2VideoTool
+
+    image_path = _sample_image()
+    return _tool_job(Image2VideoTool, lambda i: {"prompt": f"bench {i}", "image": image_path})
+
+
+def _worker(target: str, concurrency: int, jobs: int):
+    """Run the jobs in this process and print the results as one JSON line"""
+    job = _make_job(target)
+    latencies: List[float] = []
+    failures = 0
+
+    def timed(i: int):
+        start = time.perf_counter()
+        try:
+            succeeded = job(i)
+        except Exception:
+            succeeded = False
+        return time.perf_counter() - start, succeeded
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for elapsed, succeeded in executor.map(timed, range(jobs)):
+            latencies.append(elapsed)
+            failures += not succeeded
+    elapsed = time.perf_counter() - start
+    print(
+        json.dumps(
+            {
+                "elapsed": elapsed,
+                "latencies": latencies,
+                "failures": failures,
+                # Linux 下单位为 KB
+                "peak_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+            }
+        )
+    )
+
+
+def _run(server: MockArkServer, target: str, concurrency: int, jobs: int, rate_limited: bool) -> Dict[str, Any]:
+    env = dict(os.environ, DOUBAO_BASE_URL=server.base_url, DOUBAO_TASK_JOURNAL="")
+    if not rate_limited:
+        env.update(DOUBAO_IMAGE_QPS="0", DOUBAO_TASK_CREATE_QPS="0", DOUBAO_POLL_QPS="0")
+    server.reset_counters()
+    completed = subprocess.run(
+        [
+            sys.executable, "-m", "benchmarks.bench_suite",
+            "--worker", target, "--concurrency", str(concurrency), "--jobs", str(jobs),
+        ],
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(completed.stderr.strip().splitlines()[-1] if completed.stderr else target)
+    result = json.loads(completed.stdout.strip().splitlines()[-1])
+    result.update(
+        requests=server.request_count,
+        throttled=server.throttled_count,
+        server_errors=server.failed_count,
+    )
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--targets", nargs="+", choices=TARGETS, default=list(TARGETS))
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--jobs", type=int, default=16, help="jobs per target and concurrency level")
+    parser.add_argument("--latency", type=float, default=0.2, help="seconds per image generation")
+    parser.add_argument("--request-latency", type=float, default=0.0)
+    parser.add_argument("--task-duration", type=float, default=1.0)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--task-failure-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="server-side requests per second")
+    parser.add_argument("--burst-every", type=float, default=0.0)
+    parser.add_argument("--burst-length", type=float, default=1.0)
+    parser.add_argument("--rate-limited", action="store_true", help="keep the client-side rate limits")
+    parser.add_argument("--worker", choices=TARGETS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        _worker(args.worker, args.concurrency[0], args.jobs)
+        return
+
+    server = MockArkServer(
+        task_duration=args.task_duration,
+        rate_limit=args.rate_limit,
+        latency=args.latency,
+        request_latency=args.request_latency,
+        failure_rate=args.failure_rate,
+        task_failure_rate=args.task_failure_rate,
+        burst_every=args.burst_every,
+        burst_length=args.burst_length,
+        seed=0,
+    )
+    with server:
+        print(
+            f"{'target':<13}{'conc':>5}{'jobs':>6}{'failed':>8}{'jobs/s':>9}"
+            f"{'p50 s':>8}{'p99 s':>8}{'peak MB':>9}{'req/job':>9}{'429':>6}{'500':>6}"
+        )
+        for target in args.targets:
+            for concurrency in args.concurrency:
+                try:
+                    result = _run(server, target, concurrency, args.jobs, args.rate_limited)
+                except RuntimeError as e:
+                    print(f"{target:<13}{concurrency:>5}  skipped: {e}")
+                    continue
+                latencies = result["latencies"]
+                print(
+                    f"{target:<13}{concurrency:>5}{args.jobs:>6}{result['failures']:>8}"
+                    f"{args.jobs / result['elapsed']:>9.2f}"
+                    f"{_percentile(latencies, 0.5):>8.2f}{_percentile(latencies, 0.99):>8.2f}"
+                    f"{result['peak_rss_kb'] / 1024:>9.1f}{result['requests'] / args.jobs:>9.2f}"
+                    f"{result['throttled']:>6}{result['server_errors']:>6}"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Simulate fixed 5 s polling against the adaptive TaskPoller.
+
+Uses a virtual clock, so it runs instantly. Reports the mean number of GET
+requests per task and how long after the real finish time the result was seen.
+
+Usage: ``python -m benchmarks.bench_task_poller --tasks 200``
+"""
+
+import argparse
+import random
+import statistics
+
+from tools.task_poller import TaskPoller
+
+
+class _VirtualClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float):
+        self.now += seconds
+
+
+def _fixed(duration: float):
+    polls, waited = 0, 0.0
+    while polls < 60:
+        waited += 5
+        polls += 1
+        if waited >= duration:
+            return polls, waited - duration
+    return polls, None
+
+
+def _adaptive(duration: float, model: str):
+    clock = _VirtualClock()
+    poller = TaskPoller(model, deadline=600, sleep=clock.sleep, clock=clock)
+    for _ in poller:
+        poller.observe("succeeded" if clock.now >= duration else "running")
+    if poller.status != "succeeded":
+        return poller.polls, None
+    return poller.polls, clock.now - duration
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tasks", type=int, default=200)
+    parser.add_argument("--mean-duration", type=float, default=60.0)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    durations = [
+        max(3.0, rng.gauss(args.mean_duration, args.mean_duration / 4))
+        for _ in range(args.tasks)
+    ]
+    model = f"bench-{rng.random()}"
+    print(f"{'strategy':<10}{'GETs/task':>12}{'mean lag s':>12}{'p99 lag s':>12}{'timeouts':>10}")
+    for name, run in (("fixed 5s", _fixed), ("adaptive", lambda d: _adaptive(d, model))):
+        results = [run(d) for d in durations]
+        lags = sorted(lag for _, lag in results if lag is not None)
+        timeouts = sum(1 for _, lag in results if lag is None)
+        p99 = lags[int(len(lags) * 0.99) - 1] if lags else 0.0
+        print(
+            f"{name:<10}{statistics.mean(p for p, _ in results):>12.1f}"
+            f"{statistics.mean(lags):>12.2f}{p99:>12.2f}{timeouts:>10}"
+        )
+
+
+if __name__ == "__main__":
+    main()
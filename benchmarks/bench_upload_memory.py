@@ -0,0 +1,99 @@
+"""
+Peak memory of an image2video task upload: in-memory base64 vs streaming body.
+
+The mock Ark server runs in a subprocess so its own buffers are not counted.
+Peak memory is measured with tracemalloc on top of the raw image bytes.
+
+Usage: ``python -m benchmarks.bench_upload_memory --sizes 5 10 20``
+"""
+
+import argparse
+import base64
+import os
+import socket
+import subprocess
+import sys
+import time
+import tracemalloc
+
+from tools.doubao_app import DoubaoApp
+from tools.streaming_body import IMAGE_PLACEHOLDER, Base64JSONBody
+
+TASKS_PATH = "/contents/generations/tasks"
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _start_server(port: int) -> subprocess.Popen:
+    process = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.mock_ark", "--port", str(port)],
+        stdout=subprocess.DEVNULL,
+    )
+    for _ in range(100):
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.1).close()
+            return process
+        except OSError:
+            time.sleep(0.05)
+    process.kill()
+    raise RuntimeError("mock server did not start")
+
+
+def _payload(url: str):
+    return {
+        "model": "doubao-seedance-1-0-lite-i2v-250428",
+        "content": [
+            {"type": "text", "text": "benchmark --ratio adaptive --duration 5"},
+            {"type": "image_url", "image_url": {"url": url}},
+        ],
+    }
+
+
+def _in_memory(client: DoubaoApp, image: bytes):
+    encoded = base64.b64encode(image).decode("utf-8")
+    data_url = f"data:image/jpeg;base64,{encoded}"
+    client.request("POST", TASKS_PATH, json=_payload(data_url)).raise_for_status()
+
+
+def _streaming(client: DoubaoApp, image: bytes):
+    body = Base64JSONBody(_payload(IMAGE_PLACEHOLDER), image)
+    client.request("POST", TASKS_PATH, data=body).raise_for_status()
+
+
+def _peak(call, client: DoubaoApp, image: bytes) -> int:
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+        call(client, image)
+        return tracemalloc.get_traced_memory()[1] - baseline
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[5, 10, 20], help="image sizes in MB")
+    args = parser.parse_args()
+
+    port = _free_port()
+    server = _start_server(port)
+    try:
+        client = DoubaoApp(api_key="mock", base_url=f"http://127.0.0.1:{port}/api/v3")
+        print(f"{'image MB':>9}{'in-memory MB':>15}{'streaming MB':>15}{'ratio':>8}")
+        for size in args.sizes:
+            image = os.urandom(size * 1024 * 1024)
+            old = _peak(_in_memory, client, image)
+            new = _peak(_streaming, client, image)
+            print(f"{size:>9}{old / 2**20:>15.2f}{new / 2**20:>15.2f}{old / max(new, 1):>8.1f}x")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    main()
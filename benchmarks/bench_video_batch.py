@@ -0,0 +1,89 @@
+"""
+Animate one image with several prompts: one call per variant versus one
+batch.
+
+"sequential" is what repeated Image2VideoTool calls did: every variant
+encodes and uploads the image again, then waits for its own task before the
+next one starts. "batch" is DoubaoApp.run_video_tasks: the image is encoded
+once, the tasks are submitted concurrently and waited on together. Reported:
+wall time, process CPU time, peak traced memory and time to the first
+finished video. The mock server runs in the same process, so CPU time and
+memory include its request parsing; concurrent uploads raise the batch's
+peak mostly on the server side.
+
+Usage: ``python -m benchmarks.bench_video_batch --variants 6 --image-mb 4``
+"""
+
+import argparse
+import os
+import time
+import tracemalloc
+
+from benchmarks.mock_ark import MockArkServer
+from tools.doubao_app import DoubaoApp
+from tools.rate_limiter import RateLimiter
+from tools.streaming_body import IMAGE_PLACEHOLDER
+
+MODEL = "doubao-seedance-1-0-lite-i2v-250428"
+
+
+def _contents(count: int, run: str):
+    # 每轮使用不同的提示词，避免复用上一轮的任务
+    return [
+        [
+            {"type": "text", "text": f"{run} variant {i} --duration {5 if i % 2 else 10}"},
+            {"type": "image_url", "image_url": {"url": IMAGE_PLACEHOLDER}},
+        ]
+        for i in range(count)
+    ]
+
+
+def _sequential(client: DoubaoApp, image: bytes, contents, deadline: float):
+    first = None
+    start = time.perf_counter()
+    for content in contents:
+        task_id = client.create_video_task(MODEL, content, image=image)
+        client.wait_task(task_id, MODEL, deadline)
+        if first is None:
+            first = time.perf_counter() - start
+    return first
+
+
+def _batch(client: DoubaoApp, image: bytes, contents, deadline: float):
+    first = None
+    start = time.perf_counter()
+    for event in client.run_video_tasks(MODEL, contents, image=image, deadline=deadline):
+        if event["event"] == "finished" and first is None:
+            first = time.perf_counter() - start
+    return first
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--variants", type=int, default=6)
+    parser.add_argument("--image-mb", type=float, default=4.0)
+    parser.add_argument("--task-duration", type=float, default=1.0)
+    args = parser.parse_args()
+
+    image = os.urandom(int(args.image_mb * 1024 * 1024))
+    print(f"{'mode':<12}{'wall s':>8}{'cpu s':>8}{'peak MB':>9}{'first s':>9}{'upload MB':>11}")
+    with MockArkServer(task_duration=args.task_duration) as server:
+        client = DoubaoApp(
+            api_key="bench", base_url=server.base_url, rate_limiter=RateLimiter({}), journal=None
+        )
+        for name, run in (("sequential", _sequential), ("batch", _batch)):
+            server.reset_counters()
+            tracemalloc.start()
+            wall, cpu = time.perf_counter(), time.process_time()
+            first = run(client, image, _contents(args.variants, name), args.task_duration * 10 + 30)
+            wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            print(
+                f"{name:<12}{wall:>8.2f}{cpu:>8.2f}{peak / 1024 / 1024:>9.1f}"
+                f"{first:>9.2f}{server.bytes_received / 1024 / 1024:>11.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
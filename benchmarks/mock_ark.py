@@ -0,0 +1,472 @@
+"""
+A tiny local stand-in for the Ark endpoints used by the plugin.
+
+Run it standalone with ``python -m benchmarks.mock_ark --port 8765`` or start
+it in-process with ``MockArkServer().start()``.
+"""
+
+import argparse
+import base64
+import itertools
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+API_PREFIX = "/api/v3"
+IMAGE_PATH = "/files/mock-image"
+VIDEO_PREFIX = "/files/videos/"
+
+# 默认返回的“图片”：PNG 文件头加随机内容
+DEFAULT_IMAGE = b"\x89PNG\r\n\x1a\n" + bytes(range(256)) * 64
+# 默认返回的“视频”：MP4 ftyp 头加 1MB 内容
+DEFAULT_VIDEO = b"\x00\x00\x00\x18ftypmp42" + bytes(range(256)) * 4096
+
+
+class _Handler(BaseHTTPRequestHandler):
+    # HTTP/1.1 以便客户端复用连接
+    protocol_version = "HTTP/1.1"
+    # 响应头和响应体分两次写出，关闭 Nagle 避免 40ms 延迟确认
+    disable_nagle_algorithm = True
+    server: "MockArkServer"
+
+    def setup(self):
+        super().setup()
+        self.server.record_connection()
+
+    def log_message(self, format, *args):  # noqa: A002 - 保持父类签名
+        pass
+
+    def _owner(self) -> str:
+        # 与方舟一致：任务只对创建它的 API Key 可见
+        return self.headers.get("Authorization", "")
+
+    def _read_body(self) -> Dict[str, Any]:
+        length = int(self.headers.get("Content-Length") or 0)
+        bandwidth = self.server.upload_bandwidth
+        if not bandwidth:
+            raw = self.rfile.read(length) if length else b""
+        else:
+            # 按给定带宽分块读取，模拟较慢的上行链路
+            chunks, remaining = [], length
+            chunk_size = max(1, int(bandwidth / 20))
+            while remaining > 0:
+                chunk = self.rfile.read(min(chunk_size, remaining))
+                if not chunk:
+                    break
+                chunks.append(chunk)
+                remaining -= len(chunk)
+                time.sleep(len(chunk) / bandwidth)
+            raw = b"".join(chunks)
+        self.server.record_bytes(len(raw))
+        return json.loads(raw) if raw else {}
+
+    def _send_bytes(self, status: int, body: bytes, content_type: str):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        self.server.record_bytes_sent(len(body))
+
+    def _send_json(self, status: int, payload: Dict[str, Any]):
+        self._send_bytes(status, json.dumps(payload).encode("utf-8"), "application/json")
+
+    def _send_video(self):
+        """Serve the task video, honoring single "bytes=N-" ranges"""
+        self.server.record_video_request()
+        video = self.server.video
+        start = 0
+        match = self.headers.get("Range", "")
+        if match.startswith("bytes=") and match.endswith("-"):
+            start = min(int(match[len("bytes="):-1]), len(video))
+        body = memoryview(video)[start:]
+        self.send_response(206 if start else 200)
+        self.send_header("Content-Type", "video/mp4")
+        self.send_header("Accept-Ranges", "bytes")
+        if start:
+            self.send_header("Content-Range", f"bytes {start}-{len(video) - 1}/{len(video)}")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        cut = self.server.take_video_cut()
+        if cut and len(body) > cut:
+            # 模拟传输中断：只写出部分内容后关闭连接
+            self.wfile.write(body[:cut])
+            self.wfile.flush()
+            self.close_connection = True
+            self.connection.shutdown(2)
+            return
+        self.wfile.write(body)
+        self.server.record_bytes_sent(len(body))
+
+    def _throttled(self) -> bool:
+        """
+        Answer 429 when the server-side rate limit is exceeded or a burst is
+        active, and 500 for injected failures
+        """
+        if self.server.request_latency:
+            time.sleep(self.server.request_latency)
+        retry_after = self.server.admit(self._owner())
+        if retry_after is not None:
+            self.send_response(429)
+            self.send_header("Retry-After", f"{retry_after:.3f}")
+            self.send_header("Content-Type", "application/json")
+            body = json.dumps({"error": {"code": "RateLimitExceeded"}}).encode("utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return True
+        if self.server.inject_failure():
+            self._send_json(500, {"error": {"code": "InternalServiceError"}})
+            return True
+        return False
+
+    def do_POST(self):
+        self.server.record_request(self)
+        body = self._read_body()
+        if self._throttled():
+            return
+        if self.path == f"{API_PREFIX}/images/generations":
+            latency = self.server.image_latency()
+            if latency:
+                time.sleep(latency)
+            if body.get("response_format") == "b64_json":
+                item = {"b64_json": base64.b64encode(self.server.image).decode("ascii")}
+            else:
+                item = {"url": f"{self.server.origin}{IMAGE_PATH}"}
+            self._send_json(200, {"data": [item]})
+        elif self.path == f"{API_PREFIX}/contents/generations/tasks":
+            task_id = self.server.create_task(body.get("model", ""), self._owner())
+            self._send_json(200, {"id": task_id})
+        else:
+            self._send_json(404, {"error": {"message": "not found"}})
+
+    def do_GET(self):
+        self.server.record_request(self)
+        url = urlsplit(self.path)
+        if url.path.startswith(API_PREFIX) and self._throttled():
+            return
+        prefix = f"{API_PREFIX}/contents/generations/tasks/"
+        if url.path == IMAGE_PATH:
+            self._send_bytes(200, self.server.image, "image/png")
+        elif url.path.startswith(VIDEO_PREFIX):
+            self._send_video()
+        elif url.path == f"{API_PREFIX}/contents/generations/tasks":
+            query = parse_qs(url.query)
+            items = [
+                task
+                for task in (
+                    self.server.get_task(task_id, self._owner())
+                    for task_id in query.get("filter.task_ids", [])
+                )
+                if task is not None
+            ]
+            self._send_json(200, {"items": items, "total": len(items)})
+        elif self.path.startswith(prefix):
+            task = self.server.get_task(self.path[len(prefix):], self._owner())
+            if task is None:
+                self._send_json(404, {"error": {"message": "task not found"}})
+            else:
+                self._send_json(200, task)
+        else:
+            self._send_json(404, {"error": {"message": "not found"}})
+
+
+    def do_HEAD(self):
+        # 与网关一致：未知路径返回 404，连接保持可复用
+        self.server.record_request(self)
+        self.send_response(404)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_DELETE(self):
+        self.server.record_request(self)
+        prefix = f"{API_PREFIX}/contents/generations/tasks/"
+        if self._throttled():
+            return
+        if self.path.startswith(prefix) and self.server.cancel_task(
+            self.path[len(prefix):], self._owner()
+        ):
+            self._send_json(200, {})
+        else:
+            self._send_json(404, {"error": {"message": "task not found"}})
+
+
+class MockArkServer(ThreadingHTTPServer):
+    """
+    Threaded HTTP server that mimics the Ark image and video task endpoints.
+
+    Args:
+        port: Port to listen on (0 picks a free port)
+        task_duration: Seconds a video task stays "running" before it finishes
+        upload_bandwidth: Simulated request body bandwidth in bytes/s (0 = unlimited)
+        image: Bytes returned for generated images, as URL download or b64_json
+        rate_limit: API requests admitted per second and API key before answering 429
+            with Retry-After (0 = unlimited)
+        latency: Seconds each image generation takes
+        slow_rate: Fraction of image generations that take ``slow_latency``
+            instead, to model a long latency tail
+        slow_latency: Seconds a slow image generation takes
+        request_latency: Seconds added to every API request
+        failure_rate: Fraction of API requests answered with 500
+        task_failure_rate: Fraction of video tasks that end as "failed"
+        burst_every: Start a 429 burst every this many seconds (0 = never)
+        burst_length: Seconds each burst answers every API request with 429
+        seed: Seed for the injected failures, so runs are repeatable
+        video: Bytes served for finished task videos
+        video_cuts: Number of video transfers to break off midway, to
+            exercise resumed downloads
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        port: int = 0,
+        task_duration: float = 0.0,
+        upload_bandwidth: float = 0.0,
+        image: bytes = DEFAULT_IMAGE,
+        rate_limit: float = 0.0,
+        latency: float = 0.0,
+        slow_rate: float = 0.0,
+        slow_latency: float = 0.0,
+        request_latency: float = 0.0,
+        failure_rate: float = 0.0,
+        task_failure_rate: float = 0.0,
+        burst_every: float = 0.0,
+        burst_length: float = 1.0,
+        seed: Optional[int] = None,
+        video: bytes = DEFAULT_VIDEO,
+        video_cuts: int = 0,
+    ):
+        super().__init__(("127.0.0.1", port), _Handler)
+        self.video = video
+        self.video_cuts = video_cuts
+        self.video_request_count = 0
+        self.latency = latency
+        self.slow_rate = slow_rate
+        self.slow_latency = slow_latency
+        self.slow_count = 0
+        self.request_latency = request_latency
+        self.failure_rate = failure_rate
+        self.task_failure_rate = task_failure_rate
+        self.burst_every = burst_every
+        self.burst_length = burst_length
+        self.failed_count = 0
+        self._random = random.Random(seed)
+        self._started = time.monotonic()
+        self.rate_limit = rate_limit
+        self.throttled_count = 0
+        # API Key -> (剩余额度, 更新时间)，与方舟一样按密钥限流
+        self._allowances: Dict[str, Tuple[float, float]] = {}
+        self.task_duration = task_duration
+        self.upload_bandwidth = upload_bandwidth
+        self.image = image
+        self.request_count = 0
+        self.connection_count = 0
+        self.bytes_received = 0
+        self.bytes_sent = 0
+        self._tasks: Dict[str, Dict[str, Any]] = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def origin(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    @property
+    def base_url(self) -> str:
+        return f"{self.origin}{API_PREFIX}"
+
+    def record_connection(self):
+        with self._lock:
+            self.connection_count += 1
+
+    def record_bytes(self, count: int):
+        with self._lock:
+            self.bytes_received += count
+
+    def record_bytes_sent(self, count: int):
+        with self._lock:
+            self.bytes_sent += count
+
+    def record_request(self, handler: BaseHTTPRequestHandler):
+        with self._lock:
+            self.request_count += 1
+
+    def admit(self, owner: str = "") -> Optional[float]:
+        """Take one request from the key's rate limit; returns Retry-After if refused"""
+        if self.burst_every:
+            # 每个周期末尾的 burst_length 秒内全部限流
+            into_period = (time.monotonic() - self._started) % self.burst_every
+            if into_period >= self.burst_every - self.burst_length:
+                with self._lock:
+                    self.throttled_count += 1
+                return self.burst_every - into_period
+        if not self.rate_limit:
+            return None
+        with self._lock:
+            now = time.monotonic()
+            allowance, updated_at = self._allowances.get(owner, (max(1.0, self.rate_limit), now))
+            allowance = min(
+                max(1.0, self.rate_limit), allowance + (now - updated_at) * self.rate_limit
+            )
+            if allowance >= 1:
+                self._allowances[owner] = (allowance - 1, now)
+                return None
+            self._allowances[owner] = (allowance, now)
+            self.throttled_count += 1
+            return (1 - allowance) / self.rate_limit
+
+    def image_latency(self) -> float:
+        """Seconds the next image generation takes"""
+        if not self.slow_rate:
+            return self.latency
+        with self._lock:
+            if self._random.random() >= self.slow_rate:
+                return self.latency
+            self.slow_count += 1
+        return self.slow_latency
+
+    def record_video_request(self):
+        with self._lock:
+            self.video_request_count += 1
+
+    def take_video_cut(self) -> int:
+        """Bytes after which to break the current video transfer, or 0"""
+        with self._lock:
+            if not self.video_cuts:
+                return 0
+            self.video_cuts -= 1
+            return len(self.video) // 3
+
+    def inject_failure(self) -> bool:
+        """Whether this request should fail with a 500"""
+        if not self.failure_rate:
+            return False
+        with self._lock:
+            if self._random.random() >= self.failure_rate:
+                return False
+            self.failed_count += 1
+            return True
+
+    def reset_counters(self):
+        with self._lock:
+            self.throttled_count = 0
+            self.failed_count = 0
+            self.slow_count = 0
+            self.video_request_count = 0
+            self.request_count = 0
+            self.connection_count = 0
+            self.bytes_received = 0
+            self.bytes_sent = 0
+
+    def create_task(self, model: str, owner: str = "") -> str:
+        # 带上端口，多个模拟服务的任务ID不会重复
+        task_id = f"cgt-mock-{self.server_port}-{next(self._ids)}"
+        with self._lock:
+            failed = self._random.random() < self.task_failure_rate
+            self._tasks[task_id] = {
+                "owner": owner,
+                "model": model,
+                "created": time.monotonic(),
+                "created_at": time.time(),
+                "failed": failed,
+            }
+        return task_id
+
+    def get_task(self, task_id: str, owner: str = "") -> Optional[Dict[str, Any]]:
+        with self._lock:
+            task = self._tasks.get(task_id)
+        if task is None or task["owner"] != owner:
+            return None
+        # 与 Ark 一样返回创建与更新时间（Unix 秒）；这里保留小数，便于毫秒级的模拟任务
+        payload = {
+            "id": task_id,
+            "model": task["model"],
+            "status": "running",
+            "created_at": task["created_at"],
+            "updated_at": time.time(),
+        }
+        if task.get("canceled"):
+            payload["status"] = "canceled"
+        elif time.monotonic() - task["created"] < self.task_duration:
+            pass
+        elif task["failed"]:
+            payload["status"] = "failed"
+            payload["updated_at"] = task["created_at"] + self.task_duration
+            payload["error"] = {"code": "MockFailure", "message": "injected task failure"}
+        else:
+            payload["status"] = "succeeded"
+            payload["updated_at"] = task["created_at"] + self.task_duration
+            payload["content"] = {"video_url": f"{self.origin}{VIDEO_PREFIX}{task_id}.mp4"}
+        return payload
+
+    def cancel_task(self, task_id: str, owner: str = "") -> bool:
+        with self._lock:
+            task = self._tasks.get(task_id)
+            if task is None or task["owner"] != owner:
+                return False
+            task["canceled"] = True
+            return True
+
+    def start(self) -> "MockArkServer":
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self) -> "MockArkServer":
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local mock Ark server")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--task-duration", type=float, default=10.0)
+    parser.add_argument("--rate-limit", type=float, default=0.0)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--slow-rate", type=float, default=0.0)
+    parser.add_argument("--slow-latency", type=float, default=0.0)
+    parser.add_argument("--request-latency", type=float, default=0.0)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--task-failure-rate", type=float, default=0.0)
+    parser.add_argument("--burst-every", type=float, default=0.0)
+    parser.add_argument("--burst-length", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+    server = MockArkServer(
+        port=args.port,
+        task_duration=args.task_duration,
+        rate_limit=args.rate_limit,
+        latency=args.latency,
+        slow_rate=args.slow_rate,
+        slow_latency=args.slow_latency,
+        request_latency=args.request_latency,
+        failure_rate=args.failure_rate,
+        task_failure_rate=args.task_failure_rate,
+        burst_every=args.burst_every,
+        burst_length=args.burst_length,
+        seed=args.seed,
+    )
+    print(f"Mock Ark server listening on {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
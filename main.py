@@ -1,6 +1,10 @@
 from dify_plugin import Plugin, DifyPluginEnv
 
+from tools.doubao_app import prewarm_in_background
+
 plugin = Plugin(DifyPluginEnv(MAX_REQUEST_TIMEOUT=120))
 
 if __name__ == '__main__':
+    # 后台预先建立到方舟的连接（DNS、TCP、TLS），首个工具调用无需等待握手
+    prewarm_in_background()
     plugin.run()
@@ -1,30 +1,18 @@
 from typing import Any
 from dify_plugin.errors.tool import ToolProviderCredentialValidationError
-from tools.text2image import Text2ImageTool
-from tools.text2video import Text2VideoTool
-from tools.image2video import Image2VideoTool
+from tools.doubao_app import DoubaoApp
 from dify_plugin import ToolProvider
 
 
 class DoubaoProvider(ToolProvider):
     def _validate_credentials(self, credentials: dict[str, Any]) -> None:
+        api_key = credentials.get("api_key")
+        if not api_key:
+            raise ToolProviderCredentialValidationError("API Key is required")
         try:
-            # Create a simple test prompt for validation
-            test_params = {
-                "prompt": "测试图像",
-                "size": "512x512"
-            }
-            
-            # Try to invoke the tool with test parameters
-            for _ in Text2ImageTool.from_credentials(credentials).invoke(
-                tool_parameters=test_params
-            ):
-                pass
-                
-            # Validation is successful if no exception is raised
-            # Note: We only validate with Text2ImageTool to avoid unnecessary video generation
-            # All tools use the same API key and endpoint, so they should work if Text2ImageTool works
-            # This includes Text2VideoTool and Image2VideoTool
+            # 查询任务列表只需鉴权，不生成内容也不消耗额度；
+            # 所有工具使用同一组 API Key 与接口地址，逐个验证一次即可
+            DoubaoApp(api_key=api_key).validate_credentials()
         except Exception as e:
             # If any error occurs during validation, raise it as credential validation error
             raise ToolProviderCredentialValidationError(f"Credential validation failed: {str(e)}")
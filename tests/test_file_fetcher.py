@@ -0,0 +1,55 @@
+"""
+ImageFetcher URL cache against the local mock Ark server.
+"""
+
+import os
+
+import pytest
+
+from benchmarks.mock_ark import DEFAULT_IMAGE, IMAGE_PATH, MockArkServer
+from tools.file_fetcher import ImageFetcher
+
+
+@pytest.fixture
+def server():
+    with MockArkServer(seed=0) as server:
+        yield server
+
+
+def _files(cache_dir, suffix):
+    return [name for name in os.listdir(cache_dir) if name.endswith(suffix)]
+
+
+def test_download_is_stored_and_reused(server, tmp_path):
+    fetcher = ImageFetcher(cache_dir=str(tmp_path))
+    url = f"{server.origin}{IMAGE_PATH}"
+
+    first = fetcher.fetch_url(url)
+    assert first.data == DEFAULT_IMAGE
+    assert not first.cached
+    assert len(_files(tmp_path, ".bin")) == 1
+    assert not _files(tmp_path, ".part")
+
+    again = fetcher.fetch_url(url)
+    assert again.data == DEFAULT_IMAGE
+    assert again.cached
+    assert server.request_count == 1
+
+
+def test_index_files_count_towards_the_budget(server, tmp_path):
+    # 只够存放一张图片和少量索引
+    fetcher = ImageFetcher(cache_dir=str(tmp_path), cache_bytes=len(DEFAULT_IMAGE) + 2048)
+    for i in range(30):
+        assert fetcher.fetch_url(f"{server.origin}{IMAGE_PATH}?v={i}").data == DEFAULT_IMAGE
+
+    assert len(_files(tmp_path, ".bin")) == 1
+    assert 0 < len(_files(tmp_path, ".url.json")) < 30
+
+
+def test_index_of_an_evicted_image_is_removed(server, tmp_path):
+    fetcher = ImageFetcher(cache_dir=str(tmp_path))
+    fetcher._save_meta("orphan", {"sha256": "0" * 64, "checked_at": 0})
+
+    fetcher.fetch_url(f"{server.origin}{IMAGE_PATH}")
+    assert "orphan.url.json" not in os.listdir(tmp_path)
+    assert len(_files(tmp_path, ".url.json")) == 1
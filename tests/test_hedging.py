@@ -0,0 +1,72 @@
+"""
+Hedger timing and sampling, with in-process fake requests.
+"""
+
+import threading
+import time
+
+import requests
+
+from tools.hedging import HedgeBudget, Hedger
+
+KEY = ("model", "1024x1024")
+
+
+def _response(status_code: int = 200) -> requests.Response:
+    response = requests.Response()
+    response.status_code = status_code
+    return response
+
+
+def _hedger(**kwargs) -> Hedger:
+    kwargs.setdefault("budget", HedgeBudget(ratio=1.0))
+    kwargs.setdefault("min_samples", 5)
+    hedger = Hedger(**kwargs)
+    for _ in range(5):
+        hedger.histogram(KEY).observe(0.05)
+    return hedger
+
+
+def test_slow_request_is_hedged():
+    hedger = _hedger()
+    calls = []
+
+    def send():
+        calls.append(time.monotonic())
+        time.sleep(0.5 if len(calls) == 1 else 0.0)
+        return _response(), None
+
+    response, won = hedger.run(KEY, send)
+
+    assert response.status_code == 200
+    assert won
+    assert len(calls) == 2
+
+
+def test_retried_requests_are_not_sampled():
+    hedger = _hedger(min_samples=100)
+
+    hedger.run(KEY, lambda: (_response(), None))
+    hedger.observe(KEY, _response(), None)
+    assert hedger.histogram(KEY).count == 5
+
+    hedger.run(KEY, lambda: (_response(), 0.05))
+    hedger.observe(KEY, _response(), 0.05)
+    assert hedger.histogram(KEY).count == 7
+
+
+def test_no_hedge_while_every_worker_is_busy():
+    hedger = _hedger(max_workers=1)
+    calls = []
+
+    def send():
+        calls.append(threading.current_thread().name)
+        time.sleep(0.3)
+        return _response(), None
+
+    response, won = hedger.run(KEY, send)
+
+    assert not won
+    assert len(calls) == 1
+    assert hedger.stats()["no_worker"] == 1
+
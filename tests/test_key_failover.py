@@ -0,0 +1,54 @@
+"""
+Failover between pooled endpoints when one cannot be reached.
+"""
+
+import socket
+
+import pytest
+import requests
+
+from benchmarks.mock_ark import MockArkServer
+from tools.doubao_app import DoubaoApp
+from tools.key_pool import KeyPool
+from tools.rate_limiter import RateLimiter
+
+
+def _closed_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def server():
+    with MockArkServer(seed=0) as server:
+        yield server
+
+
+def _client(base_urls) -> DoubaoApp:
+    return DoubaoApp(
+        api_key="test-key",
+        journal=None,
+        cache=None,
+        rate_limiter=RateLimiter({}),
+        key_pool=KeyPool(["test-key"], base_urls),
+    )
+
+
+def test_connect_error_fails_over_to_another_endpoint(server):
+    dead = f"http://127.0.0.1:{_closed_port()}/api/v3"
+    client = _client([dead, server.base_url])
+
+    for i in range(6):
+        result = client.generate_image(f"failover {i}", coalesce=False, hedge=False)
+        assert "error" not in result
+
+    assert server.request_count == 6
+
+
+def test_connect_error_is_raised_when_no_endpoint_is_reachable():
+    dead = f"http://127.0.0.1:{_closed_port()}/api/v3"
+    client = _client([dead])
+
+    with pytest.raises(requests.ConnectionError):
+        client.request("GET", "/contents/generations/tasks")
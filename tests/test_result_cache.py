@@ -0,0 +1,65 @@
+"""
+Seeded image results cached by DoubaoApp, against the local mock Ark server.
+"""
+
+import pytest
+
+from benchmarks.mock_ark import MockArkServer
+from tools.doubao_app import DoubaoApp
+from tools.metrics import Metrics
+from tools.rate_limiter import RateLimiter
+from tools.result_cache import ResultCache
+
+
+@pytest.fixture
+def server():
+    with MockArkServer(seed=0) as server:
+        yield server
+
+
+@pytest.fixture
+def metrics(monkeypatch):
+    metrics = Metrics("prometheus")
+    monkeypatch.setattr("tools.result_cache.get_metrics", lambda: metrics)
+    return metrics
+
+
+def _client(server: MockArkServer, api_key: str, cache: ResultCache) -> DoubaoApp:
+    return DoubaoApp(
+        api_key=api_key,
+        base_url=server.base_url,
+        cache=cache,
+        journal=None,
+        rate_limiter=RateLimiter({}),
+    )
+
+
+def _counter(metrics: Metrics, result: str) -> float:
+    for counter in metrics.snapshot()["counters"]:
+        if counter["name"] == "doubao_result_cache_requests_total" and counter["labels"] == {"result": result}:
+            return counter["value"]
+    return 0.0
+
+
+def test_seeded_result_is_served_from_cache(server, metrics):
+    client = _client(server, "owner-key", ResultCache())
+
+    first = client.generate_image("a red fox", seed=7)
+    requests_sent = server.request_count
+    second = client.generate_image("a red fox", seed=7)
+
+    assert second == first
+    assert server.request_count == requests_sent
+    assert _counter(metrics, "miss") == 1
+    assert _counter(metrics, "hit") == 1
+
+
+def test_cached_result_is_private_to_its_account(server, metrics):
+    cache = ResultCache()
+    _client(server, "owner-key", cache).generate_image("a red fox", seed=7)
+    requests_sent = server.request_count
+
+    _client(server, "other-key", cache).generate_image("a red fox", seed=7)
+
+    assert server.request_count == requests_sent + 1
+    assert _counter(metrics, "hit") == 0
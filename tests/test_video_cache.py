@@ -0,0 +1,64 @@
+"""
+VideoCache against the local mock Ark server.
+"""
+
+import time
+
+import pytest
+
+from benchmarks.mock_ark import DEFAULT_VIDEO, MockArkServer
+from tools.doubao_app import DoubaoApp
+from tools.rate_limiter import RateLimiter
+from tools.video_cache import VideoCache
+
+MODEL = "doubao-seedance-1-0-lite-t2v-250428"
+TASK_DURATION = 0.2
+
+
+def _client(server: MockArkServer, api_key: str) -> DoubaoApp:
+    return DoubaoApp(
+        api_key=api_key, base_url=server.base_url, journal=None, rate_limiter=RateLimiter({})
+    )
+
+
+@pytest.fixture
+def server():
+    with MockArkServer(task_duration=TASK_DURATION, seed=0) as server:
+        yield server
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return VideoCache(cache_dir=str(tmp_path))
+
+
+def _finished_task(client: DoubaoApp):
+    task_id = client.create_video_task(MODEL, [{"type": "text", "text": "cache"}])
+    time.sleep(TASK_DURATION + 0.1)
+    task = client.get_task(task_id)
+    assert task.succeeded
+    return task
+
+
+def test_fetch_downloads_once(server, cache):
+    client = _client(server, "owner-key")
+    task = _finished_task(client)
+
+    video = cache.fetch(client.account, task.id, task.video_url)
+    assert video.read() == DEFAULT_VIDEO
+    assert not video.cached
+
+    again = cache.fetch(client.account, task.id, task.video_url)
+    assert again.cached
+    assert again.sha256 == video.sha256
+    assert server.video_request_count == 1
+
+
+def test_cached_video_is_private_to_its_account(server, cache):
+    owner = _client(server, "owner-key")
+    other = _client(server, "other-key")
+    task = _finished_task(owner)
+    cache.fetch(owner.account, task.id, task.video_url)
+
+    assert cache.get(owner.account, task.id) is not None
+    assert cache.get(other.account, task.id) is None
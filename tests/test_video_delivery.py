@@ -0,0 +1,117 @@
+"""
+VideoDelivery output modes against the local mock Ark server.
+"""
+
+import time
+
+import pytest
+
+from benchmarks.mock_ark import DEFAULT_VIDEO, MockArkServer
+from tools.doubao_app import DoubaoApp
+from tools.memory_budget import MemoryBudget
+from tools.metrics import get_metrics
+from tools.rate_limiter import RateLimiter
+from tools.video_cache import VideoCache
+from tools.video_delivery import VideoDelivery
+
+MODEL = "doubao-seedance-1-0-lite-t2v-250428"
+TASK_DURATION = 0.2
+
+
+class FakeTool:
+    """Records messages as (kind, value) pairs instead of building them"""
+
+    def create_text_message(self, text):
+        return ("text", text)
+
+    def create_json_message(self, data):
+        return ("json", data)
+
+    def create_blob_message(self, blob, meta=None):
+        return ("blob", blob)
+
+
+@pytest.fixture
+def server():
+    with MockArkServer(task_duration=TASK_DURATION, seed=0) as server:
+        yield server
+
+
+@pytest.fixture
+def client(server):
+    return DoubaoApp(
+        api_key="test-key", base_url=server.base_url, journal=None, rate_limiter=RateLimiter({})
+    )
+
+
+@pytest.fixture(autouse=True)
+def video_cache(tmp_path, monkeypatch):
+    cache = VideoCache(cache_dir=str(tmp_path))
+    monkeypatch.setattr("tools.video_delivery.get_default_video_cache", lambda: cache)
+    return cache
+
+
+@pytest.fixture
+def task(client):
+    task_id = client.create_video_task(MODEL, [{"type": "text", "text": "deliver"}])
+    time.sleep(TASK_DURATION + 0.1)
+    return client.get_task(task_id)
+
+
+def _emit(client, task, video_output, **kwargs):
+    delivery = VideoDelivery(FakeTool(), client, video_output, get_metrics().trace("test"), **kwargs)
+    return list(delivery.emit(task.id, task.video_url, task.model))
+
+
+def test_url_returns_the_link(client, task):
+    messages = _emit(client, task, "url")
+
+    assert [kind for kind, _ in messages] == ["text", "json"]
+    assert messages[-1][1] == {
+        "task_id": task.id,
+        "status": "succeeded",
+        "type": "video",
+        "model": task.model,
+        "url": task.video_url,
+    }
+
+
+def test_local_returns_the_cached_path(client, task):
+    messages = _emit(client, task, "local")
+
+    payload = messages[-1][1]
+    assert payload["url"] == task.video_url
+    assert payload["size"] == len(DEFAULT_VIDEO)
+    with open(payload["path"], "rb") as f:
+        assert f.read() == DEFAULT_VIDEO
+
+
+def test_blob_returns_the_video_and_releases_its_memory(client, task):
+    admission = MemoryBudget(capacity=4 * len(DEFAULT_VIDEO)).reservation()
+
+    messages = _emit(client, task, "blob", admission=admission)
+
+    assert messages == [("blob", DEFAULT_VIDEO)]
+    assert admission.budget.in_use == 0
+
+
+def test_blob_without_memory_falls_back_to_the_local_path(client, task):
+    budget = MemoryBudget(capacity=2 * len(DEFAULT_VIDEO), timeout=0.1)
+    held = budget.reserve(2 * len(DEFAULT_VIDEO))
+
+    with held:
+        messages = _emit(client, task, "blob", admission=budget.reservation())
+
+    assert "改为返回本地缓存路径" in messages[0][1]
+    assert messages[-1][0] == "json"
+    assert "path" in messages[-1][1]
+
+
+def test_failed_download_falls_back_to_the_link(client, task, server):
+    server.video = b""
+
+    messages = _emit(client, task, "blob")
+
+    assert "改为返回视频链接" in messages[0][1]
+    assert messages[-1][1]["url"] == task.video_url
+    assert "path" not in messages[-1][1]
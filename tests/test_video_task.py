@@ -0,0 +1,209 @@
+"""
+Video task API of DoubaoApp against the local mock Ark server.
+
+The mock keeps tasks "running" for ``task_duration`` seconds, then reports
+them succeeded (or failed, with ``task_failure_rate``); tasks are only
+visible to the API key that created them.
+"""
+
+import time
+
+import pytest
+
+from benchmarks.mock_ark import MockArkServer
+from tools.doubao_app import DoubaoApp
+from tools.rate_limiter import RateLimiter
+from tools.task_journal import TaskJournal
+from tools.task_poller import TaskPoller
+from tools.video_task import VideoTaskError
+
+MODEL = "doubao-seedance-1-0-lite-t2v-250428"
+TASK_DURATION = 0.3
+
+
+def _content(text: str = "a cat playing piano"):
+    return [{"type": "text", "text": text}]
+
+
+def _client(server: MockArkServer, api_key: str = "test-key", **kwargs) -> DoubaoApp:
+    kwargs.setdefault("rate_limiter", RateLimiter({}))
+    kwargs.setdefault("journal", None)
+    return DoubaoApp(api_key=api_key, base_url=server.base_url, **kwargs)
+
+
+@pytest.fixture
+def server():
+    with MockArkServer(task_duration=TASK_DURATION, seed=0) as server:
+        yield server
+
+
+@pytest.fixture
+def client(server):
+    return _client(server)
+
+
+def test_create_and_get_task(client):
+    task_id = client.create_video_task(MODEL, _content())
+    assert task_id
+
+    task = client.get_task(task_id)
+    assert task.id == task_id
+    assert task.status == "running"
+    assert not task.finished
+
+    time.sleep(TASK_DURATION + 0.1)
+    task = client.get_task(task_id)
+    assert task.succeeded
+    assert task.video_url.endswith(f"{task_id}.mp4")
+
+
+def test_list_tasks_by_id(client):
+    task_ids = [client.create_video_task(MODEL, _content(f"list {i}")) for i in range(3)]
+
+    tasks = client.list_tasks(task_ids=task_ids, page_size=len(task_ids))
+
+    assert sorted(task.id for task in tasks) == sorted(task_ids)
+    assert all(task.status == "running" for task in tasks)
+
+
+def test_wait_task_until_succeeded(client):
+    task_id = client.create_video_task(MODEL, _content("wait"))
+
+    task = client.wait_task(task_id, MODEL, deadline=10)
+
+    assert task.succeeded
+    assert task.id == task_id
+
+
+def test_wait_task_times_out(server, client):
+    server.task_duration = 30
+    task_id = client.create_video_task(MODEL, _content("slow"))
+
+    start = time.monotonic()
+    task = client.wait_task(task_id, MODEL, deadline=0.5)
+
+    assert time.monotonic() - start < 5
+    assert not task.finished
+
+
+def test_failed_task_reports_error(server, client):
+    server.task_failure_rate = 1.0
+    task_id = client.create_video_task(MODEL, _content("fail"))
+
+    task = client.wait_task(task_id, MODEL, deadline=10)
+
+    assert task.status == "failed"
+    assert not task.succeeded
+    assert task.error == "injected task failure"
+
+
+def test_cancel_task(client):
+    task_id = client.create_video_task(MODEL, _content("cancel"))
+
+    client.cancel_task(task_id)
+
+    assert client.get_task(task_id).status == "canceled"
+
+
+def test_unknown_task_raises(client):
+    with pytest.raises(VideoTaskError) as excinfo:
+        client.get_task("cgt-does-not-exist")
+    assert excinfo.value.status_code == 404
+
+    with pytest.raises(VideoTaskError):
+        client.cancel_task("cgt-does-not-exist")
+
+
+def test_task_is_private_to_its_key(server, client):
+    task_id = client.create_video_task(MODEL, _content("private"))
+    other = _client(server, api_key="other-key")
+
+    with pytest.raises(VideoTaskError) as excinfo:
+        other.get_task(task_id)
+    assert excinfo.value.status_code == 404
+
+
+def test_create_fails_on_server_error(server):
+    server.failure_rate = 1.0
+    client = _client(server, max_retries=0)
+
+    with pytest.raises(VideoTaskError) as excinfo:
+        client.create_video_task(MODEL, _content("error"), dedup=False)
+    assert excinfo.value.status_code == 500
+
+
+def test_create_retries_after_rate_limit(server):
+    server.rate_limit = 1.0
+    client = _client(server, max_retries=3)
+
+    task_ids = [
+        client.create_video_task(MODEL, _content(f"throttled {i}"), dedup=False) for i in range(2)
+    ]
+
+    assert len(set(task_ids)) == 2
+    assert server.throttled_count >= 1
+
+
+@pytest.fixture
+def journal(tmp_path):
+    return TaskJournal(str(tmp_path / "tasks.db"))
+
+
+def test_identical_request_reuses_running_task(server, journal):
+    client = _client(server, journal=journal)
+    task_id = client.create_video_task(MODEL, _content("dedup"))
+
+    assert client.create_video_task(MODEL, _content("dedup")) == task_id
+    assert client.create_video_task(MODEL, _content("other")) != task_id
+
+
+def test_identical_request_after_success_creates_new_task(server, journal):
+    client = _client(server, journal=journal)
+    task_id = client.create_video_task(MODEL, _content("dedup"))
+    # 日志中仍记为运行中，复用前需向服务端确认
+    time.sleep(TASK_DURATION + 0.1)
+
+    assert client.create_video_task(MODEL, _content("dedup")) != task_id
+
+
+def test_reuse_result_returns_succeeded_task(server, journal):
+    client = _client(server, journal=journal)
+    task_id = client.create_video_task(MODEL, _content("dedup"))
+    time.sleep(TASK_DURATION + 0.1)
+    assert client.get_task(task_id).succeeded
+
+    assert client.create_video_task(MODEL, _content("dedup"), reuse_result=True) == task_id
+
+
+def test_batch_creates_a_task_per_identical_entry(server, journal):
+    client = _client(server, journal=journal)
+    contents = [_content("same")] * 3
+
+    events = list(client.run_video_tasks(MODEL, contents, deadline=5))
+
+    created = {e["task_id"] for e in events if e["event"] == "created"}
+    finished = {e["task_id"] for e in events if e["event"] == "finished"}
+    assert len(created) == 3
+    assert finished == created
+
+
+def test_batch_reports_when_every_task_is_submitted(client):
+    events = list(client.run_video_tasks(MODEL, [_content(f"batch {i}") for i in range(3)], deadline=5))
+
+    kinds = [e["event"] for e in events if e["event"] != "waiting"]
+    assert kinds.count("submitted") == 1
+    # 图片在所有提交完成后、等待结果之前释放
+    assert kinds.index("submitted") == 3
+    assert events[kinds.index("submitted")]["created"] == 3
+
+
+def test_late_watch_learns_the_reported_task_duration(client):
+    model = "duration-test-model"
+    task_id = client.create_video_task(model, _content("late watch"))
+    # 任务完成后才开始跟踪，例如从日志恢复或查询先前提交的任务
+    time.sleep(TASK_DURATION + 0.2)
+
+    task = client.wait_task(task_id, model, deadline=5)
+
+    assert task.succeeded
+    assert TaskPoller.expected_duration(model) == pytest.approx(TASK_DURATION, abs=0.05)
@@ -1,34 +1,436 @@
 import os
+import queue
+import threading
+import time
 import requests
 import json
-from typing import Any, Dict, Optional
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import ConnectTimeoutError, NewConnectionError
+from urllib3.util.retry import Retry
+from tools.hedging import HEDGE_ENABLED, Hedger, get_hedger
+from tools.image_preprocess import sniff_mime
+from tools.key_pool import UNHEALTHY_STATUS_CODES, KeyPool, PoolMember, get_key_pool, split_values
+from tools.metrics import BYTES_BUCKETS, get_metrics
+from tools.rate_limiter import (
+    RETRYABLE_STATUS_CODES,
+    RateLimiter,
+    classify_endpoint,
+    get_rate_limiter,
+    retry_delay,
+)
+from tools.result_cache import URL_RESULT_TTL, ResultCache, get_default_cache
+from tools.single_flight import SingleFlight
+from tools.streaming_body import Base64JSONBody, EncodedImage
+from tools.task_journal import TaskJournal, get_default_journal, request_key
+from tools.task_poller import DEFAULT_DEADLINE
+from tools.task_scheduler import TaskHandle, TaskScheduler
+from tools.video_task import TASKS_PATH, VideoTask, VideoTaskError
+
+
+# 可指向其他地域或本地模拟服务（benchmarks/mock_ark.py）；多个地址以逗号分隔时按负载分配请求
+DEFAULT_BASE_URLS = split_values(
+    os.environ.get("DOUBAO_BASE_URL", "https://ark.cn-beijing.volces.com/api/v3")
+)
+DEFAULT_BASE_URL = DEFAULT_BASE_URLS[0]
+
+# 连接池默认配置，可通过环境变量覆盖
+DEFAULT_POOL_SIZE = int(os.environ.get("DOUBAO_HTTP_POOL_SIZE", "16"))
+DEFAULT_CONNECT_TIMEOUT = float(os.environ.get("DOUBAO_HTTP_CONNECT_TIMEOUT", "10"))
+DEFAULT_READ_TIMEOUT = float(os.environ.get("DOUBAO_HTTP_READ_TIMEOUT", "120"))
+DEFAULT_CONNECT_RETRIES = int(os.environ.get("DOUBAO_HTTP_CONNECT_RETRIES", "3"))
+# 429/5xx 响应的最大重试次数
+DEFAULT_MAX_RETRIES = int(os.environ.get("DOUBAO_HTTP_MAX_RETRIES", "4"))
+
+# 下载生成图片的分块大小与大小上限
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+MAX_DOWNLOAD_BYTES = int(os.environ.get("DOUBAO_MAX_DOWNLOAD_BYTES", str(50 * 1024 * 1024)))
+
+# 批量生图默认并发数
+DEFAULT_BATCH_WORKERS = int(os.environ.get("DOUBAO_BATCH_WORKERS", "4"))
+
+# 插件启动时在后台预先建立到方舟的连接
+PREWARM = os.environ.get("DOUBAO_PREWARM", "1").strip().lower() not in ("", "0", "false", "off")
+
+# 验证通过的 API Key 在该时间内不再重复验证（只保存哈希）
+CREDENTIAL_CACHE_TTL = float(os.environ.get("DOUBAO_CREDENTIAL_CACHE_TTL", "300"))
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
+# 相同的并发请求只发送一次
+_image_flights = SingleFlight()
+_task_flights = SingleFlight()
+
+# 账户哈希 -> 验证通过的时间
+_validated_accounts: Dict[str, float] = {}
+_validated_lock = threading.Lock()
+
+
+def _build_session(pool_size: int, connect_retries: int) -> requests.Session:
+    """
+    Build a keep-alive session whose adapter retries only connection errors.
+
+    Read errors and HTTP status codes are never retried here, because a
+    generation request may already have been accepted by the server.
+    """
+    retry = Retry(
+        total=connect_retries,
+        connect=connect_retries,
+        read=0,
+        status=0,
+        redirect=0,
+        backoff_factor=0.2,
+        allowed_methods=None,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=pool_size,
+        pool_maxsize=pool_size,
+        max_retries=retry,
+    )
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def configure_session(
+    pool_size: int = DEFAULT_POOL_SIZE,
+    connect_retries: int = DEFAULT_CONNECT_RETRIES,
+) -> requests.Session:
+    """
+    (Re)create the process-wide HTTP session shared by every DoubaoApp.
+
+    Args:
+        pool_size: Maximum number of keep-alive connections per host
+        connect_retries: How many times to retry a failed connection attempt
+
+    Returns:
+        The new shared session
+    """
+    global _session
+    with _session_lock:
+        old_session = _session
+        _session = _build_session(pool_size, connect_retries)
+    if old_session is not None:
+        old_session.close()
+    return _session
+
+
+def get_session() -> requests.Session:
+    """
+    Return the process-wide HTTP session, creating it on first use.
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = _build_session(DEFAULT_POOL_SIZE, DEFAULT_CONNECT_RETRIES)
+    return _session
+
+
+def prewarm(base_url: str = DEFAULT_BASE_URL, timeout: float = DEFAULT_CONNECT_TIMEOUT) -> bool:
+    """
+    Open a keep-alive connection to the API host in the shared pool.
+
+    DNS lookup, TCP and TLS handshakes happen here, so the first tool call
+    finds a ready connection. The HEAD request needs no credentials; its
+    status code is irrelevant.
+
+    Returns:
+        True if the connection was established
+    """
+    try:
+        get_session().head(base_url, timeout=timeout)
+    except requests.RequestException:
+        return False
+    return True
+
+
+def prewarm_in_background(
+    base_url: Union[str, Sequence[str]] = DEFAULT_BASE_URLS,
+) -> Optional[threading.Thread]:
+    """
+    Run prewarm for every endpoint on a daemon thread unless DOUBAO_PREWARM
+    disables it.
+
+    Returns:
+        The started thread, or None when disabled
+    """
+    if not PREWARM:
+        return None
+
+    def run():
+        for url in split_values(base_url):
+            prewarm(url)
+
+    thread = threading.Thread(target=run, name="doubao-prewarm", daemon=True)
+    thread.start()
+    return thread
+
+
+def connect_failed(error: requests.RequestException) -> bool:
+    """Whether a request failed while connecting, before anything was sent"""
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return True
+    if not isinstance(error, requests.exceptions.ConnectionError) or not error.args:
+        return False
+    # 连接建立后才断开（可能已被服务端处理）的错误不能换密钥重发
+    reason = getattr(error.args[0], "reason", error.args[0])
+    return isinstance(reason, (NewConnectionError, ConnectTimeoutError))
+
+
+def build_image_payload(
+    prompt: str,
+    model: str,
+    size: str,
+    seed: Optional[int],
+    guidance_scale: Optional[float],
+    watermark: bool,
+    quality: str,
+    response_format: str,
+    n: int,
+) -> Dict[str, Any]:
+    """Request body for /images/generations"""
+    # 使用直接HTTP请求来支持所有火山引擎特有参数
+    data = {
+        "model": model,
+        "prompt": prompt,
+        "size": size,
+        "response_format": response_format,
+        "quality": quality,
+        "n": n,
+        "watermark": watermark,
+    }
+
+    # 添加可选参数（如果不是None）
+    if seed is not None and seed != -1:
+        data["seed"] = seed
+
+    if guidance_scale is not None:
+        data["guidance_scale"] = guidance_scale
+    return data
+
+
+def image_cache_key(
+    cache: Optional[ResultCache], data: Dict[str, Any], account: str
+) -> Optional[str]:
+    """
+    Cache key for a seeded image request, or None when it must not be cached.
+
+    The account is part of the key: a hit is answered without contacting
+    the API, so results must never be shared with other keys.
+    """
+    if cache is None or "seed" not in data:
+        return None
+    return ResultCache.make_key(endpoint="images/generations", account=account, **data)
+
+
+def parse_image_response(result: Dict[str, Any], response_format: str) -> Dict[str, Any]:
+    """
+    Convert an /images/generations response into the generate_image result:
+    the first image's URL or base64 data, plus all images under "images"
+    """
+    if "data" in result and len(result["data"]) > 0:
+        images = [
+            {response_format: item[response_format]}
+            for item in result["data"]
+        ]
+        return {**images[0], "images": images}
+    return {"error": {"message": "No image data returned"}}
+
+
+def coalescing_stats() -> Dict[str, Dict[str, int]]:
+    """Single-flight counters for image generations and video task submissions"""
+    return {
+        "images": _image_flights.stats(),
+        "video_tasks": _task_flights.stats(),
+    }
 
 
 class DoubaoApp:
     """
-    Doubao API client for text-to-image generation using OpenAI client
+    Doubao API client for image generation and Seedance video tasks
     """
 
+    # 本进程已恢复过未完成任务的账号
+    _resumed_accounts = set()
+    _resumed_lock = threading.Lock()
+
     def __init__(
         self,
-        api_key: str,
-        base_url: str = "https://ark.cn-beijing.volces.com/api/v3",
+        api_key: Union[str, Sequence[str]],
+        base_url: Union[str, Sequence[str]] = DEFAULT_BASE_URLS,
         api_secret: str = None,  # 不需要使用，但保留参数以保持接口兼容性
         region: str = "cn-north-1",
+        connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+        read_timeout: float = DEFAULT_READ_TIMEOUT,
+        cache: Optional[ResultCache] = None,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+        rate_limiter: Optional[RateLimiter] = None,
+        journal: Optional[TaskJournal] = None,
+        key_pool: Optional[KeyPool] = None,
+        hedger: Optional[Hedger] = None,
     ):
         """
         Initialize the Doubao API client.
 
+        Several keys or endpoints, given as lists or comma- or
+        newline-separated strings, form a pool: every key is used on every
+        endpoint and requests are spread across them (see KeyPool).
+
         Args:
-            api_key: Volcengine API key
+            api_key: Volcengine API key, or several
+            base_url: Ark API base URL, or several
             api_secret: Not used in OpenAI client mode
             region: Not used in OpenAI client mode
+            connect_timeout: Seconds to wait for a connection to be established
+            read_timeout: Seconds to wait for the server to send a response
+            cache: Cache for seeded image generations; defaults to the shared
+                cache configured by DOUBAO_CACHE_DIR
+            max_retries: Retries for 429 and 5xx responses
+            rate_limiter: Per-endpoint limiter; defaults to the process-wide one
+            journal: Video task journal; defaults to the shared one configured
+                by DOUBAO_TASK_JOURNAL
+            key_pool: Pool to route requests through; defaults to the shared
+                pool for these keys and endpoints
+            hedger: Latency history and budget for hedged image requests;
+                defaults to the shared one
+        """
+        if key_pool is None:
+            key_pool = get_key_pool(split_values(api_key), split_values(base_url))
+        self.pool = key_pool
+        self.timeout: Tuple[float, float] = (connect_timeout, read_timeout)
+        self.cache = cache if cache is not None else get_default_cache()
+        self.max_retries = max_retries
+        self.rate_limiter = rate_limiter if rate_limiter is not None else get_rate_limiter()
+        self.journal = journal if journal is not None else get_default_journal()
+        self.hedger = hedger if hedger is not None else get_hedger()
+
+    @property
+    def session(self) -> requests.Session:
+        """The process-wide pooled HTTP session"""
+        return get_session()
+
+    @staticmethod
+    def _headers(member: PoolMember) -> Dict[str, str]:
+        return {
+            "Authorization": f"Bearer {member.api_key}",
+            "Content-Type": "application/json",
+        }
+
+    def request(self, method: str, path: str, **kwargs) -> requests.Response:
+        """
+        Send an authenticated request to the Ark API over the pooled session.
+
+        The call first waits for its endpoint's rate-limit bucket, so bursts
+        queue instead of failing. 429 and 5xx responses are retried after
+        Retry-After or a jittered exponential backoff; a 429 also holds back
+        every other caller of the same endpoint and key. With several keys,
+        each attempt goes to the least loaded healthy one, and a retry
+        prefers a different key. A request that could not connect is sent
+        once to each other key before the error is raised.
+
+        Args:
+            method: HTTP method
+            path: Path relative to base_url, e.g. "/contents/generations/tasks"
+            **kwargs: Extra arguments passed to requests.Session.request
+
+        Returns:
+            The raw HTTP response (the last one if every retry failed)
+        """
+        response, _ = self._send(method, path, **kwargs)
+        return response
+
+    def _send(
+        self,
+        method: str,
+        path: str,
+        member: Optional[PoolMember] = None,
+        latencies: Optional[List[float]] = None,
+        **kwargs,
+    ) -> Tuple[requests.Response, PoolMember]:
+        """
+        Like ``request``, but also return the pool member that answered.
+
+        Args:
+            member: Send every attempt with this member's key and endpoint
+                instead of balancing, e.g. for a task it created
+            latencies: Appended the network time of every attempt that got
+                a response, without rate-limit waits and retry backoff
         """
-        self.api_key = api_key
-        self.base_url = base_url
+        extra_headers = kwargs.pop("headers", None) or {}
+        kwargs.setdefault("timeout", self.timeout)
+        endpoint = classify_endpoint(method, path)
+        body = kwargs.get("data")
+        metrics = get_metrics()
+        label = endpoint or "other"
+        if metrics.enabled and hasattr(body, "__len__"):
+            metrics.observe("doubao_http_request_bytes", len(body), buckets=BYTES_BUCKETS, endpoint=label)
+
+        attempt = 0
+        last: Optional[PoolMember] = None
+        unreachable: List[PoolMember] = []
+        delay = 0.0
+        while True:
+            # 重试时优先换用其他密钥；换到其他密钥时无需退避等待
+            exclude = unreachable + [last] if last else unreachable
+            current = self.pool.acquire(member, exclude=exclude)
+            latency: Optional[float] = None
+            failed = True
+            try:
+                if current is last:
+                    time.sleep(delay)
+                waited = self.rate_limiter.acquire(endpoint, current.api_key)
+                if waited:
+                    metrics.observe("doubao_rate_limit_wait_seconds", waited, endpoint=label)
+                headers = self._headers(current)
+                headers.update(extra_headers)
+                start = time.perf_counter()
+                try:
+                    response = self.session.request(
+                        method, f"{current.base_url}{path}", headers=headers, **kwargs
+                    )
+                except requests.exceptions.RequestException as e:
+                    metrics.inc("doubao_http_requests_total", endpoint=label, status="error")
+                    # 未连上时请求尚未发出，换到其他成员重发是安全的
+                    if (
+                        member is None
+                        and connect_failed(e)
+                        and len(unreachable) + 1 < len(self.pool.members)
+                    ):
+                        unreachable.append(current)
+                        metrics.inc("doubao_http_retries_total", endpoint=label, status="connect_error")
+                        if hasattr(body, "seek"):
+                            body.seek(0)
+                        continue
+                    raise
+                latency = time.perf_counter() - start
+                if latencies is not None:
+                    latencies.append(latency)
+                failed = response.status_code in UNHEALTHY_STATUS_CODES
+            finally:
+                self.pool.release(current, latency, failed)
+            metrics.observe("doubao_http_request_seconds", latency, endpoint=label)
+            metrics.inc("doubao_http_requests_total", endpoint=label, status=response.status_code)
+            if (
+                response.status_code not in RETRYABLE_STATUS_CODES
+                or attempt >= self.max_retries
+            ):
+                return response, current
 
-        if not self.api_key:
-            raise ValueError("API key is required")
+            metrics.inc("doubao_http_retries_total", endpoint=label, status=response.status_code)
+            delay = retry_delay(response.headers, attempt)
+            if response.status_code == 429:
+                self.rate_limiter.pause(endpoint, current.api_key, delay)
+            last = current
+            response.close()
+            # 流式请求体需要回到开头才能重新发送
+            if hasattr(body, "seek"):
+                body.seek(0)
+            attempt += 1
 
     def generate_image(
         self,
@@ -40,10 +442,18 @@ class DoubaoApp:
         watermark: bool = False,
         quality: str = "standard",
         response_format: str = "url",
+        n: int = 1,
+        coalesce: bool = True,
+        hedge: Optional[bool] = None,
     ) -> Dict[str, Any]:
         """
         Generate image from text using Doubao API with direct HTTP request.
 
+        Identical calls that overlap in time share one request and result
+        unless ``coalesce`` is False. With hedging, a request still running
+        past the recent latency percentile for its model and size is sent a
+        second time and the first answer wins (see Hedger).
+
         Args:
             prompt: Text prompt for image generation
             model: Model name/version to use
@@ -53,56 +463,585 @@ class DoubaoApp:
             watermark: Whether to add a watermark
             quality: Generation quality ("standard" or "hd")
             response_format: Return format ("url" or "b64_json")
+            n: Number of images to request, for models that support it
+            coalesce: Share the result of an identical in-flight call
+            hedge: Hedge slow requests; defaults to DOUBAO_HEDGE
 
         Returns:
-            Dictionary containing the generated image URL or base64 data
+            Dictionary containing the first image's URL or base64 data, plus
+            all returned images under "images"
         """
         try:
-            # 使用直接HTTP请求来支持所有火山引擎特有参数
-            headers = {
-                "Authorization": f"Bearer {self.api_key}",
-                "Content-Type": "application/json",
-            }
+            data = build_image_payload(
+                prompt, model, size, seed, guidance_scale, watermark, quality, response_format, n
+            )
 
-            # 准备参数
-            data = {
-                "model": model,
-                "prompt": prompt,
-                "size": size,
-                "response_format": response_format,
-                "quality": quality,
-                "n": 1,
-                "watermark": watermark,
-            }
+            # 指定种子时结果是确定的，可直接命中缓存
+            cache_key = image_cache_key(self.cache, data, self.account)
+            if cache_key is not None:
+                cached = self.cache.get(cache_key)
+                if cached is not None:
+                    return cached
 
-            # 添加可选参数（如果不是None）
-            if seed is not None and seed != -1:
-                data["seed"] = seed
+            def send() -> Tuple[requests.Response, Optional[float]]:
+                latencies: List[float] = []
+                response, _ = self._send("POST", "/images/generations", latencies=latencies, json=data)
+                # 重试过的请求含退避等待，不作为延迟样本
+                return response, latencies[0] if len(latencies) == 1 else None
 
-            if guidance_scale is not None:
-                data["guidance_scale"] = guidance_scale
+            def generate() -> Dict[str, Any]:
+                # 发送请求（复用连接池）；按模型与尺寸统计延迟，供对冲使用
+                hedger = self.hedger
+                latency_key = (model, size)
+                if HEDGE_ENABLED if hedge is None else hedge:
+                    response, _ = hedger.run(latency_key, send)
+                else:
+                    response, latency = send()
+                    hedger.observe(latency_key, response, latency)
+                response.raise_for_status()
 
-            # 发送请求
-            url = f"{self.base_url}/images/generations"
-            response = requests.post(url, headers=headers, json=data)
-            response.raise_for_status()
+                output = parse_image_response(response.json(), response_format)
+                if cache_key is not None and "error" not in output:
+                    self.cache.set(
+                        cache_key,
+                        output,
+                        ttl=URL_RESULT_TTL if response_format == "url" else None,
+                    )
+                return output
 
-            result = response.json()
-
-            # 处理返回结果
-            if "data" in result and len(result["data"]) > 0:
-                if response_format == "url":
-                    return {"url": result["data"][0]["url"]}
-                else:
-                    return {"b64_json": result["data"][0]["b64_json"]}
-            else:
-                return {"error": {"message": "No image data returned"}}
+            if not coalesce:
+                return generate()
+            flight_key = (self.account, ResultCache.make_key(endpoint="images/generations", **data))
+            output, shared = _image_flights.do(flight_key, generate)
+            if not shared:
+                return output
+            get_metrics().inc("doubao_coalesced_total", kind="image")
+            # 共享的结果复制一份，避免调用方之间相互修改
+            return dict(output)
 
         except requests.exceptions.RequestException as e:
             return {"error": {"message": f"Request failed: {str(e)}"}}
         except Exception as e:
             return {"error": {"message": str(e)}}
 
+    def download_image(self, url: str) -> Tuple[str, bytes]:
+        """
+        Download a generated image over the pooled session.
+
+        Args:
+            url: Image URL returned by generate_image
+
+        Returns:
+            Tuple of (MIME type sniffed from the content, image bytes)
+        """
+        with self.session.get(url, stream=True, timeout=self.timeout) as response:
+            response.raise_for_status()
+            chunks = []
+            size = 0
+            for chunk in response.iter_content(DOWNLOAD_CHUNK_SIZE):
+                size += len(chunk)
+                if size > MAX_DOWNLOAD_BYTES:
+                    raise ValueError(f"Image exceeds {MAX_DOWNLOAD_BYTES} bytes")
+                chunks.append(chunk)
+        data = b"".join(chunks)
+        return sniff_mime(data, default="image/png"), data
+
+    def generate_images(
+        self,
+        prompts: List[str],
+        n: int = 1,
+        max_workers: int = DEFAULT_BATCH_WORKERS,
+        download: bool = False,
+        **kwargs,
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Generate images for many prompts concurrently.
+
+        Every prompt is generated ``n`` times, one request each, on a bounded
+        thread pool paced by the shared images rate limit. Results are yielded
+        as soon as each request finishes, so callers can stream them instead
+        of waiting for the whole batch.
+
+        Args:
+            prompts: Text prompts to generate
+            n: Images per prompt
+            max_workers: Maximum concurrent requests
+            download: For URL results, also download the image in the worker
+                and add "blob" and "mime_type" to the result
+            **kwargs: Extra arguments passed to generate_image
+
+        Yields:
+            The generate_image result for one image, plus "index" (position in
+            the batch) and "prompt"
+        """
+        jobs = [prompt for prompt in prompts for _ in range(max(1, n))]
+        if not jobs:
+            return
+        seed = kwargs.pop("seed", None)
+
+        def run(index: int, prompt: str) -> Dict[str, Any]:
+            job_kwargs = dict(kwargs)
+            if seed is not None and seed != -1:
+                # 固定种子时为同一提示词的多张图像使用不同种子
+                job_kwargs["seed"] = seed + index
+            else:
+                # 未固定种子时同一提示词的多张图像应各不相同，不能合并
+                job_kwargs["coalesce"] = False
+            result = self.generate_image(prompt=prompt, **job_kwargs)
+            if download and "url" in result:
+                # 复制一份，避免把图片内容写入结果缓存中的对象
+                result = dict(result)
+                try:
+                    result["mime_type"], result["blob"] = self.download_image(result["url"])
+                except Exception as e:
+                    result["download_error"] = str(e)
+            return {**result, "index": index, "prompt": prompt}
+
+        executor = ThreadPoolExecutor(
+            max_workers=max(1, min(max_workers, len(jobs))),
+            thread_name_prefix="doubao-image",
+        )
+        try:
+            futures = [
+                executor.submit(run, index, prompt)
+                for index, prompt in enumerate(jobs)
+            ]
+            for future in as_completed(futures):
+                yield future.result()
+        finally:
+            # 调用方提前停止消费时，取消尚未开始的请求
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    @staticmethod
+    def _task_error(action: str, response: requests.Response) -> VideoTaskError:
+        return VideoTaskError(
+            f"{action}失败，状态码: {response.status_code}, 错误信息: {response.text}",
+            response.status_code,
+        )
+
+    def create_video_task(
+        self,
+        model: str,
+        content: List[Dict[str, Any]],
+        image: Optional[Union[bytes, str, EncodedImage]] = None,
+        mime_type: str = "image/jpeg",
+        dedup: bool = True,
+        reuse_result: bool = False,
+        **params,
+    ) -> str:
+        """
+        Submit a video generation task.
+
+        Identical requests submitted concurrently share one task. With a
+        journal, an identical request submitted within the dedup window also
+        returns the earlier task instead of paying for a new one while that
+        task is still queued or running; a finished task is only reused with
+        ``reuse_result``. The task is pinned to the key that created it, so
+        its polls use that key.
+
+        Args:
+            model: Model name
+            content: Task content (text and image_url entries)
+            image: Image bytes or path for the image_url entry whose URL is
+                IMAGE_PLACEHOLDER; base64-encoded while the request is sent,
+                or an EncodedImage shared by several requests
+            mime_type: MIME type of ``image``
+            dedup: Share an identical in-flight submission and reuse a matching
+                unfinished task from the journal
+            reuse_result: Also reuse a matching task that has already
+                succeeded instead of generating the video again
+            **params: Extra top-level request fields
+
+        Returns:
+            The new task ID
+
+        Raises:
+            VideoTaskError: if the task was not created
+        """
+        payload = {"model": model, "content": content, **params}
+        self.resume_tasks()
+
+        def submit() -> str:
+            if key is not None and self.journal is not None:
+                for member in self.pool.members:
+                    existing = self.journal.find(member.account, key, finished=reuse_result)
+                    if existing is None:
+                        continue
+                    self.pool.pin(existing.task_id, member)
+                    if not reuse_result and not self._still_running(existing.task_id):
+                        continue
+                    get_metrics().inc("doubao_task_reused_total")
+                    return existing.task_id
+
+            if image is None:
+                response, member = self._send("POST", TASKS_PATH, json=payload)
+            else:
+                body = Base64JSONBody(payload, image, mime_type=mime_type)
+                response, member = self._send("POST", TASKS_PATH, data=body)
+
+            if response.status_code != 200:
+                raise self._task_error("创建视频生成任务", response)
+            task_id = response.json().get("id")
+            if not task_id:
+                raise VideoTaskError("创建视频生成任务失败，未获取到任务ID")
+            self.pool.pin(task_id, member)
+            if self.journal is not None:
+                self.journal.record(task_id, member.account, model, params, key)
+            return task_id
+
+        if not dedup:
+            key = None
+            return submit()
+        if isinstance(image, str):
+            with open(image, "rb") as f:
+                key = request_key(payload, f.read())
+        elif isinstance(image, EncodedImage):
+            key = request_key(payload, image_digest=image.digest)
+        else:
+            key = request_key(payload, image)
+        # 同时到达的相同请求只提交一次
+        task_id, shared = _task_flights.do((self.account, key), submit)
+        if shared:
+            get_metrics().inc("doubao_coalesced_total", kind="video_task")
+        return task_id
+
+    def _still_running(self, task_id: str) -> bool:
+        """Whether a journalled task is still queued or running on the server"""
+        # 日志中的状态可能已过时，复用前向服务端确认任务尚未结束
+        try:
+            return not self.get_task(task_id).finished
+        except VideoTaskError:
+            return False
+
+    def get_task(self, task_id: str) -> VideoTask:
+        """
+        Fetch a task's current state.
+
+        Raises:
+            VideoTaskError: if the task could not be fetched
+        """
+        response = self._task_request("GET", task_id)
+        if response.status_code != 200:
+            raise self._task_error("查询视频生成任务", response)
+        task = VideoTask.from_response(response.json())
+        if self.journal is not None:
+            self.journal.update(task)
+        return task
+
+    def list_tasks(
+        self,
+        task_ids: Optional[Sequence[str]] = None,
+        status: Optional[str] = None,
+        model: Optional[str] = None,
+        page_num: int = 1,
+        page_size: int = 10,
+        member: Optional[PoolMember] = None,
+    ) -> List[VideoTask]:
+        """
+        List tasks, optionally filtered; one request for many task IDs.
+
+        Args:
+            task_ids: Only these tasks
+            status: Only tasks with this status
+            model: Only tasks of this model
+            page_num: Page number, starting at 1
+            page_size: Tasks per page
+            member: Pool member whose tasks to list; defaults to the one
+                that created the first of ``task_ids``, else any
+
+        Raises:
+            VideoTaskError: if the list could not be fetched
+        """
+        params: Dict[str, Any] = {"page_num": page_num, "page_size": page_size}
+        if task_ids:
+            params["filter.task_ids"] = list(task_ids)
+        if status:
+            params["filter.status"] = status
+        if model:
+            params["filter.model"] = model
+        if member is None and task_ids:
+            member = self.task_member(task_ids[0])
+        response, _ = self._send("GET", TASKS_PATH, member=member, params=params)
+        if response.status_code != 200:
+            raise self._task_error("查询视频生成任务列表", response)
+        tasks = [VideoTask.from_response(item) for item in response.json().get("items") or []]
+        if self.journal is not None:
+            for task in tasks:
+                self.journal.update(task)
+        return tasks
+
+    def cancel_task(self, task_id: str):
+        """
+        Cancel a queued task, or delete the record of a finished one.
+
+        Raises:
+            VideoTaskError: if the server refused
+        """
+        response = self._task_request("DELETE", task_id)
+        if response.status_code != 200:
+            raise self._task_error("取消视频生成任务", response)
+
+    def task_member(self, task_id: str) -> Optional[PoolMember]:
+        """The pool member that created a task; None if not known here"""
+        if len(self.pool.members) == 1:
+            return self.pool.members[0]
+        return self.pool.pinned(task_id)
+
+    def _task_request(self, method: str, task_id: str) -> requests.Response:
+        """
+        Send a request about one task with the key that created it.
+
+        A task created elsewhere, e.g. by another plugin process, is looked
+        for with each key in turn; the first key that knows it is pinned.
+        """
+        path = f"{TASKS_PATH}/{task_id}"
+        member = self.task_member(task_id)
+        if member is not None:
+            response, _ = self._send(method, path, member=member)
+            return response
+        for candidate in self.pool.members:
+            response, _ = self._send(method, path, member=candidate)
+            if response.status_code != 404:
+                if response.status_code == 200:
+                    self.pool.pin(task_id, candidate)
+                return response
+        return response
+
+    def validate_credentials(self):
+        """
+        Check every API key with a one-item task list request.
+
+        Nothing is generated, so validation costs no quota. Keys that pass
+        are remembered by hash for CREDENTIAL_CACHE_TTL seconds.
+
+        Raises:
+            VideoTaskError: if a key was rejected
+            requests.RequestException: if the API could not be reached
+        """
+        for member in self.pool.members:
+            now = time.monotonic()
+            with _validated_lock:
+                validated_at = _validated_accounts.get(member.account)
+            if validated_at is not None and now - validated_at < CREDENTIAL_CACHE_TTL:
+                continue
+            response, _ = self._send(
+                "GET", TASKS_PATH, member=member, params={"page_num": 1, "page_size": 1}
+            )
+            if response.status_code != 200:
+                raise self._task_error("验证 API Key", response)
+            with _validated_lock:
+                _validated_accounts[member.account] = now
+
+    @property
+    def account(self) -> str:
+        """Identifies this client's credentials without revealing them"""
+        return self.pool.account
+
+    def resume_tasks(self) -> List[TaskHandle]:
+        """
+        Resume polling the journal's unfinished tasks for these keys.
+
+        Runs once per account and process, so tasks that were in flight
+        when the plugin restarted are tracked again on the first video call.
+        Their results land in the journal, where a repeated request or the
+        status tool finds them.
+        """
+        if self.journal is None:
+            return []
+        scheduler = TaskScheduler.instance()
+        handles = []
+        for member in self.pool.members:
+            with self._resumed_lock:
+                if member.account in self._resumed_accounts:
+                    continue
+                self._resumed_accounts.add(member.account)
+            for entry in self.journal.unfinished(member.account):
+                self.pool.pin(entry.task_id, member)
+                handles.append(scheduler.watch(self, entry.task_id, entry.model or ""))
+        return handles
+
+    def watch_task(
+        self, task_id: str, model: str = "", deadline: float = DEFAULT_DEADLINE
+    ) -> TaskHandle:
+        """
+        Track a task on the shared poll scheduler without blocking.
+
+        Callers that report progress wait on the handle in steps and read
+        ``handle.result()`` once it is done.
+        """
+        self.resume_tasks()
+        return TaskScheduler.instance().watch(self, task_id, model, deadline=deadline)
+
+    def wait_task(
+        self, task_id: str, model: str = "", deadline: float = DEFAULT_DEADLINE
+    ) -> VideoTask:
+        """
+        Block until a task finishes or the deadline passes.
+
+        Args:
+            task_id: Task to wait for
+            model: Model name, used to learn typical task durations
+            deadline: Maximum seconds to wait
+
+        Returns:
+            The last known state; its status is not terminal on timeout
+
+        Raises:
+            VideoTaskError: if polling failed
+        """
+        handle = self.watch_task(task_id, model, deadline)
+        # 同一任务可能被其他调用方以更长的期限跟踪，本调用只等待自己的期限
+        handle.wait(deadline)
+        return handle.result()
+
+    def run_video_tasks(
+        self,
+        model: str,
+        contents: Sequence[List[Dict[str, Any]]],
+        image: Optional[Union[bytes, EncodedImage]] = None,
+        mime_type: str = "image/jpeg",
+        max_workers: int = DEFAULT_BATCH_WORKERS,
+        deadline: float = DEFAULT_DEADLINE,
+        heartbeat: Optional[float] = None,
+        wait: bool = True,
+        params: Optional[Sequence[Dict[str, Any]]] = None,
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Submit several video tasks concurrently and follow them together.
+
+        The image is base64-encoded once for all tasks. Every entry creates
+        its own task, even when entries are identical: they are separate
+        videos the caller asked for, so neither in-flight coalescing nor the
+        journal applies. Submissions run on a bounded thread pool paced by
+        the shared task-create rate limit;
+        each created task is handed to the poll scheduler at once, and events
+        are yielded in the order they happen, so results arrive in completion
+        order rather than submission order. Once every submission has
+        completed the image is dropped, so it is not held while waiting.
+
+        Args:
+            model: Model name
+            contents: Task content of each task; see create_video_task
+            image: Image shared by every task's IMAGE_PLACEHOLDER entry
+            mime_type: MIME type of ``image``
+            max_workers: Maximum concurrent submissions
+            deadline: Maximum seconds to wait for each task
+            heartbeat: Yield a "waiting" event after this many seconds
+                without other events, so callers can report progress
+            wait: Stop after the submissions instead of waiting for results
+            params: Extra top-level request fields for each task
+
+        Yields:
+            {"event": "created", "index", "task_id"} when a task is created;
+            {"event": "finished", "index", "task_id", "task"} when it is
+            terminal or its deadline passed (the task's status tells which);
+            {"event": "error", "index", "error"} when submitting or polling
+            failed; {"event": "submitted", "created"} once after the last
+            submission's event, when the image is no longer needed;
+            {"event": "waiting", "pending", "elapsed"} on heartbeats
+        """
+        total = len(contents)
+        if not total:
+            return
+        if isinstance(image, (bytes, bytearray, memoryview)) and total > 1:
+            image = EncodedImage(image, mime_type)
+        events: "queue.Queue[Dict[str, Any]]" = queue.Queue()
+        # 尚未完成的提交数与已创建的任务数
+        submission = {"pending": total, "created": 0}
+        submission_lock = threading.Lock()
+
+        def submit(index: int) -> str:
+            extra = params[index] if params else {}
+            # 批量中的相同请求是调用方要的多个视频，不合并也不复用已有任务
+            return self.create_video_task(
+                model, contents[index], image=image, mime_type=mime_type, dedup=False, **extra
+            )
+
+        def submitted(index: int, future):
+            nonlocal image
+            try:
+                task_id = future.result()
+            except Exception as e:
+                events.put({"event": "error", "index": index, "error": str(e)})
+                created = 0
+            else:
+                events.put({"event": "created", "index": index, "task_id": task_id})
+                created = 1
+            with submission_lock:
+                submission["pending"] -= 1
+                submission["created"] += created
+                if submission["pending"]:
+                    return
+            # 全部提交完成：不再需要图片，等待期间不再持有编码副本
+            image = None
+            events.put({"event": "submitted", "created": submission["created"]})
+
+        def finished(index: int, handle: TaskHandle):
+            try:
+                task = handle.result()
+            except VideoTaskError as e:
+                events.put({"event": "error", "index": index, "error": str(e)})
+                return
+            events.put(
+                {"event": "finished", "index": index, "task_id": handle.task_id, "task": task}
+            )
+
+        executor = ThreadPoolExecutor(
+            max_workers=max(1, min(max_workers, total)),
+            thread_name_prefix="doubao-video",
+        )
+        try:
+            for index in range(total):
+                future = executor.submit(submit, index)
+                future.add_done_callback(lambda f, i=index: submitted(i, f))
+            start = time.monotonic()
+            # 尚未得到结果（或在仅提交时尚未创建）的任务数
+            remaining = total
+            # 等待中的任务：序号 -> (句柄, 本次调用的等待期限)
+            watching: Dict[int, Tuple[TaskHandle, float]] = {}
+            # 已返回最终事件的序号；按期限结束后调度器的迟到结果被忽略
+            reported: set = set()
+            all_submitted = False
+            last_event = start
+            while remaining or not all_submitted:
+                now = time.monotonic()
+                # 调度器迟迟没有结果时按本次调用自己的期限结束等待
+                for index, (handle, expires_at) in list(watching.items()):
+                    if expires_at <= now:
+                        del watching[index]
+                        finished(index, handle)
+                timeouts = [expires_at - now for _, expires_at in watching.values()]
+                if heartbeat is not None:
+                    timeouts.append(last_event + heartbeat - now)
+                try:
+                    event = events.get(timeout=max(0.0, min(timeouts)) if timeouts else None)
+                except queue.Empty:
+                    if heartbeat is not None and time.monotonic() - last_event >= heartbeat:
+                        last_event = time.monotonic()
+                        yield {
+                            "event": "waiting",
+                            "pending": remaining,
+                            "elapsed": last_event - start,
+                        }
+                    continue
+                if event["event"] == "submitted":
+                    all_submitted = True
+                elif event["event"] == "created" and wait:
+                    handle = self.watch_task(event["task_id"], model, deadline)
+                    watching[event["index"]] = (handle, time.monotonic() + deadline)
+                    handle.add_done_callback(lambda h, i=event["index"]: finished(i, h))
+                else:
+                    if event["index"] in reported:
+                        continue
+                    reported.add(event["index"])
+                    watching.pop(event["index"], None)
+                    remaining -= 1
+                last_event = time.monotonic()
+                yield event
+        finally:
+            # 调用方提前停止消费时，取消尚未开始的提交；已创建的任务在服务端继续执行
+            executor.shutdown(wait=False, cancel_futures=True)
+
     # 保留旧方法以便兼容性
     def text2image(
         self,
@@ -0,0 +1,361 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from typing import Any, List, NamedTuple, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from tools.doubao_app import get_session
+
+DEFAULT_FETCH_CACHE_DIR = os.environ.get(
+    "DOUBAO_FETCH_CACHE_DIR",
+    os.path.join(tempfile.gettempdir(), "doubao_image_cache"),
+)
+DEFAULT_MAX_IMAGE_BYTES = int(os.environ.get("DOUBAO_MAX_IMAGE_BYTES", str(30 * 1024 * 1024)))
+DEFAULT_FETCH_CACHE_BYTES = int(os.environ.get("DOUBAO_FETCH_CACHE_BYTES", str(512 * 1024 * 1024)))
+# 缓存条目在该时间内直接复用，不发起任何网络请求；过期后用 ETag 条件请求校验
+DEFAULT_FETCH_FRESH_SECONDS = float(os.environ.get("DOUBAO_FETCH_FRESH_SECONDS", "3600"))
+
+# 签名 URL 中每次都会变化的查询参数，不参与缓存键计算；带有这些参数的 URL 每次都要向源站校验
+_VOLATILE_QUERY_PARAMS = {"timestamp", "nonce", "sign", "signature", "expires"}
+_VOLATILE_QUERY_PREFIXES = ("x-amz-", "x-tos-")
+
+_CHUNK_SIZE = 64 * 1024
+
+
+class ImageFetchError(Exception):
+    pass
+
+
+class FetchedImage(NamedTuple):
+    data: bytes
+    source: str
+    cached: bool = False
+
+
+def normalize_url(url: str) -> str:
+    """Drop signature parameters so re-signed URLs of one file share a key"""
+    parts = urlsplit(url)
+    query = [
+        (key, value)
+        for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key.lower() not in _VOLATILE_QUERY_PARAMS
+        and not key.lower().startswith(_VOLATILE_QUERY_PREFIXES)
+    ]
+    return urlunsplit((parts.scheme, parts.netloc, parts.path, urlencode(query), ""))
+
+
+def is_signed(url: str) -> bool:
+    """Whether the URL carries signature or expiry parameters"""
+    return any(
+        key.lower() in _VOLATILE_QUERY_PARAMS or key.lower().startswith(_VOLATILE_QUERY_PREFIXES)
+        for key, _ in parse_qsl(urlsplit(url).query, keep_blank_values=True)
+    )
+
+
+class ImageFetcher:
+    """
+    Resolves a tool's image parameter to bytes, local sources first.
+
+    URL downloads are streamed to disk with a size cap and stored by content
+    hash. The URL index remembers each file's ETag, so a repeated input is
+    served from disk without network I/O while fresh, and with a cheap
+    conditional request once stale. Stored images and index files share
+    one size budget.
+
+    Signed URLs share one index entry across re-signings, but are never
+    served without a request: the caller's exact URL is always sent as a
+    conditional request, so a missing, wrong or expired signature is
+    rejected by the origin instead of being answered from the cache.
+    """
+
+    def __init__(
+        self,
+        cache_dir: Optional[str] = DEFAULT_FETCH_CACHE_DIR,
+        max_bytes: int = DEFAULT_MAX_IMAGE_BYTES,
+        cache_bytes: int = DEFAULT_FETCH_CACHE_BYTES,
+        fresh_seconds: float = DEFAULT_FETCH_FRESH_SECONDS,
+        timeout: float = 60,
+    ):
+        """
+        Args:
+            cache_dir: Directory for downloaded images; None disables caching
+            max_bytes: Largest image accepted from any source
+            cache_bytes: Maximum total size of cached images
+            fresh_seconds: Seconds a cached URL is reused without revalidation
+            timeout: Download timeout in seconds
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.cache_bytes = cache_bytes
+        self.fresh_seconds = fresh_seconds
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def acquire(self, image_file: Any) -> FetchedImage:
+        """
+        Return the image's bytes.
+
+        Tries, in order: content already in memory, a local path, a readable
+        object, the URL (through the cache), and finally the file's own
+        ``blob`` loader.
+
+        Raises:
+            ImageFetchError: if no source yields the image
+        """
+        errors: List[str] = []
+
+        # 已加载到内存的内容（dify_plugin File 的 _blob）
+        blob = getattr(image_file, "_blob", None)
+        if isinstance(blob, (bytes, bytearray)):
+            return FetchedImage(self._check_size(bytes(blob)), "blob")
+
+        # 本地路径
+        for source, path in (
+            ("path", image_file if isinstance(image_file, str) else None),
+            ("path", getattr(image_file, "path", None)),
+        ):
+            if isinstance(path, str) and os.path.isfile(path):
+                try:
+                    return FetchedImage(self._read_file(path), source)
+                except (OSError, ImageFetchError) as e:
+                    errors.append(f"读取本地文件失败: {str(e)}")
+
+        # 可读对象
+        if hasattr(image_file, "read"):
+            try:
+                data = image_file.read()
+                if hasattr(image_file, "seek"):
+                    image_file.seek(0)
+                return FetchedImage(self._check_size(data), "read")
+            except Exception as e:
+                errors.append(f"从可读对象获取文件数据失败: {str(e)}")
+
+        # 网络 URL（经过缓存）
+        url = getattr(image_file, "url", None)
+        if isinstance(url, str) and url:
+            try:
+                return self.fetch_url(url)
+            except Exception as e:
+                errors.append(f"从URL下载图片失败: {str(e)}")
+
+        # 最后尝试文件对象自带的加载方式
+        if hasattr(image_file, "blob"):
+            try:
+                return FetchedImage(self._check_size(image_file.blob), "blob")
+            except Exception as e:
+                errors.append(f"获取blob属性失败: {str(e)}")
+
+        raise ImageFetchError("; ".join(errors) or "不支持的图片输入类型")
+
+    def fetch_url(self, url: str) -> FetchedImage:
+        """Download an image URL, reusing the on-disk cache when possible"""
+        if not self.cache_dir:
+            return FetchedImage(self._download(url, None)[0], "url")
+
+        key = hashlib.sha256(normalize_url(url).encode("utf-8")).hexdigest()
+        meta = self._load_meta(key)
+        if meta is not None:
+            data_path = self._data_path(meta["sha256"])
+            if os.path.exists(data_path):
+                # 签名 URL 的凭证只能由源站校验：请求或缓存条目来自签名 URL 时都不直接复用
+                if (
+                    not is_signed(url)
+                    and not meta.get("signed", True)
+                    and time.time() - meta["checked_at"] < self.fresh_seconds
+                ):
+                    self._touch(self._meta_path(key))
+                    return FetchedImage(self._read_file(data_path, touch=True), "url", cached=True)
+            else:
+                meta = None
+
+        data, response = self._download(url, meta)
+        if data is None:
+            # 304：内容未变化
+            meta["checked_at"] = time.time()
+            meta["signed"] = is_signed(url)
+            self._save_meta(key, meta)
+            return FetchedImage(self._read_file(self._data_path(meta["sha256"]), touch=True), "url", cached=True)
+
+        sha256 = hashlib.sha256(data).hexdigest()
+        self._save_meta(
+            key,
+            {
+                "url": normalize_url(url),
+                "sha256": sha256,
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+                "checked_at": time.time(),
+                "signed": is_signed(url),
+            },
+        )
+        self._evict()
+        return FetchedImage(data, "url")
+
+    def _download(self, url: str, meta: Optional[dict]):
+        """
+        Fetch the URL, conditionally when ``meta`` is given.
+
+        With a cache directory the body is streamed to a temporary file and
+        read back once complete; without one it is buffered in memory.
+
+        Returns:
+            (data, response); data is None when the origin answered 304
+        """
+        headers = {}
+        if meta is not None:
+            if meta.get("etag"):
+                headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                headers["If-Modified-Since"] = meta["last_modified"]
+
+        with get_session().get(url, headers=headers, stream=True, timeout=self.timeout) as response:
+            if response.status_code == 304 and meta is not None:
+                return None, response
+            response.raise_for_status()
+
+            length = response.headers.get("Content-Length")
+            if length and int(length) > self.max_bytes:
+                raise ImageFetchError(f"图片过大: {int(length)/1024/1024:.1f}MB")
+
+            if not self.cache_dir:
+                # 无缓存目录：在内存中拼接，超过上限立即中止
+                chunks = []
+                size = 0
+                for chunk in response.iter_content(_CHUNK_SIZE):
+                    size += len(chunk)
+                    if size > self.max_bytes:
+                        raise ImageFetchError(f"图片超过大小上限 {self.max_bytes/1024/1024:.0f}MB")
+                    chunks.append(chunk)
+                return self._check_size(b"".join(chunks)), response
+
+            # 边下载边写入临时文件，超过上限立即中止；下载完成后再整体读回
+            digest = hashlib.sha256()
+            size = 0
+            tmp = tempfile.NamedTemporaryFile(dir=self.cache_dir, suffix=".part", delete=False)
+            try:
+                for chunk in response.iter_content(_CHUNK_SIZE):
+                    size += len(chunk)
+                    if size > self.max_bytes:
+                        raise ImageFetchError(f"图片超过大小上限 {self.max_bytes/1024/1024:.0f}MB")
+                    digest.update(chunk)
+                    tmp.write(chunk)
+                tmp.close()
+                # 先从临时文件读取，避免改名后被并发的淘汰删除
+                data = self._read_file(tmp.name)
+                os.replace(tmp.name, self._data_path(digest.hexdigest()))
+            finally:
+                tmp.close()
+                self._remove(tmp.name)
+        return data, response
+
+    def _check_size(self, data: bytes) -> bytes:
+        if data is None or len(data) == 0:
+            raise ImageFetchError("图片数据为空")
+        if len(data) > self.max_bytes:
+            raise ImageFetchError(f"图片过大: {len(data)/1024/1024:.1f}MB")
+        return data
+
+    def _read_file(self, path: str, touch: bool = False) -> bytes:
+        if os.path.getsize(path) > self.max_bytes:
+            raise ImageFetchError(f"图片过大: {os.path.getsize(path)/1024/1024:.1f}MB")
+        with open(path, "rb") as f:
+            data = f.read()
+        if touch:
+            self._touch(path)
+        return self._check_size(data)
+
+    def _data_path(self, sha256: str) -> str:
+        return os.path.join(self.cache_dir, f"{sha256}.bin")
+
+    def _meta_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.url.json")
+
+    def _load_meta(self, key: str) -> Optional[dict]:
+        try:
+            with open(self._meta_path(key), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _save_meta(self, key: str, meta: dict):
+        path = self._meta_path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(meta, f)
+            os.replace(tmp_path, path)
+        except OSError:
+            self._remove(tmp_path)
+
+    def _evict(self):
+        """
+        Remove least recently used images and index files until the cache
+        fits its budget, then drop index files whose image is gone.
+        """
+        with self._lock:
+            entries = []
+            total = 0
+            for name in os.listdir(self.cache_dir):
+                if not name.endswith((".bin", ".url.json")):
+                    continue
+                path = os.path.join(self.cache_dir, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+                total += stat.st_size
+            entries.sort()
+            kept = []
+            for _, size, path in entries:
+                if total > self.cache_bytes:
+                    self._remove(path)
+                    total -= size
+                else:
+                    kept.append(path)
+
+            # 数据已被淘汰的 URL 索引不会再命中，一并删除
+            stored = {os.path.basename(path) for path in kept if path.endswith(".bin")}
+            for path in kept:
+                if not path.endswith(".url.json"):
+                    continue
+                try:
+                    with open(path, "r", encoding="utf-8") as f:
+                        sha256 = json.load(f)["sha256"]
+                except (OSError, ValueError, KeyError, TypeError):
+                    sha256 = None
+                if f"{sha256}.bin" not in stored:
+                    self._remove(path)
+
+    @staticmethod
+    def _touch(path: str):
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+    @staticmethod
+    def _remove(path: str):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+_default_fetcher: Optional[ImageFetcher] = None
+_default_fetcher_lock = threading.Lock()
+
+
+def get_default_fetcher() -> ImageFetcher:
+    """Return the shared fetcher, creating it on first use"""
+    global _default_fetcher
+    if _default_fetcher is None:
+        with _default_fetcher_lock:
+            if _default_fetcher is None:
+                _default_fetcher = ImageFetcher()
+    return _default_fetcher
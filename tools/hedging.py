@@ -0,0 +1,326 @@
+import bisect
+import math
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed, wait
+from typing import Callable, Dict, Hashable, List, Optional, Tuple
+
+import requests
+
+from tools.metrics import get_metrics
+
+# 默认关闭；开启后生图请求在超过近期延迟分位数仍未返回时再发送一个相同请求
+HEDGE_ENABLED = os.environ.get("DOUBAO_HEDGE", "0").strip().lower() not in ("", "0", "false", "off")
+# 触发对冲的延迟分位数
+DEFAULT_HEDGE_PERCENTILE = float(os.environ.get("DOUBAO_HEDGE_PERCENTILE", "0.95"))
+# 对冲请求数不超过普通请求数的该比例
+DEFAULT_HEDGE_BUDGET = float(os.environ.get("DOUBAO_HEDGE_BUDGET", "0.1"))
+# 延迟样本少于该数量时不对冲
+DEFAULT_HEDGE_MIN_SAMPLES = int(os.environ.get("DOUBAO_HEDGE_MIN_SAMPLES", "20"))
+# 延迟统计只使用最近该秒数内的样本
+DEFAULT_HEDGE_WINDOW = float(os.environ.get("DOUBAO_HEDGE_WINDOW", "600"))
+
+# 对数分桶：每个桶比上一个宽 10%，覆盖 10ms 到约 20 分钟
+_BUCKET_BOUNDS = tuple(0.01 * 1.1 ** i for i in range(int(math.log(120000) / math.log(1.1)) + 1))
+# 窗口分成的时间片数，过期时整片丢弃
+_SLICES = 10
+
+
+class RollingHistogram:
+    """
+    Latency histogram over a sliding time window.
+
+    The window is split into slices; each observation lands in the current
+    slice and whole slices expire as the window moves, so percentiles follow
+    recent latency at constant memory. Buckets grow geometrically by 10%,
+    which bounds the percentile error to one bucket.
+    """
+
+    def __init__(
+        self,
+        window: float = DEFAULT_HEDGE_WINDOW,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.slice_seconds = window / _SLICES
+        self._clock = clock
+        # 时间片编号 -> 各桶计数
+        self._slices: Dict[int, List[int]] = {}
+        self._lock = threading.Lock()
+
+    def _expire(self, current: int):
+        for number in [n for n in self._slices if n <= current - _SLICES]:
+            del self._slices[number]
+
+    def observe(self, seconds: float):
+        current = int(self._clock() / self.slice_seconds)
+        index = min(bisect.bisect_left(_BUCKET_BOUNDS, seconds), len(_BUCKET_BOUNDS) - 1)
+        with self._lock:
+            self._expire(current)
+            counts = self._slices.get(current)
+            if counts is None:
+                counts = self._slices[current] = [0] * len(_BUCKET_BOUNDS)
+            counts[index] += 1
+
+    @property
+    def count(self) -> int:
+        with self._lock:
+            self._expire(int(self._clock() / self.slice_seconds))
+            return sum(sum(counts) for counts in self._slices.values())
+
+    def percentile(self, fraction: float, min_samples: int = 1) -> Optional[float]:
+        """
+        Upper bound of the bucket holding the given percentile, or None
+        with fewer than ``min_samples`` recent observations
+        """
+        with self._lock:
+            self._expire(int(self._clock() / self.slice_seconds))
+            totals = [sum(column) for column in zip(*self._slices.values())]
+        count = sum(totals)
+        if not count or count < min_samples:
+            return None
+        rank = max(1, math.ceil(fraction * count))
+        seen = 0
+        for bound, bucket_count in zip(_BUCKET_BOUNDS, totals):
+            seen += bucket_count
+            if seen >= rank:
+                return bound
+        return _BUCKET_BOUNDS[-1]
+
+
+class HedgeBudget:
+    """
+    Caps hedged requests at a fraction of ordinary ones.
+
+    Every ordinary request earns ``ratio`` tokens, up to ``burst``; a hedge
+    spends one. While the service is slow across the board, hedging stops
+    once the budget is spent instead of multiplying the load.
+    """
+
+    def __init__(self, ratio: float = DEFAULT_HEDGE_BUDGET, burst: float = 10.0):
+        self.ratio = ratio
+        self.burst = burst
+        self._tokens = 0.0
+        self._lock = threading.Lock()
+
+    def earn(self):
+        with self._lock:
+            self._tokens = min(self.burst, self._tokens + self.ratio)
+
+    def spend(self) -> bool:
+        """Take one token; False when the budget is exhausted"""
+        with self._lock:
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+
+class Hedger:
+    """
+    Sends a duplicate of a slow request and keeps whichever answers first.
+
+    The hedge is sent once the first attempt has been outstanding longer
+    than the configured percentile of recent latency for the same key
+    (model and size for image generation), and only while the budget
+    allows. Time is counted from when a worker starts the attempt, and no
+    hedge is sent while every worker is busy, so a saturated pool is not
+    mistaken for a slow service. The first usable response wins; the other
+    attempt cannot be interrupted mid-flight, so its response is closed and
+    dropped as soon as it arrives.
+    """
+
+    def __init__(
+        self,
+        percentile: float = DEFAULT_HEDGE_PERCENTILE,
+        budget: Optional[HedgeBudget] = None,
+        min_samples: int = DEFAULT_HEDGE_MIN_SAMPLES,
+        window: float = DEFAULT_HEDGE_WINDOW,
+        max_workers: int = 32,
+    ):
+        """
+        Args:
+            percentile: Latency percentile after which a hedge is sent
+            budget: Limit on hedged requests; defaults to DOUBAO_HEDGE_BUDGET
+            min_samples: Recent samples needed before hedging at all
+            window: Seconds of latency history used for the percentile
+            max_workers: Maximum attempts in flight across all callers
+        """
+        self.percentile = percentile
+        self.budget = budget if budget is not None else HedgeBudget()
+        self.min_samples = min_samples
+        self.window = window
+        self.max_workers = max_workers
+        self._histograms: Dict[Hashable, RollingHistogram] = {}
+        self._lock = threading.Lock()
+        self._stats = {
+            "requests": 0,
+            "hedged": 0,
+            "hedge_won": 0,
+            "budget_exhausted": 0,
+            "no_worker": 0,
+        }
+        # 已提交且尚未结束的请求数，包括结果会被丢弃的慢请求
+        self._inflight = 0
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="doubao-hedge")
+
+    def histogram(self, key: Hashable) -> RollingHistogram:
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = RollingHistogram(self.window)
+            return histogram
+
+    def observe(self, key: Hashable, response: requests.Response, seconds: Optional[float]):
+        """
+        Record the latency of a request made without hedging.
+
+        Args:
+            seconds: Latency of the single attempt that produced the
+                response, or None when it is not a representative sample
+        """
+        if seconds is not None and _usable(response):
+            self.histogram(key).observe(seconds)
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Requests run, hedges sent, hedges that won, hedges refused by the
+        budget and hedges skipped because every worker was busy
+        """
+        with self._lock:
+            return dict(self._stats)
+
+    def _count(self, name: str):
+        with self._lock:
+            self._stats[name] += 1
+
+    def delay(self, key: Hashable) -> Optional[float]:
+        """Seconds after which a request for this key is hedged, if known"""
+        return self.histogram(key).percentile(self.percentile, self.min_samples)
+
+    def _submit(self, fn: Callable[[], requests.Response]) -> Optional[Future]:
+        """Run ``fn`` on a free worker; None when every worker is busy"""
+        with self._lock:
+            if self._inflight >= self.max_workers:
+                return None
+            self._inflight += 1
+        future = self._executor.submit(fn)
+        future.add_done_callback(self._finished)
+        return future
+
+    def _finished(self, future: Future):
+        with self._lock:
+            self._inflight -= 1
+
+    def run(
+        self, key: Hashable, send: Callable[[], Tuple[requests.Response, Optional[float]]]
+    ) -> Tuple[requests.Response, bool]:
+        """
+        Call ``send`` and hedge it with a second call if it is slow.
+
+        Args:
+            key: Latency key, e.g. (model, size)
+            send: Sends one request and returns its response with the
+                latency of the network attempt, or None when that latency
+                is not a representative sample (e.g. the request was retried)
+
+        Returns:
+            The winning response, and whether it came from the hedge
+
+        Raises:
+            requests.RequestException: if every attempt failed to connect
+        """
+        histogram = self.histogram(key)
+        metrics = get_metrics()
+
+        def attempt() -> requests.Response:
+            response, latency = send()
+            # 只统计正常响应，快速失败的请求会压低分位数
+            if latency is not None and _usable(response):
+                histogram.observe(latency)
+            return response
+
+        self._count("requests")
+        self.budget.earn()
+        delay = histogram.percentile(self.percentile, self.min_samples)
+        started = threading.Event()
+        start_time: List[float] = []
+
+        def primary_attempt() -> requests.Response:
+            start_time.append(time.monotonic())
+            started.set()
+            return attempt()
+
+        primary = None if delay is None else self._submit(primary_attempt)
+        if primary is None:
+            # 样本不足或线程池已满，不对冲，直接在当前线程发送
+            return attempt(), False
+        # 从线程真正开始发送时计时，排队时间不算作请求慢
+        started.wait()
+        remaining = start_time[0] + delay - time.monotonic()
+        if wait([primary], timeout=max(0.0, remaining)).done:
+            return primary.result(), False
+        if not self.budget.spend():
+            self._count("budget_exhausted")
+            metrics.inc("doubao_hedged_requests_total", outcome="budget_exhausted")
+            return primary.result(), False
+
+        hedge = self._submit(attempt)
+        if hedge is None:
+            self._count("no_worker")
+            metrics.inc("doubao_hedged_requests_total", outcome="no_worker")
+            return primary.result(), False
+        self._count("hedged")
+        attempts = (primary, hedge)
+        fallback: Optional[requests.Response] = None
+        error: Optional[requests.RequestException] = None
+        for future in as_completed(attempts):
+            try:
+                response = future.result()
+            except requests.RequestException as e:
+                error = e
+                continue
+            if _usable(response):
+                for other in attempts:
+                    if other is not future:
+                        # 较慢的请求无法中断，返回后立即丢弃
+                        other.add_done_callback(_discard)
+                won = future is hedge
+                if won:
+                    self._count("hedge_won")
+                metrics.inc("doubao_hedged_requests_total", outcome="hedge_won" if won else "primary_won")
+                return response, won
+            # 失败的响应先保留，等另一个请求的结果
+            if fallback is not None:
+                fallback.close()
+            fallback = response
+        metrics.inc("doubao_hedged_requests_total", outcome="both_failed")
+        if fallback is not None:
+            return fallback, False
+        raise error
+
+
+def _usable(response: requests.Response) -> bool:
+    """A response worth returning instead of waiting for the other attempt"""
+    return response.status_code < 500 and response.status_code != 429
+
+
+def _discard(future: Future):
+    try:
+        future.result().close()
+    except Exception:
+        pass
+
+
+_hedger: Optional[Hedger] = None
+_hedger_lock = threading.Lock()
+
+
+def get_hedger() -> Hedger:
+    """Return the shared hedger, creating it on first use"""
+    global _hedger
+    if _hedger is None:
+        with _hedger_lock:
+            if _hedger is None:
+                _hedger = Hedger()
+    return _hedger
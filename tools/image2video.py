@@ -1,27 +1,24 @@
-import time
-import base64
-import traceback
+import logging
 from collections.abc import Generator
 from typing import Any, Union
-import requests
+from tools.doubao_app import DEFAULT_BASE_URLS, DEFAULT_BATCH_WORKERS, DoubaoApp
+from tools.file_fetcher import ImageFetchError, get_default_fetcher
+from tools.image_preprocess import PreprocessedImage, get_default_preprocessor, image_dimensions
+from tools.memory_budget import MemoryBudgetTimeout, Reservation, get_memory_budget, upload_image_footprint
+from tools.metrics import Trace, get_metrics
+from tools.progress import PROGRESS_CHECK_INTERVAL, ProgressReporter
+from tools.streaming_body import IMAGE_PLACEHOLDER
+from tools.task_poller import DEFAULT_DEADLINE
+from tools.video_cache import DEFAULT_VIDEO_OUTPUT, VIDEO_OUTPUTS
+from tools.video_delivery import VideoDelivery
+from tools.video_task import VideoTask, VideoTaskError
 from dify_plugin.entities.tool import ToolInvokeMessage
 from dify_plugin import Tool
 
+logger = logging.getLogger(__name__)
 
-class Image2VideoTool(Tool):
-    def _encode_image(self, file_data):
-        """将图片文件编码为base64"""
-        try:
-            # 记录图片大小
-            image_size = len(file_data) / 1024  # KB
-            encoded = base64.b64encode(file_data).decode("utf-8")
-            encoded_size = len(encoded) / 1024  # KB
-            debug_info = f"图片编码完成: 原始大小={image_size:.2f}KB, 编码后大小={encoded_size:.2f}KB"
-            return encoded, debug_info
-        except Exception as e:
-            stack_trace = traceback.format_exc()
-            raise Exception(f"图片编码失败: {str(e)}\n堆栈跟踪: {stack_trace}")
 
+class Image2VideoTool(Tool):
     def _invoke(
         self, tool_parameters: dict
     ) -> Generator[ToolInvokeMessage, None, None]:
@@ -34,13 +31,28 @@ class Image2VideoTool(Tool):
                 - image (file): Image file to be used for video generation
                 - duration (str): Video duration in seconds
                 - ratio (str): Aspect ratio (e.g., "16:9")
+                - variants (str): Extra "prompt | duration" lines,
+                  generated from the same image in one batch
         
         Returns:
             Generator[ToolInvokeMessage, None, None]: Messages including video generation progress and final video URL
         """
-        # 获取API key
-        api_key = self.runtime.credentials.get("api_key")
-        base_url = "https://ark.cn-beijing.volces.com/api/v3"
+        trace = get_metrics().trace("image2video")
+        admission = get_memory_budget().reservation()
+        try:
+            yield from self._generate(tool_parameters, trace, admission)
+        finally:
+            admission.release()
+            trace.finish()
+
+    def _generate(
+        self, tool_parameters: dict, trace: Trace, admission: Reservation
+    ) -> Generator[ToolInvokeMessage, None, None]:
+        # 初始化客户端（共享连接池）
+        client = DoubaoApp(
+            api_key=self.runtime.credentials.get("api_key"),
+            base_url=DEFAULT_BASE_URLS,
+        )
         
         # 获取参数
         prompt = tool_parameters.get("prompt", "")
@@ -53,205 +65,292 @@ class Image2VideoTool(Tool):
         if not image_file:
             yield self.create_text_message("请上传图片文件")
             return
+
+        # 进度输出方式：text / json / quiet
+        progress = ProgressReporter(self, tool_parameters.get("progress_mode"))
+        # 视频返回方式：url / blob / local
+        video_output = tool_parameters.get("video_output")
+        if video_output not in VIDEO_OUTPUTS:
+            video_output = DEFAULT_VIDEO_OUTPUT
+        delivery = VideoDelivery(self, client, video_output, trace, admission)
         
+        ratio = tool_parameters.get("ratio", "16:9")
+        duration = tool_parameters.get("duration", "5")
+
+        # 批量参数：额外变体，每行一个“提示词 | 时长”，时长可省略；比例始终为 adaptive
+        variants = [self._build_prompt(prompt, duration, ratio)]
+        for line in (tool_parameters.get("variants") or "").splitlines():
+            fields = [field.strip() for field in line.split("|")]
+            if fields[0]:
+                variants.append(self._build_prompt(
+                    fields[0],
+                    fields[1] if len(fields) > 1 and fields[1] else duration,
+                    ratio,
+                ))
+
         # 处理图片文件
         try:
-            # 处理不同类型的图片输入
-            file_content = None
-            
-            # 检查文件类型并获取文件内容
-            if hasattr(image_file, 'url') and image_file.url:
-                # 如果文件是通过URL提供的
-                file_url = image_file.url
-                yield self.create_text_message(f"正在从URL获取图片: {file_url[:30]}...")
-                try:
-                    response = requests.get(file_url, timeout=60)
-                    response.raise_for_status()
-                    file_content = response.content
-                    yield self.create_text_message(f"成功下载图片: 大小={len(file_content)/1024:.2f}KB")
-                except Exception as e:
-                    yield self.create_text_message(f"从URL下载图片失败: {str(e)}")
-                    return
-            
-            # 如果URL下载失败或没有URL，尝试其他方法
-            if file_content is None and hasattr(image_file, 'blob'):
-                try:
-                    file_content = image_file.blob
-                    yield self.create_text_message(f"从blob属性获取文件数据: 大小={len(image_file.blob)/1024:.2f}KB")
-                except Exception as e:
-                    yield self.create_text_message(f"获取blob属性失败: {str(e)}")
-            
-            # 尝试从read方法获取
-            if file_content is None and hasattr(image_file, 'read'):
-                try:
-                    file_content = image_file.read()
-                    yield self.create_text_message("从可读对象获取文件数据")
-                    # 如果是文件对象，可能需要重置文件指针
-                    if hasattr(image_file, 'seek'):
-                        image_file.seek(0)
-                except Exception as e:
-                    yield self.create_text_message(f"从read方法获取文件数据失败: {str(e)}")
-            
-            # 尝试作为文件路径处理
-            if file_content is None and isinstance(image_file, str):
-                try:
-                    with open(image_file, 'rb') as f:
-                        file_content = f.read()
-                    yield self.create_text_message(f"从文件路径获取文件数据: {image_file}, 大小={len(file_content)/1024:.2f}KB")
-                except (TypeError, IOError) as e:
-                    yield self.create_text_message(f"从文件路径获取文件数据失败: {str(e)}")
-            
-            # 尝试本地文件缓存方式
-            if file_content is None and hasattr(image_file, 'path'):
-                try:
-                    with open(image_file.path, 'rb') as f:
-                        file_content = f.read()
-                    yield self.create_text_message(f"从本地缓存路径获取文件数据: {image_file.path}, 大小={len(file_content)/1024:.2f}KB")
-                except (TypeError, IOError) as e:
-                    yield self.create_text_message(f"从本地缓存路径获取文件数据失败: {str(e)}")
-            
-            # 如果所有方法都失败
-            if file_content is None:
-                yield self.create_text_message("无法获取图片数据。请尝试重新上传图片或使用较小的图片文件")
+            # 获取图片内容：优先本地来源，URL 下载经过本地缓存
+            try:
+                with trace.stage("image_fetch"):
+                    fetched = get_default_fetcher().acquire(image_file)
+            except ImageFetchError as e:
+                trace.set(outcome="error", error=str(e))
+                yield self.create_text_message(f"无法获取图片数据: {str(e)}。请尝试重新上传图片或使用较小的图片文件")
                 return
-            
-            # 编码图片数据为base64
+            file_content = fetched.data
+            trace.size("image_input", len(file_content))
+            trace.set(image_source=fetched.source, image_cached=fetched.cached)
+            cache_text = "（命中缓存）" if fetched.cached else ""
+            yield from progress.step(f"已获取图片: 来源={fetched.source}{cache_text}, 大小={len(file_content)/1024:.2f}KB")
+
+            # 预占预处理与上传所需的内存额度，额度不足时排队；批量任务另需共享的 base64 副本
             try:
-                encoded_image, encoding_debug = self._encode_image(file_content)
-                yield self.create_text_message(encoding_debug)
-                
-                # 构建图片URL (豆包API需要可访问的URL或base64数据)
-                image_data_url = f"data:image/jpeg;base64,{encoded_image}"
-            except Exception as e:
-                yield self.create_text_message(f"图片编码失败: {str(e)}")
+                with trace.stage("admission"):
+                    admission.charge(upload_image_footprint(
+                        len(file_content), image_dimensions(file_content), encoded=len(variants) > 1
+                    ))
+            except MemoryBudgetTimeout as e:
+                trace.set(outcome="error", error=str(e))
+                yield self.create_text_message(f"服务繁忙，请稍后再试: {str(e)}")
                 return
+            
+            # 预处理：识别真实格式，缩放到模型实际使用的分辨率并重新压缩
+            with trace.stage("preprocess"):
+                prepared_image = get_default_preprocessor().process(file_content, "adaptive")
+            trace.size("image_upload", len(prepared_image.data))
+            if prepared_image.data is not file_content:
+                yield from progress.step(
+                    f"图片预处理完成: 原始大小={prepared_image.original_size/1024:.2f}KB, "
+                    f"处理后大小={len(prepared_image.data)/1024:.2f}KB, 尺寸={prepared_image.width}x{prepared_image.height}"
+                )
                 
         except Exception as e:
-            stack_trace = traceback.format_exc()
-            yield self.create_text_message(f"处理图片文件失败: {str(e)}\n堆栈跟踪:\n{stack_trace}")
+            trace.set(outcome="error", error=str(e))
+            # 堆栈只写入插件日志，不发送给用户
+            logger.exception("processing the image2video input failed")
+            yield self.create_text_message(f"处理图片文件失败: {str(e)}")
             return
         
-        # 获取比例
-        ratio = tool_parameters.get("ratio", "16:9")
-        # 添加比例参数到提示词
-        if ratio and not "--ratio" in prompt:
-            prompt = f"{prompt} --ratio adaptive"  # 始终使用adaptive而不是用户选择的ratio值
-        
-        # 获取时长
-        duration = tool_parameters.get("duration", "5")
-        # 添加时长参数到提示词
-        if duration and not "--duration" in prompt and not "--dur" in prompt:
-            prompt = f"{prompt} --duration {duration}"
-        
         # 使用图生视频模型
         model = "doubao-seedance-1-0-lite-i2v-250428"
         
+        # 最长等待时间（秒）
+        max_wait = float(tool_parameters.get("max_wait") or DEFAULT_DEADLINE)
+        # 仅提交任务，不等待结果
+        submit_only = bool(tool_parameters.get("submit_only", False))
+        # 复用相同请求已生成的视频，默认关闭，每次调用都重新生成
+        reuse_result = bool(tool_parameters.get("reuse_result", False))
+
+        if len(variants) > 1:
+            batch = self._invoke_batch(
+                client,
+                trace,
+                progress,
+                model,
+                variants,
+                prepared_image,
+                max_workers=int(tool_parameters.get("max_concurrency") or DEFAULT_BATCH_WORKERS),
+                max_wait=max_wait,
+                submit_only=submit_only,
+                delivery=delivery,
+                admission=admission,
+            )
+            # 图片只由批量任务持有，全部提交后即可释放
+            del fetched, file_content, prepared_image
+            yield from batch
+            return
+        prompt = variants[0]
+        
         try:
             # 显示正在使用的模型
-            yield self.create_text_message("正在使用豆包 Seedance 图生视频模型生成视频...")
-            
-            # 设置请求头
-            headers = {
-                "Content-Type": "application/json",
-                "Authorization": f"Bearer {api_key}"
-            }
-            
-            # 创建请求内容
-            content = [
-                {
-                    "type": "text",
-                    "text": prompt
-                },
-                {
-                    "type": "image_url",
-                    "image_url": {
-                        "url": image_data_url
-                    }
-                }
-            ]
+            yield from progress.step("正在使用豆包 Seedance 图生视频模型创建视频生成任务...")
             
-            # 请求数据
-            request_data = {
-                "model": model,
-                "content": content
-            }
-            
-            # 发送请求
-            yield self.create_text_message("正在创建视频生成任务...")
-            
-            response = requests.post(
-                f"{base_url}/contents/generations/tasks",
-                headers=headers,
-                json=request_data
-            )
+            # 发送请求：图片在发送时分块编码为base64，不在内存中保留完整的编码副本
+            # 上传与 base64 编码在发送请求时流式进行，计入该阶段
+            with trace.stage("task_create"):
+                task_id = client.create_video_task(
+                    model,
+                    self._content(prompt),
+                    image=prepared_image.data,
+                    mime_type=prepared_image.mime_type,
+                    reuse_result=reuse_result,
+                )
+            trace.set(task_id=task_id, model=model)
+            # 图片已上传：释放内存额度并丢弃引用，等待期间不再占用
+            admission.release()
+            del fetched, file_content, prepared_image
             
-            if response.status_code != 200:
-                yield self.create_text_message(f"创建视频生成任务失败，状态码: {response.status_code}, 错误信息: {response.text}")
-                return
-                
-            # 获取任务ID
-            response_json = response.json()
-            task_id = response_json.get("id")
-            if not task_id:
-                yield self.create_text_message("创建视频生成任务失败，未获取到任务ID")
+            # 仅提交模式：立即返回任务ID，由 video_task_status 工具获取结果
+            if submit_only:
+                yield self.create_text_message(f"视频生成任务已提交，任务ID: {task_id}。请使用“视频任务状态”工具查询结果")
+                yield self.create_json_message({
+                    "task_id": task_id,
+                    "status": "submitted",
+                    "model": model
+                })
                 return
                 
             # 显示任务信息
-            yield self.create_text_message(f"视频生成任务已创建，任务ID: {task_id}")
-            yield self.create_text_message(f"提示词: {prompt}")
-            yield self.create_text_message("正在等待视频生成完成...")
-            
-            # 轮询查询任务状态，直到完成或失败
-            max_retries = 60  # 最大重试次数，防止无限等待
-            retry_count = 0
-            video_url = None
+            yield from progress.step(f"视频生成任务已创建，任务ID: {task_id}，等待视频生成完成...")
             
-            while retry_count < max_retries:
-                # 等待一段时间再查询
-                time.sleep(5)
-                
-                # 查询任务状态
-                task_response = requests.get(
-                    f"{base_url}/contents/generations/tasks/{task_id}",
-                    headers=headers
-                )
-                
-                if task_response.status_code != 200:
-                    yield self.create_text_message(f"查询视频生成任务失败，状态码: {task_response.status_code}, 错误信息: {task_response.text}")
-                    return
-                    
-                task_data = task_response.json()
-                
-                # 检查任务状态
-                status = task_data.get("status")
-                
-                if status == "succeeded":
-                    # 任务成功，获取视频URL
-                    video_url = task_data.get("content", {}).get("video_url")
-                    break
-                elif status == "failed":
-                    # 任务失败
-                    error_message = task_data.get("error", {}).get("message", "未知错误")
-                    yield self.create_text_message(f"视频生成任务失败: {error_message}")
-                    return
-                elif status == "canceled":
-                    # 任务被取消
-                    yield self.create_text_message("视频生成任务已被取消")
-                    return
-                
-                # 继续等待
-                yield self.create_text_message(f"视频正在生成中，已等待 {(retry_count + 1) * 5} 秒...")
-                retry_count += 1
-            
-            # 检查是否获取到视频URL
-            if video_url:
-                yield self.create_text_message("视频生成成功！")
-                # 直接显示视频
-                yield self.create_image_message(video_url)
-                yield self.create_text_message("上方视频链接有效期为24小时。如需保存，请在此期间内下载视频文件。")
-            else:
-                yield self.create_text_message("视频生成超时或失败，请稍后再试")
+            # 等待任务完成
+            # 由进程级调度器统一轮询，本调用只等待结果
+            handle = client.watch_task(task_id, model, deadline=max_wait)
+            with trace.stage("task_wait"):
+                # 以本次调用的 max_wait 为界，调度器停滞时也不会无限等待
+                for _ in handle.wait_steps(max_wait, PROGRESS_CHECK_INTERVAL):
+                    yield from progress.update(
+                        task_id, handle.status, handle.poller.elapsed, handle.poller.eta()
+                    )
+            trace.set(polls=handle.poller.polls, progress_messages=progress.sent)
+            task = handle.result()
+            trace.set(
+                status=task.status,
+                outcome="ok" if task.succeeded else (task.status if task.finished else "timeout"),
+            )
+            yield from self._emit_task(delivery, task, max_wait)
         
+        except VideoTaskError as e:
+            trace.set(outcome="error", error=str(e))
+            yield self.create_text_message(str(e))
         except Exception as e:
             # 处理异常
+            trace.set(outcome="error", error=str(e))
             yield self.create_text_message(f"生成视频时出错: {str(e)}")
+
+    def _invoke_batch(
+        self,
+        client: DoubaoApp,
+        trace: Trace,
+        progress: ProgressReporter,
+        model: str,
+        prompts: list[str],
+        prepared_image: PreprocessedImage,
+        max_workers: int,
+        max_wait: float,
+        submit_only: bool,
+        delivery: VideoDelivery,
+        admission: Reservation,
+    ) -> Generator[ToolInvokeMessage, None, None]:
+        """
+        Animate one image with several prompts and stream each video as
+        its task finishes.
+
+        The image and its upload memory are released once every task has
+        been submitted, not after the wait.
+        """
+        total = len(prompts)
+        succeeded = 0
+        task_ids: dict[int, str] = {}
+        done: set[int] = set()
+        trace.set(model=model, videos=total)
+        try:
+            yield from progress.step(f"正在使用豆包 Seedance 图生视频模型批量创建 {total} 个视频生成任务...")
+
+            # 图片只编码一次，各任务并发提交、一起等待，按完成顺序返回
+            events = client.run_video_tasks(
+                model,
+                [self._content(prompt) for prompt in prompts],
+                image=prepared_image.data,
+                mime_type=prepared_image.mime_type,
+                max_workers=max_workers,
+                deadline=max_wait,
+                heartbeat=PROGRESS_CHECK_INTERVAL,
+                wait=not submit_only,
+            )
+            del prepared_image
+            with trace.stage("task_wait"):
+                for event in events:
+                    if event["event"] == "submitted":
+                        # 全部任务已提交：释放上传所需的内存额度，等待期间不再占用
+                        admission.release()
+                        continue
+                    if event["event"] == "waiting":
+                        unfinished = [task_ids[i] for i in sorted(task_ids) if i not in done]
+                        yield from progress.update(
+                            ",".join(unfinished), f"剩余 {event['pending']}/{total} 个", event["elapsed"]
+                        )
+                        continue
+                    number = event["index"] + 1
+                    if event["event"] != "created":
+                        done.add(event["index"])
+                    if event["event"] == "error":
+                        yield self.create_text_message(f"第 {number} 个视频生成出错: {event['error']}")
+                    elif event["event"] == "created":
+                        task_ids[event["index"]] = event["task_id"]
+                        if submit_only:
+                            succeeded += 1
+                            yield self.create_json_message({
+                                "index": event["index"],
+                                "task_id": event["task_id"],
+                                "status": "submitted",
+                                "model": model
+                            })
+                        else:
+                            yield from progress.step(f"第 {number} 个视频生成任务已创建，任务ID: {event['task_id']}")
+                    else:
+                        task = event["task"]
+                        yield self.create_text_message(f"第 {number} 个视频（任务ID: {event['task_id']}）：")
+                        if task.succeeded:
+                            succeeded += 1
+                        yield from self._emit_task(delivery, task, max_wait)
+
+            trace.set(task_ids=[task_ids[i] for i in sorted(task_ids)], succeeded=succeeded)
+            if succeeded < total:
+                trace.set(outcome="partial" if succeeded else "error")
+            if submit_only:
+                yield self.create_text_message(f"已提交 {succeeded}/{total} 个视频生成任务。请使用“视频任务状态”工具查询结果")
+            else:
+                yield self.create_text_message(f"批量生成完成：成功 {succeeded}/{total} 个视频")
+
+        except Exception as e:
+            # 处理异常
+            trace.set(outcome="error", error=str(e))
+            yield self.create_text_message(f"批量生成视频时出错: {str(e)}")
+
+    @staticmethod
+    def _build_prompt(prompt: str, duration: str, ratio: str) -> str:
+        """Append the ratio and duration flags unless the prompt sets them"""
+        # 添加比例参数到提示词
+        if ratio and not "--ratio" in prompt:
+            prompt = f"{prompt} --ratio adaptive"  # 始终使用adaptive而不是用户选择的ratio值
+        # 添加时长参数到提示词
+        if duration and not "--duration" in prompt and not "--dur" in prompt:
+            prompt = f"{prompt} --duration {duration}"
+        return prompt
+
+    @staticmethod
+    def _content(prompt: str) -> list[dict[str, Any]]:
+        # 创建请求内容
+        return [
+            {
+                "type": "text",
+                "text": prompt
+            },
+            {
+                "type": "image_url",
+                "image_url": {
+                    # 豆包API需要可访问的URL或base64数据，发送时替换为data URL
+                    "url": IMAGE_PLACEHOLDER
+                }
+            }
+        ]
+
+    def _emit_task(
+        self, delivery: VideoDelivery, task: VideoTask, max_wait: float
+    ) -> Generator[ToolInvokeMessage, None, None]:
+        """Yield the messages for one finished or timed-out task"""
+        task_id = task.id
+        # 检查任务状态
+        if task.status == "failed":
+            yield self.create_text_message(f"视频生成任务失败: {task.error or '未知错误'}")
+        elif task.status == "canceled":
+            yield self.create_text_message("视频生成任务已被取消")
+        elif task.succeeded:
+            yield self.create_text_message("视频生成成功！")
+            yield from delivery.emit(task_id, task.video_url, task.model)
+        elif not task.finished:
+            yield self.create_text_message(f"等待视频生成超时（{max_wait:.0f} 秒），任务 {task_id} 可能仍在生成中，请稍后再试")
+        else:
+            yield self.create_text_message("视频生成失败，未获取到视频链接")
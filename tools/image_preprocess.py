@@ -0,0 +1,238 @@
+import hashlib
+import io
+import os
+import threading
+from collections import OrderedDict
+from typing import NamedTuple, Optional, Tuple
+
+DEFAULT_JPEG_QUALITY = int(os.environ.get("DOUBAO_I2V_JPEG_QUALITY", "90"))
+# 超过该大小的图片即使无需缩放也尝试重新压缩
+DEFAULT_RECOMPRESS_BYTES = int(os.environ.get("DOUBAO_I2V_RECOMPRESS_BYTES", str(2 * 1024 * 1024)))
+DEFAULT_CACHE_BYTES = int(os.environ.get("DOUBAO_I2V_PREPROCESS_CACHE_BYTES", str(64 * 1024 * 1024)))
+
+# Seedance 图生视频各宽高比的最大输出分辨率（宽, 高）
+OUTPUT_RESOLUTIONS = {
+    "16:9": (1248, 704),
+    "4:3": (1120, 832),
+    "1:1": (960, 960),
+    "3:4": (832, 1120),
+    "9:16": (704, 1248),
+    "21:9": (1504, 640),
+}
+
+_SIGNATURES = (
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+    (b"BM", "image/bmp"),
+    (b"II*\x00", "image/tiff"),
+    (b"MM\x00*", "image/tiff"),
+)
+
+
+def sniff_mime(data: bytes, default: str = "image/jpeg") -> str:
+    """
+    Detect an image's MIME type from its magic bytes.
+
+    Args:
+        data: Image bytes (only the first few bytes are inspected)
+        default: Type returned when the format is not recognized
+
+    Returns:
+        MIME type such as "image/png"
+    """
+    head = bytes(data[:16])
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    if head[4:8] == b"ftyp" and head[8:12] in (b"heic", b"heix", b"mif1"):
+        return "image/heic"
+    for signature, mime_type in _SIGNATURES:
+        if head.startswith(signature):
+            return mime_type
+    return default
+
+
+def image_dimensions(data: bytes) -> Optional[Tuple[int, int]]:
+    """
+    Width and height of an image, read from its header without decoding.
+
+    Returns:
+        (width, height), or None without Pillow or for unreadable images
+    """
+    try:
+        from PIL import Image
+    except ImportError:
+        return None
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            return image.size
+    except Exception:
+        return None
+
+
+def target_resolution(width: int, height: int, ratio: str = "adaptive") -> Tuple[int, int]:
+    """
+    Largest output resolution the model renders for an input image.
+
+    With "adaptive" the closest supported aspect ratio to the image is used.
+    """
+    if ratio in OUTPUT_RESOLUTIONS:
+        return OUTPUT_RESOLUTIONS[ratio]
+    aspect = width / height
+    return min(
+        OUTPUT_RESOLUTIONS.values(),
+        key=lambda size: abs(size[0] / size[1] - aspect),
+    )
+
+
+def _flatten(image):
+    """
+    Convert to RGB, compositing transparent pixels onto white.
+
+    A plain convert("RGB") drops the alpha channel, which turns the
+    transparent background of e.g. product PNGs black or noisy in the JPEG.
+    """
+    from PIL import Image
+
+    if image.mode == "P" and "transparency" in image.info:
+        image = image.convert("RGBA")
+    if image.mode in ("RGBA", "LA", "PA"):
+        image = image.convert("RGBA")
+        background = Image.new("RGBA", image.size, (255, 255, 255, 255))
+        return Image.alpha_composite(background, image).convert("RGB")
+    return image.convert("RGB")
+
+
+class PreprocessedImage(NamedTuple):
+    data: bytes
+    mime_type: str
+    original_size: int
+    width: Optional[int] = None
+    height: Optional[int] = None
+    resized: bool = False
+
+
+class ImagePreprocessor:
+    """
+    Shrinks images before upload to the size the i2v model actually uses.
+
+    The image is scaled down, never up, until it just covers the model's
+    output resolution, then re-encoded as JPEG. Results are cached by content
+    hash so repeated inputs skip the work. Without Pillow installed the image
+    is passed through with its sniffed MIME type.
+    """
+
+    def __init__(
+        self,
+        quality: int = DEFAULT_JPEG_QUALITY,
+        recompress_bytes: int = DEFAULT_RECOMPRESS_BYTES,
+        cache_bytes: int = DEFAULT_CACHE_BYTES,
+    ):
+        """
+        Args:
+            quality: JPEG quality used when re-encoding
+            recompress_bytes: Re-encode images larger than this even if no
+                resize is needed
+            cache_bytes: Maximum total size of cached results
+        """
+        self.quality = quality
+        self.recompress_bytes = recompress_bytes
+        self.cache_bytes = cache_bytes
+        self._cache: "OrderedDict[str, PreprocessedImage]" = OrderedDict()
+        self._cached_bytes = 0
+        self._lock = threading.Lock()
+
+    def process(self, data: bytes, ratio: str = "adaptive") -> PreprocessedImage:
+        """
+        Downscale and re-encode an image for upload.
+
+        Args:
+            data: Raw image bytes
+            ratio: Requested aspect ratio, or "adaptive"
+
+        Returns:
+            The image to upload; the original bytes when nothing is gained
+        """
+        key = hashlib.sha256(data).hexdigest() + f":{ratio}:{self.quality}"
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                return cached
+
+        result = self._process(data, ratio)
+
+        with self._lock:
+            # 原样返回的图片不缓存，避免重复占用调用方已持有的内存
+            if (
+                result.data is not data
+                and key not in self._cache
+                and len(result.data) <= self.cache_bytes
+            ):
+                self._cache[key] = result
+                self._cached_bytes += len(result.data)
+                while self._cached_bytes > self.cache_bytes:
+                    _, evicted = self._cache.popitem(last=False)
+                    self._cached_bytes -= len(evicted.data)
+        return result
+
+    def _process(self, data: bytes, ratio: str) -> PreprocessedImage:
+        mime_type = sniff_mime(data)
+        original = PreprocessedImage(data, mime_type, len(data))
+        try:
+            from PIL import Image, ImageOps
+        except ImportError:
+            return original
+
+        try:
+            with Image.open(io.BytesIO(data)) as image:
+                width, height = image.size
+                # EXIF 方向为 5-8 时图片需旋转 90 度，宽高互换
+                if image.getexif().get(0x0112) in (5, 6, 7, 8):
+                    width, height = height, width
+                original = original._replace(width=width, height=height)
+                target_width, target_height = target_resolution(width, height, ratio)
+                # 缩放到刚好覆盖目标分辨率，服务端会再裁剪到输出尺寸
+                scale = max(target_width / width, target_height / height)
+                if scale >= 1 and len(data) <= self.recompress_bytes:
+                    return original
+
+                image = ImageOps.exif_transpose(image)
+                if scale < 1:
+                    new_size = (max(1, round(width * scale)), max(1, round(height * scale)))
+                    image = image.resize(new_size, Image.LANCZOS)
+                if image.mode != "RGB":
+                    image = _flatten(image)
+
+                output = io.BytesIO()
+                image.save(output, format="JPEG", quality=self.quality, optimize=True)
+        except Exception:
+            # 无法解析的图片原样上传，由服务端判断
+            return original
+
+        encoded = output.getvalue()
+        if len(encoded) >= len(data) and scale >= 1:
+            return original
+        return PreprocessedImage(
+            encoded,
+            "image/jpeg",
+            len(data),
+            image.width,
+            image.height,
+            resized=scale < 1,
+        )
+
+
+_default_preprocessor: Optional[ImagePreprocessor] = None
+_default_preprocessor_lock = threading.Lock()
+
+
+def get_default_preprocessor() -> ImagePreprocessor:
+    """Return the shared preprocessor, creating it on first use"""
+    global _default_preprocessor
+    if _default_preprocessor is None:
+        with _default_preprocessor_lock:
+            if _default_preprocessor is None:
+                _default_preprocessor = ImagePreprocessor()
+    return _default_preprocessor
@@ -0,0 +1,277 @@
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+from tools.metrics import get_metrics
+from tools.task_journal import account_key
+
+# 连续失败达到该次数后熔断
+DEFAULT_BREAKER_FAILURES = int(os.environ.get("DOUBAO_BREAKER_FAILURES", "5"))
+# 近期错误率（指数加权）超过该比例后熔断
+DEFAULT_BREAKER_ERROR_RATE = float(os.environ.get("DOUBAO_BREAKER_ERROR_RATE", "0.5"))
+# 熔断后暂停使用的秒数，之后放行一个试探请求
+DEFAULT_BREAKER_COOLDOWN = float(os.environ.get("DOUBAO_BREAKER_COOLDOWN", "30"))
+
+# 错误率与延迟的指数加权系数；样本数不足时不按错误率熔断
+_EWMA_ALPHA = 0.2
+_MIN_SAMPLES = 10
+# 记录任务所属成员的数量上限
+_MAX_PINNED_TASKS = 10000
+
+# 这些状态码说明密钥或端点本身有问题（鉴权失败、限流、服务端错误）
+UNHEALTHY_STATUS_CODES = frozenset({401, 403, 429, 500, 502, 503, 504})
+
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half_open"
+
+
+def split_values(value: Union[str, Sequence[str], None]) -> List[str]:
+    """
+    Split a comma- or newline-separated credential or URL list.
+
+    Sequences are accepted as they are; blanks and duplicates are dropped
+    and the order is kept.
+    """
+    if value is None:
+        return []
+    items = re.split(r"[,\n]", value) if isinstance(value, str) else value
+    result: List[str] = []
+    for item in items:
+        item = (item or "").strip()
+        if item and item not in result:
+            result.append(item)
+    return result
+
+
+class PoolMember:
+    """
+    One API key on one endpoint, with its load and health.
+
+    All fields are guarded by the owning pool's lock.
+    """
+
+    def __init__(self, api_key: str, base_url: str):
+        self.api_key = api_key
+        self.base_url = base_url
+        self.account = account_key(api_key, base_url)
+        self.outstanding = 0
+        self.latency: Optional[float] = None
+        self.error_rate = 0.0
+        self.samples = 0
+        self.consecutive_failures = 0
+        self.state = STATE_CLOSED
+        self.open_until = 0.0
+        self.probing = False
+
+    @property
+    def label(self) -> str:
+        """Short identifier for logs and metrics that does not reveal the key"""
+        return self.account[:8]
+
+    def __repr__(self) -> str:
+        return f"PoolMember({self.label}, {self.base_url}, {self.state})"
+
+
+class KeyPool:
+    """
+    Routes requests across several API keys and endpoints.
+
+    Each request goes to the healthy member with the fewest requests in
+    flight, ties broken by lower recent latency. A member whose requests
+    keep failing (connection errors, 401/403, 429 or 5xx) is taken out of
+    rotation for a cooldown; afterwards one probe request decides whether
+    it comes back. When every member is out, the one due back first is
+    used rather than failing the call.
+
+    Video tasks only exist for the key that created them, so task IDs are
+    pinned to their member and later polls bypass the balancing.
+    """
+
+    def __init__(
+        self,
+        api_keys: Sequence[str],
+        base_urls: Sequence[str],
+        failure_threshold: int = DEFAULT_BREAKER_FAILURES,
+        error_rate_threshold: float = DEFAULT_BREAKER_ERROR_RATE,
+        cooldown: float = DEFAULT_BREAKER_COOLDOWN,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Args:
+            api_keys: API keys; every key is used on every endpoint
+            base_urls: Ark API base URLs
+            failure_threshold: Consecutive failures that open the breaker
+            error_rate_threshold: Recent error rate that opens the breaker
+            cooldown: Seconds a member stays out of rotation
+            clock: Monotonic clock function
+
+        Raises:
+            ValueError: if no key or no endpoint is given
+        """
+        if not api_keys:
+            raise ValueError("API key is required")
+        if not base_urls:
+            raise ValueError("Base URL is required")
+        self.members = [
+            PoolMember(api_key, base_url) for api_key in api_keys for base_url in base_urls
+        ]
+        self.failure_threshold = failure_threshold
+        self.error_rate_threshold = error_rate_threshold
+        self.cooldown = cooldown
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._by_account = {member.account: member for member in self.members}
+        self._pinned: "OrderedDict[str, PoolMember]" = OrderedDict()
+        # 负载相同时轮流选择，避免总是落在第一个成员上
+        self._next = 0
+
+    @property
+    def account(self) -> str:
+        """Identifies the pool; equal to the member's account for a single key"""
+        if len(self.members) == 1:
+            return self.members[0].account
+        return account_key("\n".join(sorted(m.account for m in self.members)), "pool")
+
+    def member(self, account: str) -> Optional[PoolMember]:
+        return self._by_account.get(account)
+
+    def acquire(
+        self,
+        member: Optional[PoolMember] = None,
+        exclude: Iterable[PoolMember] = (),
+    ) -> PoolMember:
+        """
+        Reserve a member for one request; pair every call with ``release``.
+
+        Args:
+            member: Use this member regardless of its health
+            exclude: Members to avoid if any other is available
+        """
+        with self._lock:
+            if member is None:
+                member = self._choose(set(exclude))
+            if member.state == STATE_HALF_OPEN:
+                member.probing = True
+            member.outstanding += 1
+            return member
+
+    def _choose(self, exclude: set) -> PoolMember:
+        now = self._clock()
+        available = []
+        for member in self.members:
+            if member.state == STATE_OPEN and now >= member.open_until:
+                self._transition(member, STATE_HALF_OPEN)
+            if member.state == STATE_CLOSED or (
+                member.state == STATE_HALF_OPEN and not member.probing
+            ):
+                available.append(member)
+        candidates = [m for m in available if m not in exclude] or available
+        if not candidates:
+            # 全部熔断时使用最早恢复的成员，而不是直接失败
+            return min(self.members, key=lambda m: m.open_until)
+        count = len(self.members)
+        start = self._next
+        self._next = (self._next + 1) % count
+        return min(
+            candidates,
+            key=lambda m: (
+                m.outstanding,
+                m.latency or 0.0,
+                (self.members.index(m) - start) % count,
+            ),
+        )
+
+    def release(self, member: PoolMember, latency: Optional[float], failed: bool):
+        """
+        Return a member after its request and record the outcome.
+
+        Args:
+            member: Member from ``acquire``
+            latency: Seconds the request took, or None if it never completed
+            failed: Whether the outcome counts against the member's health
+        """
+        with self._lock:
+            member.outstanding = max(0, member.outstanding - 1)
+            member.samples += 1
+            member.error_rate += _EWMA_ALPHA * (float(failed) - member.error_rate)
+            if latency is not None:
+                member.latency = (
+                    latency
+                    if member.latency is None
+                    else member.latency + _EWMA_ALPHA * (latency - member.latency)
+                )
+            if not failed:
+                member.consecutive_failures = 0
+                if member.state != STATE_CLOSED:
+                    member.probing = False
+                    member.error_rate = 0.0
+                    member.samples = 0
+                    self._transition(member, STATE_CLOSED)
+                return
+            member.consecutive_failures += 1
+            if member.state == STATE_HALF_OPEN or (
+                member.state == STATE_CLOSED
+                and (
+                    member.consecutive_failures >= self.failure_threshold
+                    or (
+                        member.samples >= _MIN_SAMPLES
+                        and member.error_rate >= self.error_rate_threshold
+                    )
+                )
+            ):
+                member.probing = False
+                member.open_until = self._clock() + self.cooldown
+                self._transition(member, STATE_OPEN)
+
+    def _transition(self, member: PoolMember, state: str):
+        member.state = state
+        get_metrics().inc("doubao_key_pool_transitions_total", member=member.label, state=state)
+
+    def pin(self, task_id: str, member: PoolMember):
+        """Remember which member created a task"""
+        with self._lock:
+            self._pinned[task_id] = member
+            self._pinned.move_to_end(task_id)
+            while len(self._pinned) > _MAX_PINNED_TASKS:
+                self._pinned.popitem(last=False)
+
+    def pinned(self, task_id: str) -> Optional[PoolMember]:
+        """The member that created a task, if known"""
+        with self._lock:
+            return self._pinned.get(task_id)
+
+    def stats(self) -> List[Dict[str, object]]:
+        """Load and health of every member, without the keys"""
+        with self._lock:
+            return [
+                {
+                    "member": m.label,
+                    "base_url": m.base_url,
+                    "state": m.state,
+                    "outstanding": m.outstanding,
+                    "latency": m.latency,
+                    "error_rate": round(m.error_rate, 3),
+                }
+                for m in self.members
+            ]
+
+
+_pools: Dict[Tuple[str, ...], KeyPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_key_pool(api_keys: Sequence[str], base_urls: Sequence[str]) -> KeyPool:
+    """
+    Return the shared pool for these keys and endpoints, creating it on
+    first use, so load and health are tracked across tool invocations
+    """
+    identity = tuple(account_key(k, u) for k in api_keys for u in base_urls)
+    with _pools_lock:
+        pool = _pools.get(identity)
+        if pool is None:
+            pool = _pools[identity] = KeyPool(api_keys, base_urls)
+        return pool
@@ -0,0 +1,218 @@
+import collections
+import os
+import threading
+import time
+from typing import Optional, Tuple
+
+from tools.metrics import get_metrics
+
+# 同时处理中的图片、base64 响应与视频等大块载荷的估算内存上限，0 表示不限制
+DEFAULT_MEMORY_BUDGET = int(os.environ.get("DOUBAO_MEMORY_BUDGET", str(256 * 1024 * 1024)))
+# 等待内存额度的最长秒数，超时后本次调用报错；与 HTTP 读超时的默认值一致，排队不比一次请求更久
+DEFAULT_MEMORY_WAIT = float(os.environ.get("DOUBAO_MEMORY_WAIT", "120"))
+
+# 估算生成图片大小时每像素的字节数（PNG 照片通常低于原始 RGB 的一半）
+GENERATED_BYTES_PER_PIXEL = 1.5
+# 解码后的像素缓冲（RGBA）每像素字节数
+DECODED_BYTES_PER_PIXEL = 4
+_DEFAULT_IMAGE_SIZE = (1024, 1024)
+
+
+class MemoryBudgetTimeout(Exception):
+    """Raised when payload memory did not become available in time"""
+
+
+class MemoryBudget:
+    """
+    Process-wide cap on the estimated memory of large payloads.
+
+    Tool invocations are charged their estimated payload footprint before
+    the heavy work starts and wait in FIFO order while the charge does not
+    fit, so a burst of large requests queues instead of exhausting memory.
+    A charge larger than the whole budget is clamped to it: such a request
+    runs alone rather than never. Waiting callers and charged bytes are
+    exported as gauges.
+    """
+
+    def __init__(self, capacity: int = DEFAULT_MEMORY_BUDGET, timeout: float = DEFAULT_MEMORY_WAIT):
+        """
+        Args:
+            capacity: Bytes that may be charged at once; 0 disables the budget
+            timeout: Seconds a caller waits before MemoryBudgetTimeout
+        """
+        self.capacity = capacity
+        self.timeout = timeout
+        self._in_use = 0
+        self._waiters: "collections.deque[object]" = collections.deque()
+        self._condition = threading.Condition()
+
+    @property
+    def in_use(self) -> int:
+        with self._condition:
+            return self._in_use
+
+    @property
+    def queued(self) -> int:
+        with self._condition:
+            return len(self._waiters)
+
+    def acquire(self, nbytes: int, timeout: Optional[float] = None) -> int:
+        """
+        Charge bytes against the budget, waiting until they fit.
+
+        Args:
+            nbytes: Estimated footprint
+            timeout: Seconds to wait; defaults to the budget's timeout
+
+        Returns:
+            The bytes actually charged, to be passed to ``release``
+
+        Raises:
+            MemoryBudgetTimeout: if the charge did not fit in time
+        """
+        if self.capacity <= 0 or nbytes <= 0:
+            return 0
+        charge = min(int(nbytes), self.capacity)
+        timeout = self.timeout if timeout is None else timeout
+        start = time.monotonic()
+        ticket = object()
+        with self._condition:
+            self._waiters.append(ticket)
+            try:
+                # 只放行队首，避免大请求被源源不断的小请求饿死
+                while self._waiters[0] is not ticket or self._in_use + charge > self.capacity:
+                    self._update_gauges()
+                    remaining = timeout - (time.monotonic() - start)
+                    if remaining <= 0:
+                        raise MemoryBudgetTimeout(
+                            f"waited {timeout:g}s for {charge} bytes of payload memory "
+                            f"({self._in_use}/{self.capacity} in use)"
+                        )
+                    self._condition.wait(remaining)
+                self._in_use += charge
+            finally:
+                self._waiters.remove(ticket)
+                # 队首变化后唤醒其余等待者重新检查
+                self._condition.notify_all()
+                self._update_gauges()
+        get_metrics().observe("doubao_memory_budget_wait_seconds", time.monotonic() - start)
+        return charge
+
+    def release(self, charge: int):
+        """Return bytes obtained from ``acquire``"""
+        if not charge:
+            return
+        with self._condition:
+            self._in_use = max(0, self._in_use - charge)
+            self._condition.notify_all()
+            self._update_gauges()
+
+    def reservation(self) -> "Reservation":
+        """An empty per-invocation account; see Reservation"""
+        return Reservation(self)
+
+    def reserve(self, nbytes: int) -> "Reservation":
+        """A reservation already charged ``nbytes``, for use in a with block"""
+        reservation = Reservation(self)
+        reservation.charge(nbytes)
+        return reservation
+
+    def _update_gauges(self):
+        metrics = get_metrics()
+        metrics.gauge("doubao_memory_budget_in_use_bytes", self._in_use)
+        metrics.gauge("doubao_memory_budget_queue_depth", len(self._waiters))
+
+
+class Reservation:
+    """
+    The payload memory one tool invocation currently holds.
+
+    ``charge`` replaces the held amount. Growing it gives the current bytes
+    back before queueing for the new total, so an invocation never waits
+    while holding memory and two growing invocations cannot deadlock.
+    """
+
+    def __init__(self, budget: MemoryBudget):
+        self.budget = budget
+        self.charged = 0
+
+    def charge(self, nbytes: int):
+        """
+        Hold ``nbytes`` from now on, waiting if that is more than before.
+
+        Raises:
+            MemoryBudgetTimeout: if the budget stayed full too long
+        """
+        nbytes = max(0, int(nbytes))
+        if self.budget.capacity > 0:
+            nbytes = min(nbytes, self.budget.capacity)
+        if nbytes <= self.charged:
+            self.budget.release(self.charged - nbytes)
+            self.charged = nbytes
+            return
+        self.release()
+        self.charged = self.budget.acquire(nbytes)
+
+    def release(self):
+        self.budget.release(self.charged)
+        self.charged = 0
+
+    def __enter__(self) -> "Reservation":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+
+def parse_size(size: str) -> Tuple[int, int]:
+    """Pixel dimensions of a "WIDTHxHEIGHT" size, 1024x1024 if malformed"""
+    try:
+        width, height = (int(value) for value in size.lower().split("x"))
+    except (AttributeError, ValueError):
+        return _DEFAULT_IMAGE_SIZE
+    return width, height
+
+
+def generated_image_footprint(size: str, response_format: str, count: int = 1) -> int:
+    """
+    Estimated memory for receiving ``count`` generated images at once.
+
+    b64_json holds the response body, the decoded JSON string and the
+    decoded image; a URL download only holds the image.
+    """
+    width, height = parse_size(size)
+    image = width * height * GENERATED_BYTES_PER_PIXEL
+    factor = 4 / 3 + 4 / 3 + 1 if response_format == "b64_json" else 1
+    return int(image * factor * count)
+
+
+def upload_image_footprint(
+    size: int, dimensions: Optional[Tuple[int, int]] = None, encoded: bool = False
+) -> int:
+    """
+    Estimated memory for preprocessing and uploading an input image.
+
+    Counts the raw image, the decoded pixels while it is resized, the
+    re-encoded result and, for batches, the base64 copy shared by every task.
+    A single upload is encoded while it is sent, so no copy is counted.
+    """
+    footprint = 2 * size
+    if dimensions is not None:
+        footprint += dimensions[0] * dimensions[1] * DECODED_BYTES_PER_PIXEL
+    if encoded:
+        footprint += size * 4 // 3
+    return footprint
+
+
+_memory_budget: Optional[MemoryBudget] = None
+_memory_budget_lock = threading.Lock()
+
+
+def get_memory_budget() -> MemoryBudget:
+    """Return the process-wide memory budget, creating it on first use"""
+    global _memory_budget
+    if _memory_budget is None:
+        with _memory_budget_lock:
+            if _memory_budget is None:
+                _memory_budget = MemoryBudget()
+    return _memory_budget
@@ -0,0 +1,308 @@
+import bisect
+import contextlib
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, Iterator, Optional, Sequence, Tuple
+
+# 留空关闭；"prometheus" 仅聚合；"json" 另外为每次工具调用输出一行 JSON 日志
+METRICS_MODE = os.environ.get("DOUBAO_METRICS", "").strip().lower()
+# 设置后定期把 Prometheus 文本写入该文件（node_exporter textfile 收集方式）
+METRICS_FILE = os.environ.get("DOUBAO_METRICS_FILE", "")
+METRICS_FILE_INTERVAL = float(os.environ.get("DOUBAO_METRICS_FILE_INTERVAL", "15"))
+
+SECONDS_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600,
+)
+BYTES_BUCKETS = tuple(1024 * 4 ** i for i in range(10))  # 1KB .. 256MB
+COUNT_BUCKETS = (1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+
+HELP = {
+    "doubao_http_requests_total": "Ark API responses by endpoint and status code",
+    "doubao_http_request_seconds": "Ark API request latency, per attempt",
+    "doubao_http_request_bytes": "Ark API request body size",
+    "doubao_http_retries_total": "Ark API requests retried after a 429 or 5xx",
+    "doubao_rate_limit_wait_seconds": "Time spent queued on the client-side rate limit",
+    "doubao_key_pool_transitions_total": "Circuit breaker state changes of pooled API keys",
+    "doubao_hedged_requests_total": "Image generations that sent a hedge, by which attempt won",
+    "doubao_memory_budget_in_use_bytes": "Estimated payload memory charged to running tool invocations",
+    "doubao_memory_budget_queue_depth": "Tool invocations waiting for payload memory",
+    "doubao_memory_budget_wait_seconds": "Time spent queued for payload memory",
+    "doubao_coalesced_total": "Calls that shared an identical in-flight request",
+    "doubao_result_cache_requests_total": "Seeded image result cache lookups, by hit or miss",
+    "doubao_task_reused_total": "Video requests answered with an existing task from the journal",
+    "doubao_stage_seconds": "Time spent in each stage of a tool invocation",
+    "doubao_payload_bytes": "Sizes of images fetched, uploaded and downloaded",
+    "doubao_task_polls": "Polls needed per video task",
+    "doubao_task_seconds": "Video task duration as seen by the poll scheduler",
+    "doubao_tool_seconds": "Total tool invocation time",
+    "doubao_tool_invocations_total": "Tool invocations by outcome",
+}
+
+logger = logging.getLogger("doubao.metrics")
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus layout"""
+
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Trace:
+    """
+    Per-invocation record of stage timings and fields.
+
+    Stages feed the ``doubao_stage_seconds`` histogram; in JSON mode the
+    whole trace is logged as one line when it finishes.
+    """
+
+    def __init__(self, registry: "Metrics", tool: str):
+        self.registry = registry
+        self.tool = tool
+        self.started = time.perf_counter()
+        self.stages: Dict[str, float] = {}
+        self.fields: Dict[str, Any] = {}
+
+    @contextlib.contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.stages[name] = self.stages.get(name, 0.0) + elapsed
+            self.registry.observe("doubao_stage_seconds", elapsed, tool=self.tool, stage=name)
+
+    def set(self, **fields: Any):
+        self.fields.update(fields)
+
+    def size(self, kind: str, value: int):
+        """Record a payload size both on the trace and in the histogram"""
+        self.fields[f"{kind}_bytes"] = value
+        self.registry.observe(
+            "doubao_payload_bytes", value, buckets=BYTES_BUCKETS, tool=self.tool, kind=kind
+        )
+
+    def finish(self, outcome: str = "ok"):
+        elapsed = time.perf_counter() - self.started
+        outcome = self.fields.pop("outcome", outcome)
+        self.registry.observe("doubao_tool_seconds", elapsed, tool=self.tool, outcome=outcome)
+        self.registry.inc("doubao_tool_invocations_total", tool=self.tool, outcome=outcome)
+        if self.registry.json_log:
+            logger.info(
+                json.dumps(
+                    {
+                        "tool": self.tool,
+                        "outcome": outcome,
+                        "seconds": round(elapsed, 4),
+                        "stages": {k: round(v, 4) for k, v in self.stages.items()},
+                        **self.fields,
+                    },
+                    ensure_ascii=False,
+                    default=str,
+                )
+            )
+
+
+class _NullTrace:
+    """Trace used while metrics are disabled; every method is a no-op"""
+
+    _stage = contextlib.nullcontext()
+
+    def stage(self, name: str):
+        return self._stage
+
+    def set(self, **fields: Any):
+        pass
+
+    def size(self, kind: str, value: int):
+        pass
+
+    def finish(self, outcome: str = "ok"):
+        pass
+
+
+_NULL_TRACE = _NullTrace()
+
+
+class Metrics:
+    """
+    In-process counters, gauges and histograms with Prometheus and JSON
+    export.
+
+    While disabled every call returns immediately, so instrumentation can
+    stay in hot paths.
+    """
+
+    def __init__(self, mode: str = METRICS_MODE):
+        """
+        Args:
+            mode: "" to disable, "prometheus" to aggregate, "json" to also
+                log one JSON line per tool invocation
+        """
+        self.enabled = mode not in ("", "0", "off", "false")
+        self.json_log = mode == "json"
+        self._counters: Dict[Tuple[str, Labels], float] = {}
+        self._gauges: Dict[Tuple[str, Labels], float] = {}
+        self._histograms: Dict[Tuple[str, Labels], Histogram] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name: str, value: float = 1.0, **labels: Any):
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0.0) + value
+
+    def gauge(self, name: str, value: float, **labels: Any):
+        """Set a value that can go up and down, e.g. bytes in use"""
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+        with self._lock:
+            self._gauges[key] = value
+
+    def observe(
+        self,
+        name: str,
+        value: float,
+        buckets: Sequence[float] = SECONDS_BUCKETS,
+        **labels: Any,
+    ):
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(buckets)
+            histogram.observe(value)
+
+    def trace(self, tool: str):
+        """Start a trace for one tool invocation"""
+        if not self.enabled:
+            return _NULL_TRACE
+        return Trace(self, tool)
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._histograms.clear()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """All metrics as plain data, for JSON export"""
+        with self._lock:
+            counters = [
+                {"name": name, "labels": dict(labels), "value": value}
+                for (name, labels), value in sorted(self._counters.items())
+            ]
+            gauges = [
+                {"name": name, "labels": dict(labels), "value": value}
+                for (name, labels), value in sorted(self._gauges.items())
+            ]
+            histograms = [
+                {
+                    "name": name,
+                    "labels": dict(labels),
+                    "count": h.count,
+                    "sum": h.sum,
+                    "buckets": dict(zip(map(str, h.buckets), h.counts)),
+                    "overflow": h.counts[-1],
+                }
+                for (name, labels), h in sorted(self._histograms.items())
+            ]
+        return {"counters": counters, "gauges": gauges, "histograms": histograms}
+
+    def render_prometheus(self) -> str:
+        """All metrics in the Prometheus text exposition format"""
+        lines = []
+        declared = set()
+
+        def declare(name: str, kind: str):
+            if name not in declared:
+                declared.add(name)
+                if name in HELP:
+                    lines.append(f"# HELP {name} {HELP[name]}")
+                lines.append(f"# TYPE {name} {kind}")
+
+        with self._lock:
+            for (name, labels), value in sorted(self._counters.items()):
+                declare(name, "counter")
+                lines.append(f"{name}{_format_labels(labels)} {value:g}")
+            for (name, labels), value in sorted(self._gauges.items()):
+                declare(name, "gauge")
+                lines.append(f"{name}{_format_labels(labels)} {value:g}")
+            for (name, labels), h in sorted(self._histograms.items()):
+                declare(name, "histogram")
+                cumulative = 0
+                for bound, count in zip(h.buckets, h.counts):
+                    cumulative += count
+                    lines.append(
+                        f"{name}_bucket{_format_labels(labels, le=f'{bound:g}')} {cumulative}"
+                    )
+                lines.append(f"{name}_bucket{_format_labels(labels, le='+Inf')} {h.count}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {h.sum:g}")
+                lines.append(f"{name}_count{_format_labels(labels)} {h.count}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: str):
+        """Atomically write the Prometheus text to a file"""
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(self.render_prometheus())
+        os.replace(tmp_path, path)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: Labels, **extra: str) -> str:
+    items = list(labels) + list(extra.items())
+    if not items:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in items) + "}"
+
+
+_metrics: Optional[Metrics] = None
+_metrics_lock = threading.Lock()
+
+
+def get_metrics() -> Metrics:
+    """Return the process-wide metrics registry, creating it on first use"""
+    global _metrics
+    if _metrics is None:
+        with _metrics_lock:
+            if _metrics is None:
+                _metrics = Metrics()
+                if _metrics.enabled and METRICS_FILE:
+                    _start_file_exporter(_metrics, METRICS_FILE, METRICS_FILE_INTERVAL)
+    return _metrics
+
+
+def _start_file_exporter(metrics: Metrics, path: str, interval: float):
+    def run():
+        while True:
+            time.sleep(interval)
+            try:
+                metrics.write_prometheus(path)
+            except OSError as e:
+                logger.warning("writing metrics to %s failed: %s", path, e)
+
+    threading.Thread(target=run, name="doubao-metrics", daemon=True).start()
@@ -0,0 +1,99 @@
+import os
+import time
+from collections.abc import Generator
+from typing import TYPE_CHECKING, Any, Dict, Optional
+
+if TYPE_CHECKING:
+    from dify_plugin import Tool
+    from dify_plugin.entities.tool import ToolInvokeMessage
+
+PROGRESS_TEXT = "text"
+PROGRESS_JSON = "json"
+PROGRESS_QUIET = "quiet"
+PROGRESS_MODES = (PROGRESS_TEXT, PROGRESS_JSON, PROGRESS_QUIET)
+
+# 默认进度输出方式，可被工具参数 progress_mode 覆盖
+DEFAULT_PROGRESS_MODE = os.environ.get("DOUBAO_PROGRESS_MODE", PROGRESS_TEXT)
+# 两条进度消息之间的最短间隔（秒）；状态变化也受此限制
+DEFAULT_PROGRESS_INTERVAL = float(os.environ.get("DOUBAO_PROGRESS_INTERVAL", "30"))
+# 等待任务时检查是否需要输出进度的间隔（秒）
+PROGRESS_CHECK_INTERVAL = 5.0
+
+
+class ProgressReporter:
+    """
+    Rate-limited progress output for long-running tool calls.
+
+    In text mode, step notes and progress lines are sent as text messages,
+    at most one progress line per interval. In json mode step notes are
+    dropped and progress is sent as compact JSON messages. In quiet mode
+    nothing is sent; the tool's result and error messages are not affected.
+    Updates arriving within the interval are coalesced: only the latest
+    state is reported when the interval has passed.
+    """
+
+    def __init__(
+        self,
+        tool: "Tool",
+        mode: Optional[str] = None,
+        interval: float = DEFAULT_PROGRESS_INTERVAL,
+    ):
+        """
+        Args:
+            tool: Tool whose message factories are used
+            mode: "text", "json" or "quiet"; empty or unknown values fall
+                back to DOUBAO_PROGRESS_MODE
+            interval: Minimum seconds between progress messages
+        """
+        self.tool = tool
+        self.mode = mode if mode in PROGRESS_MODES else DEFAULT_PROGRESS_MODE
+        if self.mode not in PROGRESS_MODES:
+            self.mode = PROGRESS_TEXT
+        self.interval = interval
+        self.sent = 0
+        self._last_sent = time.monotonic()
+
+    @property
+    def quiet(self) -> bool:
+        return self.mode == PROGRESS_QUIET
+
+    def step(self, text: str) -> Generator["ToolInvokeMessage", None, None]:
+        """Yield an informational note; only shown in text mode"""
+        if self.mode == PROGRESS_TEXT:
+            self.sent += 1
+            yield self.tool.create_text_message(text)
+
+    def update(
+        self,
+        task_id: str,
+        status: Optional[str],
+        elapsed: float,
+        eta: Optional[float] = None,
+    ) -> Generator["ToolInvokeMessage", None, None]:
+        """
+        Report the task's progress if the interval has passed since the
+        last message; earlier calls within the interval are dropped.
+        """
+        if self.quiet:
+            return
+        now = time.monotonic()
+        if now - self._last_sent < self.interval:
+            return
+        self._last_sent = now
+        self.sent += 1
+        if self.mode == PROGRESS_JSON:
+            progress: Dict[str, Any] = {
+                "type": "progress",
+                "task_id": task_id,
+                "status": status,
+                "elapsed": round(elapsed),
+            }
+            if eta:
+                progress["eta"] = round(eta)
+            yield self.tool.create_json_message(progress)
+        else:
+            eta_text = f"，预计还需 {eta:.0f} 秒" if eta else ""
+            status_text = f"（{status}）" if status else ""
+            yield self.tool.create_text_message(
+                f"视频正在生成中{status_text}，已等待 {elapsed:.0f} 秒{eta_text}..."
+            )
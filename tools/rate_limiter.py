@@ -0,0 +1,187 @@
+import os
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Callable, Dict, Mapping, Optional, Tuple
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket. ``acquire`` blocks until a token is available,
+    so callers over the limit queue up instead of failing.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        capacity: float = 1.0,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        """
+        Args:
+            rate: Tokens added per second; 0 or less disables limiting
+            capacity: Maximum burst size
+            clock: Monotonic clock function
+            sleep: Sleep function
+        """
+        self.rate = rate
+        self.capacity = max(1.0, capacity)
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = self.capacity
+        self._updated_at = clock()
+        self._lock = threading.Lock()
+
+    def _reserve(self, tokens: float) -> float:
+        """Take tokens now (possibly going negative) and return the wait time"""
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(
+                self.capacity, self._tokens + (now - self._updated_at) * self.rate
+            )
+            self._updated_at = now
+            self._tokens -= tokens
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    def acquire(self, tokens: float = 1.0) -> float:
+        """
+        Block until the tokens are available.
+
+        Returns:
+            Seconds spent waiting
+        """
+        if self.rate <= 0:
+            return 0.0
+        wait = self._reserve(tokens)
+        if wait > 0:
+            self._sleep(wait)
+        return wait
+
+    def pause(self, seconds: float):
+        """Hold back every caller for the given time, e.g. after a 429"""
+        if self.rate <= 0 or seconds <= 0:
+            return
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(
+                self.capacity, self._tokens + (now - self._updated_at) * self.rate
+            )
+            self._updated_at = now
+            # 令牌透支到 seconds 之后才能恢复
+            self._tokens = min(self._tokens, -seconds * self.rate)
+
+
+ENDPOINT_IMAGES = "images"
+ENDPOINT_TASK_CREATE = "task_create"
+ENDPOINT_TASK_POLL = "task_poll"
+
+DEFAULT_ENDPOINT_RATES = {
+    ENDPOINT_IMAGES: float(os.environ.get("DOUBAO_IMAGE_QPS", "2")),
+    ENDPOINT_TASK_CREATE: float(os.environ.get("DOUBAO_TASK_CREATE_QPS", "2")),
+    ENDPOINT_TASK_POLL: float(os.environ.get("DOUBAO_POLL_QPS", "5")),
+}
+
+# 需要重试的状态码：限流与服务端临时错误
+RETRYABLE_STATUS_CODES = (429, 500, 502, 503, 504)
+
+
+def classify_endpoint(method: str, path: str) -> Optional[str]:
+    """Map an Ark API call to its rate-limit bucket name, if any"""
+    path = path.split("?", 1)[0].rstrip("/")
+    method = method.upper()
+    if path == "/images/generations" and method == "POST":
+        return ENDPOINT_IMAGES
+    if path == "/contents/generations/tasks" and method == "POST":
+        return ENDPOINT_TASK_CREATE
+    if path.startswith("/contents/generations/tasks") and method == "GET":
+        return ENDPOINT_TASK_POLL
+    return None
+
+
+def retry_delay(
+    headers: Mapping[str, str],
+    attempt: int,
+    base: float = 0.5,
+    cap: float = 30.0,
+) -> float:
+    """
+    Seconds to wait before retrying a throttled or failed request.
+
+    Honors Retry-After (seconds or HTTP date); otherwise uses exponential
+    backoff with full jitter.
+
+    Args:
+        headers: Response headers
+        attempt: Zero-based retry attempt
+        base: Backoff for the first retry
+        cap: Upper bound for any single delay
+    """
+    retry_after = headers.get("Retry-After")
+    if retry_after:
+        try:
+            return min(cap, max(0.0, float(retry_after)))
+        except ValueError:
+            try:
+                retry_at = parsedate_to_datetime(retry_after)
+                return min(cap, max(0.0, retry_at.timestamp() - time.time()))
+            except (TypeError, ValueError):
+                pass
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+class RateLimiter:
+    """
+    Process-wide registry of token buckets, one per endpoint and API key.
+
+    Ark quotas are per account, so every tool sharing a key shares its
+    buckets. Endpoints without a configured rate are not limited.
+    """
+
+    def __init__(self, rates: Optional[Dict[str, float]] = None):
+        """
+        Args:
+            rates: Requests per second for each endpoint bucket
+        """
+        self.rates = dict(DEFAULT_ENDPOINT_RATES if rates is None else rates)
+        self._buckets: Dict[Tuple[str, str], TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, endpoint: Optional[str], key: str = "") -> Optional[TokenBucket]:
+        rate = self.rates.get(endpoint or "", 0)
+        if rate <= 0:
+            return None
+        with self._lock:
+            bucket = self._buckets.get((endpoint, key))
+            if bucket is None:
+                bucket = TokenBucket(rate, capacity=rate)
+                self._buckets[(endpoint, key)] = bucket
+            return bucket
+
+    def acquire(self, endpoint: Optional[str], key: str = "") -> float:
+        """Block until the endpoint has capacity; returns seconds waited"""
+        bucket = self.bucket(endpoint, key)
+        return bucket.acquire() if bucket is not None else 0.0
+
+    def pause(self, endpoint: Optional[str], key: str, seconds: float):
+        """Hold back the endpoint for every caller sharing the key"""
+        bucket = self.bucket(endpoint, key)
+        if bucket is not None:
+            bucket.pause(seconds)
+
+
+_default_limiter: Optional[RateLimiter] = None
+_default_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter() -> RateLimiter:
+    """Return the shared rate limiter, creating it on first use"""
+    global _default_limiter
+    if _default_limiter is None:
+        with _default_limiter_lock:
+            if _default_limiter is None:
+                _default_limiter = RateLimiter()
+    return _default_limiter
@@ -0,0 +1,201 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from tools.metrics import get_metrics
+
+DEFAULT_CACHE_DIR = os.environ.get("DOUBAO_CACHE_DIR", "")
+DEFAULT_CACHE_TTL = float(os.environ.get("DOUBAO_CACHE_TTL", str(7 * 24 * 3600)))
+DEFAULT_CACHE_MAX_ENTRIES = int(os.environ.get("DOUBAO_CACHE_MAX_ENTRIES", "1000"))
+
+# 豆包返回的图片 URL 24 小时后失效，URL 结果的缓存时间不超过该值
+URL_RESULT_TTL = 23 * 3600
+
+
+class ResultCache:
+    """
+    Content-addressed cache for deterministic generation results.
+
+    Entries live in a small in-memory LRU for microsecond hits and, when a
+    directory is given, in one JSON file per key on disk so they survive
+    restarts. Disk entries are evicted by TTL and by least-recent use once
+    ``max_entries`` is exceeded.
+    """
+
+    def __init__(
+        self,
+        directory: Optional[str] = None,
+        ttl: float = DEFAULT_CACHE_TTL,
+        max_entries: int = DEFAULT_CACHE_MAX_ENTRIES,
+        memory_entries: int = 256,
+    ):
+        """
+        Args:
+            directory: Directory for on-disk entries; None keeps them in memory only
+            ttl: Seconds an entry stays valid
+            max_entries: Maximum entries kept on disk
+            memory_entries: Maximum entries kept in the in-memory LRU
+        """
+        self.directory = directory
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.memory_entries = memory_entries
+        self.hits = 0
+        self.misses = 0
+        self._memory: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk_count: Optional[int] = None
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def make_key(**params: Any) -> str:
+        """Hash a normalized request into a cache key"""
+        normalized = json.dumps(params, sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+    def stats(self) -> Dict[str, int]:
+        """Hit/miss counters and current size"""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "memory_entries": len(self._memory),
+                "disk_entries": self._disk_count or 0,
+            }
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the cached value for a key, or None on a miss"""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if entry["expires_at"] > now:
+                    self._memory.move_to_end(key)
+                    self.hits += 1
+                    get_metrics().inc("doubao_result_cache_requests_total", result="hit")
+                    return dict(entry["value"])
+                del self._memory[key]
+
+        entry = self._read_disk(key, now) if self.directory else None
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                get_metrics().inc("doubao_result_cache_requests_total", result="miss")
+                return None
+            self.hits += 1
+            self._remember(key, entry)
+        get_metrics().inc("doubao_result_cache_requests_total", result="hit")
+        return dict(entry["value"])
+
+    def set(self, key: str, value: Dict[str, Any], ttl: Optional[float] = None):
+        """Store a value under a key"""
+        entry = {
+            "expires_at": time.time() + (self.ttl if ttl is None else min(ttl, self.ttl)),
+            "value": value,
+        }
+        with self._lock:
+            self._remember(key, entry)
+        if self.directory:
+            self._write_disk(key, entry)
+
+    def _remember(self, key: str, entry: Dict[str, Any]):
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def _read_disk(self, key: str, now: float) -> Optional[Dict[str, Any]]:
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if entry.get("expires_at", 0) <= now:
+            self._remove(path)
+            return None
+        try:
+            # 更新访问时间，用于 LRU 淘汰
+            os.utime(path)
+        except OSError:
+            pass
+        return entry
+
+    def _write_disk(self, key: str, entry: Dict[str, Any]):
+        path = self._path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            existed = os.path.exists(path)
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(entry, f)
+            os.replace(tmp_path, path)
+        except OSError:
+            self._remove(tmp_path)
+            return
+        with self._lock:
+            if self._disk_count is None:
+                self._disk_count = self._count_disk()
+            elif not existed:
+                self._disk_count += 1
+            over_limit = self._disk_count > self.max_entries
+        if over_limit:
+            self._evict()
+
+    def _count_disk(self) -> int:
+        return sum(1 for name in os.listdir(self.directory) if name.endswith(".json"))
+
+    def _evict(self):
+        """Drop the least recently used entries"""
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                entries.append((os.stat(path).st_mtime, path))
+            except OSError:
+                continue
+        entries.sort()
+        # 一次多淘汰 10%，避免每次写入都扫描目录
+        keep = int(self.max_entries * 0.9)
+        removed = 0
+        for _, path in entries:
+            if len(entries) - removed <= keep:
+                break
+            self._remove(path)
+            removed += 1
+        with self._lock:
+            self._disk_count = len(entries) - removed
+
+    @staticmethod
+    def _remove(path: str):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+_default_cache: Optional[ResultCache] = None
+_default_cache_lock = threading.Lock()
+
+
+def get_default_cache() -> Optional[ResultCache]:
+    """
+    Shared cache configured from DOUBAO_CACHE_DIR, or None when it is unset
+    """
+    global _default_cache
+    if not DEFAULT_CACHE_DIR:
+        return None
+    if _default_cache is None:
+        with _default_cache_lock:
+            if _default_cache is None:
+                _default_cache = ResultCache(DEFAULT_CACHE_DIR)
+    return _default_cache
@@ -0,0 +1,147 @@
+import base64
+import hashlib
+import io
+import json
+import os
+from typing import Any, Dict, Iterator, Union
+
+# 请求体中图片数据的占位符，发送时替换为流式编码的 data URL
+IMAGE_PLACEHOLDER = "__DOUBAO_IMAGE_DATA__"
+
+# 每次编码的原始字节数，必须是 3 的倍数以保证分块编码可直接拼接
+CHUNK_SIZE = 3 * 16 * 1024
+
+
+class EncodedImage:
+    """
+    An image base64-encoded once, for several request bodies.
+
+    Sending one image with many tasks would otherwise encode it again for
+    every request. The encoded copy is read-only and shared, so bodies
+    built from it can be sent concurrently.
+
+    Args:
+        data: Raw image bytes
+        mime_type: MIME type used in the data URL
+    """
+
+    def __init__(self, data: Union[bytes, bytearray, memoryview], mime_type: str = "image/jpeg"):
+        self.size = len(data)
+        self.mime_type = mime_type
+        self.digest = hashlib.sha256(data).digest()
+        self.encoded = base64.b64encode(data)
+
+
+class Base64JSONBody(io.RawIOBase):
+    """
+    File-like JSON request body that base64-encodes an image on the fly.
+
+    The payload is serialized once with ``IMAGE_PLACEHOLDER`` where the data
+    URL belongs. When requests reads the body, the image is encoded chunk by
+    chunk, so the full base64 string and data URL are never held in memory.
+    The exact length is known up front, so Content-Length is still sent.
+
+    Args:
+        payload: JSON payload containing IMAGE_PLACEHOLDER exactly once
+        image: Raw image bytes, a path to the image file, or an
+            EncodedImage whose encoded data is sent as it is
+        mime_type: MIME type used in the data URL; an EncodedImage's own
+            MIME type takes precedence
+    """
+
+    def __init__(
+        self,
+        payload: Dict[str, Any],
+        image: Union[bytes, bytearray, memoryview, str, EncodedImage],
+        mime_type: str = "image/jpeg",
+    ):
+        super().__init__()
+        serialized = json.dumps(payload, ensure_ascii=False)
+        if serialized.count(IMAGE_PLACEHOLDER) != 1:
+            raise ValueError("payload must contain the image placeholder exactly once")
+        before, after = serialized.split(IMAGE_PLACEHOLDER)
+        if isinstance(image, EncodedImage):
+            mime_type = image.mime_type
+        self._prefix = f"{before}data:{mime_type};base64,".encode("utf-8")
+        self._suffix = after.encode("utf-8")
+        self._image = image
+        if isinstance(image, str):
+            self.image_size = os.path.getsize(image)
+        elif isinstance(image, EncodedImage):
+            self.image_size = image.size
+        else:
+            self.image_size = len(image)
+        self.encoded_size = (self.image_size + 2) // 3 * 4
+        self._length = len(self._prefix) + self.encoded_size + len(self._suffix)
+        self._parts = self._iter_parts()
+        self._pending = memoryview(b"")
+        self._position = 0
+
+    def __len__(self) -> int:
+        return self._length
+
+    def readable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        # requests 通过 tell() 计算剩余长度；抛出异常会退化为分块传输
+        return self._position
+
+    def seekable(self) -> bool:
+        return True
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        # 仅支持回到开头（重试或重定向时重新发送）和查询当前位置
+        if whence == io.SEEK_CUR and offset == 0:
+            return self._position
+        if whence == io.SEEK_SET and offset == 0:
+            self._parts = self._iter_parts()
+            self._pending = memoryview(b"")
+            self._position = 0
+            return 0
+        raise io.UnsupportedOperation("can only rewind a streamed body")
+
+    def _iter_image_chunks(self) -> Iterator[bytes]:
+        if isinstance(self._image, str):
+            with open(self._image, "rb") as f:
+                while True:
+                    chunk = f.read(CHUNK_SIZE)
+                    if not chunk:
+                        return
+                    yield chunk
+        else:
+            view = memoryview(self._image)
+            for start in range(0, len(view), CHUNK_SIZE):
+                yield view[start:start + CHUNK_SIZE]
+
+    def _iter_parts(self) -> Iterator[bytes]:
+        yield self._prefix
+        if isinstance(self._image, EncodedImage):
+            # 已编码的数据直接按视图切片发送，不复制
+            view = memoryview(self._image.encoded)
+            for start in range(0, len(view), CHUNK_SIZE):
+                yield view[start:start + CHUNK_SIZE]
+        else:
+            for chunk in self._iter_image_chunks():
+                yield base64.b64encode(chunk)
+        yield self._suffix
+
+    def readinto(self, buffer) -> int:
+        while not self._pending:
+            part = next(self._parts, None)
+            if part is None:
+                return 0
+            self._pending = memoryview(part)
+        size = min(len(buffer), len(self._pending))
+        buffer[:size] = self._pending[:size]
+        self._pending = self._pending[size:]
+        self._position += size
+        return size
+
+    def __iter__(self) -> Iterator[bytes]:
+        # requests 仅凭 __iter__ 判断是否为流式请求体；按块读出
+        while True:
+            chunk = self.read(CHUNK_SIZE)
+            if not chunk:
+                return
+            yield chunk
@@ -0,0 +1,215 @@
+import hashlib
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from tools.task_poller import TERMINAL_STATUSES
+from tools.video_task import VideoTask
+
+DEFAULT_JOURNAL_PATH = os.environ.get(
+    "DOUBAO_TASK_JOURNAL",
+    os.path.join(tempfile.gettempdir(), "doubao_tasks.sqlite3"),
+)
+# 在该时间内提交的相同请求复用已有任务，0 表示不去重
+DEFAULT_DEDUP_WINDOW = float(os.environ.get("DOUBAO_TASK_DEDUP_WINDOW", "3600"))
+# 超过该时间的记录会被清理；视频链接 24 小时后失效，再久的任务已无法续用
+DEFAULT_RETENTION = 24 * 3600
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    task_id TEXT PRIMARY KEY,
+    account TEXT NOT NULL,
+    request_key TEXT,
+    model TEXT,
+    params TEXT,
+    status TEXT,
+    video_url TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS tasks_request ON tasks (account, request_key, created_at);
+CREATE INDEX IF NOT EXISTS tasks_status ON tasks (account, status);
+"""
+
+
+def account_key(api_key: str, base_url: str) -> str:
+    """Identify an account without storing its API key"""
+    return hashlib.sha256(f"{base_url}\n{api_key}".encode("utf-8")).hexdigest()[:32]
+
+
+def request_key(
+    payload: Dict[str, Any],
+    image: Optional[bytes] = None,
+    image_digest: Optional[bytes] = None,
+) -> str:
+    """
+    Hash a task request; identical requests share a key.
+
+    ``image_digest`` is the image's SHA-256 digest, for callers that
+    already computed it instead of passing the image.
+    """
+    digest = hashlib.sha256(
+        json.dumps(payload, sort_keys=True, ensure_ascii=False).encode("utf-8")
+    )
+    if image is not None:
+        image_digest = hashlib.sha256(image).digest()
+    if image_digest is not None:
+        digest.update(image_digest)
+    return digest.hexdigest()
+
+
+class JournalEntry(NamedTuple):
+    task_id: str
+    model: str
+    status: Optional[str]
+    created_at: float
+
+
+class TaskJournal:
+    """
+    SQLite record of submitted video tasks, shared by plugin processes.
+
+    Every task is written when it is created and whenever a poll sees a new
+    status. After a restart, unfinished tasks can be picked up again, and a
+    repeated request is answered with the task already running for it.
+    Only a hash of the API key is stored.
+    """
+
+    def __init__(
+        self,
+        path: str = DEFAULT_JOURNAL_PATH,
+        dedup_window: float = DEFAULT_DEDUP_WINDOW,
+        retention: float = DEFAULT_RETENTION,
+    ):
+        """
+        Args:
+            path: SQLite database file
+            dedup_window: Seconds during which an identical request reuses
+                the earlier task; 0 disables deduplication
+            retention: Seconds after which records are deleted
+        """
+        self.path = path
+        self.dedup_window = dedup_window
+        self.retention = retention
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # 单连接加锁使用；多个插件进程之间由 SQLite 文件锁协调
+        self._conn = sqlite3.connect(path, timeout=10, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(_SCHEMA)
+            self._conn.execute(
+                "DELETE FROM tasks WHERE created_at < ?", (time.time() - retention,)
+            )
+
+    def record(
+        self,
+        task_id: str,
+        account: str,
+        model: str,
+        params: Optional[Dict[str, Any]] = None,
+        key: Optional[str] = None,
+    ):
+        """Store a newly created task"""
+        now = time.time()
+        self._execute(
+            "INSERT OR IGNORE INTO tasks"
+            " (task_id, account, request_key, model, params, status, created_at, updated_at)"
+            " VALUES (?, ?, ?, ?, ?, 'queued', ?, ?)",
+            (
+                task_id,
+                account,
+                key,
+                model,
+                json.dumps(params, ensure_ascii=False) if params else None,
+                now,
+                now,
+            ),
+        )
+
+    def update(self, task: VideoTask):
+        """Store a task's latest status; unknown tasks are ignored"""
+        if not task.id or task.status is None:
+            return
+        self._execute(
+            "UPDATE tasks SET status = ?, video_url = ?, error = ?, updated_at = ?"
+            " WHERE task_id = ? AND status IS NOT ?",
+            (task.status, task.video_url, task.error, time.time(), task.id, task.status),
+        )
+
+    def find(self, account: str, key: str, finished: bool = False) -> Optional[JournalEntry]:
+        """
+        The most recent task for an identical request within the dedup
+        window that had not finished when last seen.
+
+        Args:
+            account: Account the task was created with
+            key: Request key from ``request_key``
+            finished: Also return a task that has succeeded
+        """
+        if self.dedup_window <= 0:
+            return None
+        # 默认只复用进行中的任务；已成功的任务仅在调用方明确要求时复用
+        excluded = ("failed", "canceled") if finished else TERMINAL_STATUSES
+        placeholders = ", ".join("?" for _ in excluded)
+        rows = self._execute(
+            "SELECT task_id, model, status, created_at FROM tasks"
+            " WHERE account = ? AND request_key = ? AND created_at >= ?"
+            f" AND (status IS NULL OR status NOT IN ({placeholders}))"
+            " ORDER BY created_at DESC LIMIT 1",
+            (account, key, time.time() - self.dedup_window, *excluded),
+        )
+        return JournalEntry(*rows[0]) if rows else None
+
+    def unfinished(self, account: str) -> List[JournalEntry]:
+        """Tasks of an account that had not finished when last seen"""
+        placeholders = ", ".join("?" for _ in TERMINAL_STATUSES)
+        rows = self._execute(
+            "SELECT task_id, model, status, created_at FROM tasks"
+            f" WHERE account = ? AND status NOT IN ({placeholders})"
+            " ORDER BY created_at",
+            (account, *TERMINAL_STATUSES),
+        )
+        return [JournalEntry(*row) for row in rows]
+
+    def _execute(self, sql: str, params: tuple) -> list:
+        # 日志只是辅助，数据库被锁或损坏时不影响任务本身
+        try:
+            with self._lock, self._conn:
+                return self._conn.execute(sql, params).fetchall()
+        except sqlite3.Error:
+            return []
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_default_journal: Optional[TaskJournal] = None
+_default_journal_lock = threading.Lock()
+
+
+def get_default_journal() -> Optional[TaskJournal]:
+    """
+    Shared journal at DOUBAO_TASK_JOURNAL, or None when it is set to an
+    empty string or cannot be opened
+    """
+    global _default_journal
+    if not DEFAULT_JOURNAL_PATH:
+        return None
+    if _default_journal is None:
+        with _default_journal_lock:
+            if _default_journal is None:
+                try:
+                    _default_journal = TaskJournal(DEFAULT_JOURNAL_PATH)
+                except (OSError, sqlite3.Error):
+                    # 日志不可用时不影响任务提交
+                    return None
+    return _default_journal
@@ -0,0 +1,175 @@
+import os
+import random
+import threading
+import time
+from typing import Callable, Dict, Iterator, Optional, Tuple
+
+
+TERMINAL_STATUSES = ("succeeded", "failed", "canceled")
+
+DEFAULT_DEADLINE = float(os.environ.get("DOUBAO_TASK_DEADLINE", "300"))
+
+
+class TaskPoller:
+    """
+    Adaptive poll scheduler for Ark generation tasks.
+
+    Polls start short and back off exponentially with jitter. Once a model has
+    finished a task, the poller learns its typical duration and spread, sleeps
+    straight through the part of the run where completion is unlikely, and
+    polls densely inside the expected finish window.
+
+    Usage:
+        poller = TaskPoller(model, deadline=300)
+        for _ in poller:
+            status = fetch_status()
+            poller.observe(status)
+    """
+
+    # 各模型任务耗时的滑动均值与平均偏差（秒），进程内共享
+    _estimates: Dict[str, Tuple[float, float]] = {}
+    _estimates_lock = threading.Lock()
+    _smoothing = 0.2
+
+    def __init__(
+        self,
+        model: str,
+        deadline: float = DEFAULT_DEADLINE,
+        initial_interval: float = 1.0,
+        max_interval: float = 10.0,
+        backoff: float = 1.6,
+        precision: float = 0.05,
+        jitter: float = 0.2,
+        sleep: Callable[[float], None] = time.sleep,
+        clock: Callable[[], float] = time.monotonic,
+        learn_elapsed: bool = True,
+    ):
+        """
+        Args:
+            model: Model name, used to look up and learn the duration estimate
+            deadline: Maximum seconds to wait, measured from construction
+            initial_interval: First poll interval in seconds
+            max_interval: Upper bound for a poll interval near the expected
+                finish time (sleeps before that window may be 4x longer)
+            backoff: Multiplier applied to the interval after every poll
+            precision: Poll interval inside the expected finish window, as a
+                fraction of the expected duration
+            jitter: Relative random spread applied to each interval
+            sleep: Sleep function (injectable for tests and benchmarks)
+            clock: Monotonic clock function
+            learn_elapsed: Without a reported duration, learn the time since
+                construction as the task's duration; only valid when the
+                poller starts together with the task
+        """
+        self.model = model
+        self.deadline = deadline
+        self.initial_interval = initial_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.precision = precision
+        self.jitter = jitter
+        self._sleep = sleep
+        self._clock = clock
+        self.learn_elapsed = learn_elapsed
+        self.started_at = clock()
+        self.polls = 0
+        self.status: Optional[str] = None
+
+    @classmethod
+    def expected_duration(cls, model: str) -> Optional[float]:
+        """Learned average task duration for a model, if any"""
+        with cls._estimates_lock:
+            estimate = cls._estimates.get(model)
+        return estimate[0] if estimate else None
+
+    @classmethod
+    def record_duration(cls, model: str, duration: float):
+        """Fold an observed task duration into the model's estimate"""
+        with cls._estimates_lock:
+            previous = cls._estimates.get(model)
+            if previous is None:
+                # 首个样本：假设 ±25% 的波动
+                cls._estimates[model] = (duration, duration / 4)
+                return
+            mean, deviation = previous
+            error = duration - mean
+            cls._estimates[model] = (
+                mean + error * cls._smoothing,
+                deviation + (abs(error) - deviation) * cls._smoothing,
+            )
+
+    @property
+    def elapsed(self) -> float:
+        return self._clock() - self.started_at
+
+    @property
+    def remaining(self) -> float:
+        return self.deadline - self.elapsed
+
+    @property
+    def finished(self) -> bool:
+        return self.status in TERMINAL_STATUSES
+
+    def eta(self) -> Optional[float]:
+        """Estimated seconds until the task finishes, or None if unknown"""
+        expected = self.expected_duration(self.model)
+        if expected is None:
+            return None
+        return max(0.0, expected - self.elapsed)
+
+    def next_interval(self) -> float:
+        """Seconds to wait before the next poll"""
+        with self._estimates_lock:
+            estimate = self._estimates.get(self.model)
+        if estimate is None:
+            # 没有历史数据：指数退避
+            interval = min(
+                self.max_interval,
+                self.initial_interval * self.backoff ** self.polls,
+            )
+        else:
+            mean, deviation = estimate
+            window_start = mean - 2 * deviation
+            elapsed = self.elapsed
+            if elapsed < window_start:
+                # 距离预计完成窗口较远，大步跨向窗口开始
+                interval = min(window_start - elapsed, self.max_interval * 4)
+            else:
+                # 处于预计完成窗口内：按预计耗时的固定比例密集轮询，
+                # 超出窗口后再逐步退避
+                interval = max(self.initial_interval, mean * self.precision)
+                overdue = elapsed - (mean + 2 * deviation)
+                if overdue > 0:
+                    interval = max(interval, overdue / 4)
+                interval = min(interval, self.max_interval)
+        if self.jitter:
+            interval *= random.uniform(1 - self.jitter, 1 + self.jitter)
+        return max(0.0, min(interval, self.remaining))
+
+    def observe(self, status: Optional[str], duration: Optional[float] = None):
+        """
+        Report the status returned by the latest poll.
+
+        Successful completions update the model's duration estimate.
+
+        Args:
+            status: Task status
+            duration: Task run time reported by the server, if known
+        """
+        self.status = status
+        if status != "succeeded":
+            return
+        if duration is None and self.learn_elapsed:
+            duration = self.elapsed
+        if duration is not None:
+            self.record_duration(self.model, duration)
+
+    def __iter__(self) -> Iterator[int]:
+        """Sleep before each poll; stop on a terminal status or the deadline"""
+        while not self.finished:
+            interval = self.next_interval()
+            if self.remaining <= 0:
+                return
+            self._sleep(interval)
+            self.polls += 1
+            yield self.polls
@@ -0,0 +1,314 @@
+import logging
+import os
+import threading
+import time
+from typing import TYPE_CHECKING, Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+from tools.metrics import COUNT_BUCKETS, get_metrics
+from tools.task_poller import DEFAULT_DEADLINE, TaskPoller
+from tools.video_task import VideoTask, VideoTaskError
+
+if TYPE_CHECKING:
+    # DoubaoApp 的任务方法依赖本模块，仅在类型检查时导入以避免循环导入
+    from tools.doubao_app import DoubaoApp
+
+DEFAULT_BATCH_SIZE = int(os.environ.get("DOUBAO_POLL_BATCH_SIZE", "50"))
+
+logger = logging.getLogger(__name__)
+
+
+class TaskHandle:
+    """
+    A video task tracked by the TaskScheduler.
+
+    Tool invocations block on ``wait`` instead of running their own poll loop.
+    """
+
+    # 连续轮询失败超过该次数后放弃跟踪
+    max_failures = 3
+
+    def __init__(self, client: "DoubaoApp", task_id: str, model: str, deadline: float):
+        self.client = client
+        self.task_id = task_id
+        self.model = model
+        # 句柄可能晚于任务创建（从日志恢复、复用已有任务、查询先前提交的任务），
+        # 跟踪时长不代表任务耗时，只按服务端报告的耗时学习
+        self.poller = TaskPoller(model, deadline=deadline, learn_elapsed=False)
+        self.task: Optional[VideoTask] = None
+        self.error: Optional[str] = None
+        self.failures = 0
+        self.next_poll_at = time.monotonic() + self.poller.next_interval()
+        self._event = threading.Event()
+        self._callbacks: List[Callable[["TaskHandle"], None]] = []
+        self._callbacks_lock = threading.Lock()
+
+    @property
+    def status(self) -> Optional[str]:
+        return self.task.status if self.task is not None else None
+
+    @property
+    def done(self) -> bool:
+        """True once the task is terminal, failed to poll, or ran out of time"""
+        return self._event.is_set()
+
+    @property
+    def timed_out(self) -> bool:
+        return self.done and self.error is None and not self.poller.finished
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        Block until the task is done or the timeout elapses.
+
+        Returns:
+            True if the task is done
+        """
+        return self._event.wait(timeout)
+
+    def wait_steps(self, timeout: float, step: float) -> Iterator[None]:
+        """
+        Wait in steps of ``step`` seconds, yielding after each step that ends
+        without a result, for at most ``timeout`` seconds in total.
+
+        The bound is the caller's own, so a caller never waits longer than
+        it asked for even if the handle is tracked for longer or polling
+        stalls.
+        """
+        expires_at = time.monotonic() + timeout
+        while True:
+            remaining = expires_at - time.monotonic()
+            if remaining <= 0 or self.wait(min(step, remaining)):
+                return
+            yield
+
+    def extend(self, deadline: float):
+        """Keep tracking for at least ``deadline`` more seconds"""
+        self.poller.deadline = max(self.poller.deadline, self.poller.elapsed + deadline)
+
+    def add_done_callback(self, callback: Callable[["TaskHandle"], None]):
+        """
+        Call ``callback(handle)`` once the handle is done, on the scheduler
+        thread; immediately if it already is. Callbacks must not block.
+        """
+        with self._callbacks_lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                return
+        callback(self)
+
+    def result(self) -> VideoTask:
+        """
+        The latest known state of the task; its status is not terminal if
+        the deadline passed first.
+
+        Raises:
+            VideoTaskError: if polling failed
+        """
+        if self.error:
+            raise VideoTaskError(self.error)
+        return self.task if self.task is not None else VideoTask(self.task_id, model=self.model)
+
+    def _update(self, task: VideoTask):
+        self.failures = 0
+        self.task = task
+        self.poller.observe(task.status, task.duration)
+
+    def _finish(self, error: Optional[str] = None):
+        self.error = error
+        metrics = get_metrics()
+        if metrics.enabled:
+            outcome = "error" if error else (self.status if self.poller.finished else "timeout")
+            metrics.observe("doubao_task_polls", self.poller.polls, buckets=COUNT_BUCKETS, model=self.model)
+            metrics.observe("doubao_task_seconds", self.poller.elapsed, model=self.model, status=outcome)
+        with self._callbacks_lock:
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback(self)
+            except Exception:
+                # 回调出错不能影响调度线程
+                logger.exception("task done callback failed")
+
+
+class TaskScheduler:
+    """
+    Process-wide scheduler that polls every in-flight video task on one thread.
+
+    Tasks that become due within ``coalesce_window`` seconds of each other are
+    fetched together through the task list endpoint, one request per API key.
+    Requests are paced by the client's shared task-poll rate limit.
+    """
+
+    _instance: Optional["TaskScheduler"] = None
+    _instance_lock = threading.Lock()
+
+    def __init__(
+        self,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        coalesce_window: float = 1.0,
+    ):
+        """
+        Args:
+            batch_size: Maximum task IDs fetched by one list request
+            coalesce_window: Tasks due within this many seconds are polled together
+        """
+        self.batch_size = batch_size
+        self.coalesce_window = coalesce_window
+        self._handles: Dict[str, TaskHandle] = {}
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+
+    @classmethod
+    def instance(cls) -> "TaskScheduler":
+        """Return the shared scheduler, creating it on first use"""
+        if cls._instance is None:
+            with cls._instance_lock:
+                if cls._instance is None:
+                    cls._instance = cls()
+        return cls._instance
+
+    @property
+    def in_flight(self) -> int:
+        with self._condition:
+            return len(self._handles)
+
+    def watch(
+        self,
+        client: "DoubaoApp",
+        task_id: str,
+        model: str,
+        deadline: float = DEFAULT_DEADLINE,
+    ) -> TaskHandle:
+        """
+        Start tracking a task. Watching the same task twice returns one
+        handle, tracked until the later of the callers' deadlines; each
+        caller bounds its own wait, e.g. with ``TaskHandle.wait_steps``.
+
+        Args:
+            client: Client whose credentials created the task
+            task_id: Ark task ID
+            model: Model name, used for the duration estimate
+            deadline: Maximum seconds to track the task
+
+        Returns:
+            Handle that is signalled when the task reaches a terminal state
+        """
+        with self._condition:
+            handle = self._handles.get(task_id)
+            if handle is None or handle.done:
+                handle = TaskHandle(client, task_id, model, deadline)
+                self._handles[task_id] = handle
+                self._ensure_thread()
+                self._condition.notify()
+            else:
+                handle.extend(deadline)
+            return handle
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(
+                target=self._run, name="doubao-task-scheduler", daemon=True
+            )
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._handles:
+                    self._condition.wait()
+                now = time.monotonic()
+                next_due = min(h.next_poll_at for h in self._handles.values())
+                if next_due > now:
+                    self._condition.wait(next_due - now)
+                    continue
+                due = [
+                    h
+                    for h in self._handles.values()
+                    if h.next_poll_at <= now + self.coalesce_window
+                ]
+            try:
+                self._poll(due)
+            except Exception as e:
+                # 意外错误不能终止调度线程，否则所有等待者都不会再被唤醒
+                logger.exception("polling video tasks failed")
+                self._fail(due, e)
+            with self._condition:
+                for handle in due:
+                    if handle.done:
+                        self._handles.pop(handle.task_id, None)
+
+    def _poll(self, handles: List[TaskHandle]):
+        # 按创建任务的密钥分组，同一密钥的任务合并为一次列表查询
+        groups: Dict[Tuple[int, Optional[str]], List[TaskHandle]] = {}
+        for handle in handles:
+            member = handle.client.task_member(handle.task_id)
+            key = (id(handle.client.pool), member.account if member else None)
+            groups.setdefault(key, []).append(handle)
+
+        for group in groups.values():
+            for start in range(0, len(group), self.batch_size):
+                batch = group[start:start + self.batch_size]
+                try:
+                    results = self._fetch(batch)
+                except Exception as e:
+                    results = {}
+                    self._fail(batch, e)
+                for handle in batch:
+                    if handle.done:
+                        continue
+                    handle.poller.polls += 1
+                    result = results.get(handle.task_id)
+                    if isinstance(result, str):
+                        handle._finish(result)
+                    elif result is not None:
+                        handle._update(result)
+                        if handle.poller.finished:
+                            handle._finish()
+                    if not handle.done and handle.poller.remaining <= 0:
+                        handle._finish()
+                    if not handle.done:
+                        handle.next_poll_at = (
+                            time.monotonic() + handle.poller.next_interval()
+                        )
+
+    def _fail(self, handles: List[TaskHandle], error: Exception):
+        """Count a failed poll for each handle; give up after max_failures"""
+        for handle in handles:
+            if handle.done:
+                continue
+            handle.failures += 1
+            if handle.failures >= handle.max_failures:
+                handle._finish(f"查询视频生成任务失败: {str(error)}")
+            else:
+                handle.next_poll_at = time.monotonic() + handle.poller.next_interval()
+
+    def _fetch(self, batch: List[TaskHandle]) -> Dict[str, Union[VideoTask, str]]:
+        """
+        Fetch a batch of tasks created with one key.
+
+        Returns:
+            Mapping of task ID to the task, or to an error message string
+        """
+        client = batch[0].client
+        member = client.task_member(batch[0].task_id)
+        results: Dict[str, Union[VideoTask, str]] = {}
+        # 不知道由哪个密钥创建的任务只能逐个查询
+        if len(batch) > 1 and member is not None:
+            try:
+                for task in client.list_tasks(
+                    task_ids=[h.task_id for h in batch], page_size=len(batch), member=member
+                ):
+                    results[task.id] = task
+            except VideoTaskError:
+                # 列表查询失败时退回逐个查询
+                pass
+
+        # 列表查询未覆盖的任务（或单个任务）逐个查询
+        for handle in batch:
+            if handle.task_id in results:
+                continue
+            try:
+                results[handle.task_id] = client.get_task(handle.task_id)
+            except VideoTaskError as e:
+                results[handle.task_id] = str(e)
+        return results
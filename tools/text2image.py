@@ -1,9 +1,16 @@
 import base64
 from collections.abc import Generator
-from openai import OpenAI
 from dify_plugin.entities.tool import ToolInvokeMessage
 from dify_plugin import Tool
-from tools.doubao_app import DoubaoApp
+from tools.doubao_app import DEFAULT_BASE_URLS, DEFAULT_BATCH_WORKERS, DoubaoApp
+from tools.image_preprocess import sniff_mime
+from tools.memory_budget import (
+    MemoryBudgetTimeout,
+    Reservation,
+    generated_image_footprint,
+    get_memory_budget,
+)
+from tools.metrics import Trace, get_metrics
 
 
 class Text2ImageTool(Tool):
@@ -13,10 +20,21 @@ class Text2ImageTool(Tool):
         """
         Invoke text-to-image generation tool
         """
-        # 初始化OpenAI客户端
+        trace = get_metrics().trace("text2image")
+        admission = get_memory_budget().reservation()
+        try:
+            yield from self._generate(tool_parameters, trace, admission)
+        finally:
+            admission.release()
+            trace.finish()
+
+    def _generate(
+        self, tool_parameters: dict, trace: Trace, admission: Reservation
+    ) -> Generator[ToolInvokeMessage, None, None]:
+        # 初始化客户端（共享连接池）
         client = DoubaoApp(
             api_key=self.runtime.credentials.get("api_key"),
-            base_url="https://ark.cn-beijing.volces.com/api/v3",
+            base_url=DEFAULT_BASE_URLS,
         )
 
         # 获取参数
@@ -31,46 +49,170 @@ class Text2ImageTool(Tool):
         # 获取模型
         model = tool_parameters.get("model", "doubao-seedream-3-0-t2i-250415")
 
-        # 设置返回格式
-        response_format = "b64_json"
+        # 获取种子（-1 表示随机；固定种子的请求可命中结果缓存）
+        seed = tool_parameters.get("seed")
+        seed = int(seed) if seed not in (None, "") else None
+
+        # 设置返回格式：url 模式下载二进制图片，b64_json 模式由服务端编码返回
+        response_format = tool_parameters.get("response_format") or "url"
+        if response_format not in ("url", "b64_json"):
+            response_format = "url"
+
+        # 批量参数：额外提示词（每行一个）与每个提示词的图像数量
+        extra_prompts = [
+            line.strip()
+            for line in (tool_parameters.get("prompts") or "").splitlines()
+            if line.strip()
+        ]
+        n = int(tool_parameters.get("n") or 1)
+        # 对冲慢请求：on / off，留空时使用 DOUBAO_HEDGE
+        hedge = {"on": True, "off": False}.get(tool_parameters.get("hedge"))
+        max_workers = int(tool_parameters.get("max_concurrency") or DEFAULT_BATCH_WORKERS)
+        trace.set(model=model, size=size, response_format=response_format)
 
+        # 按同时在内存中的图片数预占内存额度，额度不足时排队
+        concurrent = min((1 + len(extra_prompts)) * n, max_workers)
         try:
-            yield self.create_text_message("正在使用豆包 API 生成图像...")
+            with trace.stage("admission"):
+                admission.charge(generated_image_footprint(size, response_format, concurrent))
+        except MemoryBudgetTimeout as e:
+            trace.set(outcome="error", error=str(e))
+            yield self.create_text_message(f"服务繁忙，请稍后再试: {str(e)}")
+            return
 
-            # 调用API
-            response = client.generate_image(
-                prompt=prompt,
+        if extra_prompts or n > 1:
+            yield from self._invoke_batch(
+                client,
+                trace,
+                [prompt] + extra_prompts,
+                n=n,
+                max_workers=max_workers,
                 model=model,
                 size=size,
+                seed=seed,
                 response_format=response_format,
+                download=response_format == "url",
+                hedge=hedge,
             )
+            return
+
+        try:
+            yield self.create_text_message("正在使用豆包 API 生成图像...")
+
+            # 调用API
+            with trace.stage("generate"):
+                response = client.generate_image(
+                    prompt=prompt,
+                    model=model,
+                    size=size,
+                    seed=seed,
+                    response_format=response_format,
+                    hedge=hedge,
+                )
 
             # 处理结果
             if "error" in response:
+                trace.set(outcome="error", error=response["error"]["message"])
                 yield self.create_text_message(
                     f"生成图像时出错: {response['error']['message']}"
                 )
                 return
 
-            if "b64_json" in response:
-                # 解码图像
-                (mime_type, blob_image) = self._decode_image(response["b64_json"])
-                # 创建二进制消息
-                yield self.create_blob_message(
-                    blob=blob_image, meta={"mime_type": mime_type}
-                )
+            if (yield from self._emit_image(client, trace, response)):
                 yield self.create_text_message("图像生成成功！")
             else:
+                trace.set(outcome="empty")
                 yield self.create_text_message("未收到图像数据")
 
         except Exception as e:
             # 处理异常
+            trace.set(outcome="error", error=str(e))
             yield self.create_text_message(f"生成图像时出错: {str(e)}")
 
+    def _invoke_batch(
+        self,
+        client: DoubaoApp,
+        trace: Trace,
+        prompts: list[str],
+        n: int,
+        max_workers: int,
+        **kwargs,
+    ) -> Generator[ToolInvokeMessage, None, None]:
+        """
+        Generate several images concurrently and stream each one as it finishes
+        """
+        total = len(prompts) * n
+        succeeded = 0
+        try:
+            yield self.create_text_message(f"正在使用豆包 API 批量生成 {total} 张图像...")
+
+            # 批量模式下生成与下载交错进行，generate 阶段包含流式返回的全部时间
+            with trace.stage("generate"):
+                for response in client.generate_images(
+                    prompts, n=n, max_workers=max_workers, **kwargs
+                ):
+                    number = response["index"] + 1
+                    if "error" in response:
+                        yield self.create_text_message(
+                            f"第 {number} 张图像生成出错: {response['error']['message']}"
+                        )
+                        continue
+
+                    if (yield from self._emit_image(client, trace, response)):
+                        succeeded += 1
+                    else:
+                        yield self.create_text_message(f"第 {number} 张图像未收到图像数据")
+
+            trace.set(images=total, succeeded=succeeded)
+            if succeeded < total:
+                trace.set(outcome="partial" if succeeded else "error")
+            yield self.create_text_message(f"批量生成完成：成功 {succeeded}/{total} 张")
+
+        except Exception as e:
+            # 处理异常
+            trace.set(outcome="error", error=str(e))
+            yield self.create_text_message(f"批量生成图像时出错: {str(e)}")
+
+    def _emit_image(
+        self, client: DoubaoApp, trace: Trace, response: dict
+    ) -> Generator[ToolInvokeMessage, None, bool]:
+        """
+        Yield the blob message for one generated image.
+
+        Returns:
+            True if the response contained an image
+        """
+        if "blob" in response:
+            (mime_type, blob_image) = (response["mime_type"], response["blob"])
+        elif "url" in response:
+            try:
+                if "download_error" in response:
+                    raise Exception(response["download_error"])
+                # 通过连接池流式下载二进制图片
+                with trace.stage("download"):
+                    (mime_type, blob_image) = client.download_image(response["url"])
+            except Exception as e:
+                # 下载失败时退回为图片链接
+                yield self.create_text_message(f"下载图像失败: {str(e)}，改为返回图片链接")
+                yield self.create_image_message(response["url"])
+                return True
+        elif "b64_json" in response:
+            # 解码图像
+            (mime_type, blob_image) = self._decode_image(response["b64_json"])
+        else:
+            return False
+
+        trace.size("image_output", len(blob_image))
+        # 创建二进制消息
+        yield self.create_blob_message(
+            blob=blob_image, meta={"mime_type": mime_type}
+        )
+        return True
+
     @staticmethod
     def _decode_image(base64_image: str) -> tuple[str, bytes]:
         """
         Decode a base64 encoded image.
         """
-        # 假设图像是纯base64编码
-        return ("image/png", base64.b64decode(base64_image))
+        data = base64.b64decode(base64_image)
+        return (sniff_mime(data, default="image/png"), data)
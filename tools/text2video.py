@@ -1,7 +1,11 @@
-import time
 from collections.abc import Generator
-import requests
-from openai import OpenAI
+from tools.doubao_app import DEFAULT_BASE_URLS, DoubaoApp
+from tools.metrics import Trace, get_metrics
+from tools.progress import PROGRESS_CHECK_INTERVAL, ProgressReporter
+from tools.task_poller import DEFAULT_DEADLINE
+from tools.video_cache import DEFAULT_VIDEO_OUTPUT, VIDEO_OUTPUTS
+from tools.video_delivery import VideoDelivery
+from tools.video_task import VideoTaskError
 from dify_plugin.entities.tool import ToolInvokeMessage
 from dify_plugin import Tool
 
@@ -13,9 +17,20 @@ class Text2VideoTool(Tool):
         """
         Invoke text-to-video generation tool using Doubao AI
         """
-        # 获取API key
-        api_key = self.runtime.credentials.get("api_key")
-        base_url = "https://ark.cn-beijing.volces.com/api/v3"
+        trace = get_metrics().trace("text2video")
+        try:
+            yield from self._generate(tool_parameters, trace)
+        finally:
+            trace.finish()
+
+    def _generate(
+        self, tool_parameters: dict, trace: Trace
+    ) -> Generator[ToolInvokeMessage, None, None]:
+        # 初始化客户端（共享连接池）
+        client = DoubaoApp(
+            api_key=self.runtime.credentials.get("api_key"),
+            base_url=DEFAULT_BASE_URLS,
+        )
         
         # 获取参数
         prompt = tool_parameters.get("prompt", "")
@@ -38,101 +53,79 @@ class Text2VideoTool(Tool):
         # 获取模型
         model = tool_parameters.get("model", "doubao-seedance-1-0-lite-t2v-250428")
         
+        # 最长等待时间（秒）
+        max_wait = float(tool_parameters.get("max_wait") or DEFAULT_DEADLINE)
+        # 仅提交任务，不等待结果
+        submit_only = bool(tool_parameters.get("submit_only", False))
+        # 复用相同请求已生成的视频，默认关闭，每次调用都重新生成
+        reuse_result = bool(tool_parameters.get("reuse_result", False))
+        # 进度输出方式：text / json / quiet
+        progress = ProgressReporter(self, tool_parameters.get("progress_mode"))
+        # 视频返回方式：url / blob / local
+        video_output = tool_parameters.get("video_output")
+        if video_output not in VIDEO_OUTPUTS:
+            video_output = DEFAULT_VIDEO_OUTPUT
+        delivery = VideoDelivery(self, client, video_output, trace)
+        
         try:
-            yield self.create_text_message("正在使用豆包 API 生成视频...")
-            
-            # 设置请求头
-            headers = {
-                "Content-Type": "application/json",
-                "Authorization": f"Bearer {api_key}"
-            }
+            yield from progress.step("正在使用豆包 API 生成视频...")
             
             # 第一步：创建视频生成任务
-            request_data = {
-                "model": model,
-                "content": [
-                    {
-                        "type": "text",
-                        "text": prompt
-                    }
-                ]
-            }
-            
-            response = requests.post(
-                f"{base_url}/contents/generations/tasks",
-                headers=headers,
-                json=request_data
-            )
+            content = [
+                {
+                    "type": "text",
+                    "text": prompt
+                }
+            ]
+            with trace.stage("task_create"):
+                task_id = client.create_video_task(model, content, reuse_result=reuse_result)
+            trace.set(task_id=task_id, model=model)
             
-            if response.status_code != 200:
-                yield self.create_text_message(f"创建视频生成任务失败，状态码: {response.status_code}, 错误信息: {response.text}")
-                return
-                
-            # 获取任务ID
-            response_json = response.json()
-            task_id = response_json.get("id")
-            if not task_id:
-                yield self.create_text_message("创建视频生成任务失败，未获取到任务ID")
+            # 仅提交模式：立即返回任务ID，由 video_task_status 工具获取结果
+            if submit_only:
+                yield self.create_text_message(f"视频生成任务已提交，任务ID: {task_id}。请使用“视频任务状态”工具查询结果")
+                yield self.create_json_message({
+                    "task_id": task_id,
+                    "status": "submitted",
+                    "model": model
+                })
                 return
                 
-            yield self.create_text_message(f"视频生成任务已创建，任务ID: {task_id}，等待视频生成完成...")
+            yield from progress.step(f"视频生成任务已创建，任务ID: {task_id}，等待视频生成完成...")
             
-            # 第二步：轮询查询任务状态，直到完成或失败
-            max_retries = 60  # 最大重试次数，防止无限等待
-            retry_count = 0
-            video_url = None
-            
-            while retry_count < max_retries:
-                # 等待一段时间再查询
-                time.sleep(5)
-                
-                # 查询任务状态
-                task_response = requests.get(
-                    f"{base_url}/contents/generations/tasks/{task_id}",
-                    headers=headers
-                )
-                
-                if task_response.status_code != 200:
-                    yield self.create_text_message(f"查询视频生成任务失败，状态码: {task_response.status_code}, 错误信息: {task_response.text}")
-                    return
-                    
-                task_data = task_response.json()
-                
-                # 检查任务状态
-                status = task_data.get("status")
-                
-                if status == "succeeded":
-                    # 任务成功，获取视频URL
-                    video_url = task_data.get("content", {}).get("video_url")
-                    break
-                elif status == "failed":
-                    # 任务失败
-                    error_message = task_data.get("error", {}).get("message", "未知错误")
-                    yield self.create_text_message(f"视频生成任务失败: {error_message}")
-                    return
-                elif status == "canceled":
-                    # 任务被取消
-                    yield self.create_text_message("视频生成任务已被取消")
-                    return
-                
-                # 继续等待
-                yield self.create_text_message(f"视频正在生成中，已等待 {(retry_count + 1) * 5} 秒...")
-                retry_count += 1
+            # 第二步：等待任务完成
+            # 由进程级调度器统一轮询，本调用只等待结果
+            handle = client.watch_task(task_id, model, deadline=max_wait)
+            with trace.stage("task_wait"):
+                # 以本次调用的 max_wait 为界，调度器停滞时也不会无限等待
+                for _ in handle.wait_steps(max_wait, PROGRESS_CHECK_INTERVAL):
+                    yield from progress.update(
+                        task_id, handle.status, handle.poller.elapsed, handle.poller.eta()
+                    )
+            trace.set(polls=handle.poller.polls, progress_messages=progress.sent)
+            task = handle.result()
+            trace.set(
+                status=task.status,
+                outcome="ok" if task.succeeded else (task.status if task.finished else "timeout"),
+            )
             
-            # 检查是否获取到视频URL
-            if video_url:
+            # 检查任务状态
+            if task.status == "failed":
+                yield self.create_text_message(f"视频生成任务失败: {task.error or '未知错误'}")
+            elif task.status == "canceled":
+                yield self.create_text_message("视频生成任务已被取消")
+            elif task.succeeded:
                 yield self.create_text_message("视频生成成功！")
-                yield self.create_text_message(f"视频链接: {video_url}")
-                
-                # 创建带有视频链接的消息
-                video_data = {
-                    "type": "video",
-                    "url": video_url
-                }
-                yield self.create_json_message(video_data)
+                yield from delivery.emit(task_id, task.video_url, task.model)
+            elif not task.finished:
+                yield self.create_text_message(f"等待视频生成超时（{max_wait:.0f} 秒），任务 {task_id} 可能仍在生成中，请稍后再试")
             else:
-                yield self.create_text_message("视频生成超时或失败，请稍后再试")
+                yield self.create_text_message("视频生成失败，未获取到视频链接")
         
+        except VideoTaskError as e:
+            trace.set(outcome="error", error=str(e))
+            yield self.create_text_message(str(e))
         except Exception as e:
             # 处理异常
+            trace.set(outcome="error", error=str(e))
             yield self.create_text_message(f"生成视频时出错: {str(e)}")
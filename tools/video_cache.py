@@ -0,0 +1,246 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from typing import NamedTuple, Optional
+
+import requests
+
+from tools.doubao_app import get_session
+from tools.single_flight import SingleFlight
+
+DEFAULT_VIDEO_CACHE_DIR = os.environ.get(
+    "DOUBAO_VIDEO_CACHE_DIR",
+    os.path.join(tempfile.gettempdir(), "doubao_video_cache"),
+)
+DEFAULT_VIDEO_CACHE_BYTES = int(os.environ.get("DOUBAO_VIDEO_CACHE_BYTES", str(2 * 1024 * 1024 * 1024)))
+DEFAULT_MAX_VIDEO_BYTES = int(os.environ.get("DOUBAO_MAX_VIDEO_BYTES", str(200 * 1024 * 1024)))
+# 下载中断后用 Range 请求续传的次数
+DEFAULT_RESUME_ATTEMPTS = 3
+
+# 视频结果的返回方式：url 仅返回服务端链接；blob 下载后以二进制返回；local 下载到缓存并返回本地路径
+VIDEO_OUTPUT_URL = "url"
+VIDEO_OUTPUT_BLOB = "blob"
+VIDEO_OUTPUT_LOCAL = "local"
+VIDEO_OUTPUTS = (VIDEO_OUTPUT_URL, VIDEO_OUTPUT_BLOB, VIDEO_OUTPUT_LOCAL)
+DEFAULT_VIDEO_OUTPUT = os.environ.get("DOUBAO_VIDEO_OUTPUT", VIDEO_OUTPUT_URL)
+
+_CHUNK_SIZE = 256 * 1024
+
+
+class VideoDownloadError(Exception):
+    pass
+
+
+def _task_key(account: str, task_id: str) -> str:
+    # 任务ID来自外部输入，不直接用作文件名；按账号区分，其他账号无法凭任务ID读取缓存
+    return hashlib.sha256(f"{account}\n{task_id}".encode("utf-8")).hexdigest()[:32]
+
+
+class CachedVideo(NamedTuple):
+    path: str
+    size: int
+    sha256: str
+    mime_type: str
+    cached: bool = False
+
+    def read(self) -> bytes:
+        with open(self.path, "rb") as f:
+            return f.read()
+
+
+class VideoCache:
+    """
+    Local content-addressed store for finished task videos.
+
+    Videos are streamed to disk in fixed-size chunks, so memory use does
+    not grow with the video, and an interrupted transfer resumes with a
+    Range request. Files are named by content hash and indexed by account
+    and task ID, so repeated fetches of a task by the account that owns it
+    are served from disk after its URL has expired, while another account
+    knowing the task ID gets nothing. Concurrent fetches of one task share
+    a single download.
+    """
+
+    def __init__(
+        self,
+        cache_dir: str = DEFAULT_VIDEO_CACHE_DIR,
+        cache_bytes: int = DEFAULT_VIDEO_CACHE_BYTES,
+        max_bytes: int = DEFAULT_MAX_VIDEO_BYTES,
+        timeout: float = 120,
+        resume_attempts: int = DEFAULT_RESUME_ATTEMPTS,
+    ):
+        """
+        Args:
+            cache_dir: Directory for cached videos
+            cache_bytes: Maximum total size of cached videos
+            max_bytes: Largest video accepted
+            timeout: Connect and read timeout in seconds
+            resume_attempts: Range requests made after a broken transfer
+        """
+        self.cache_dir = cache_dir
+        self.cache_bytes = cache_bytes
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+        self.resume_attempts = resume_attempts
+        self._flights = SingleFlight()
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def get(self, account: str, task_id: str) -> Optional[CachedVideo]:
+        """
+        The cached video of a task, if any.
+
+        Args:
+            account: Account the task belongs to (``DoubaoApp.account``)
+            task_id: Task ID
+        """
+        index = self._load_index(account, task_id)
+        if index is None:
+            return None
+        path = self._data_path(index["sha256"])
+        try:
+            os.utime(path)
+        except OSError:
+            # 数据已被淘汰
+            return None
+        return CachedVideo(path, index["size"], index["sha256"], index["mime_type"], cached=True)
+
+    def fetch(self, account: str, task_id: str, url: str) -> CachedVideo:
+        """
+        Return a task's video from the cache, downloading it on a miss.
+
+        Args:
+            account: Account the task belongs to (``DoubaoApp.account``)
+            task_id: Task ID
+            url: Video URL from the account's own task query
+
+        Raises:
+            VideoDownloadError: if the video could not be downloaded
+        """
+        video = self.get(account, task_id)
+        if video is not None:
+            return video
+        key = _task_key(account, task_id)
+        video, _ = self._flights.do(
+            key, lambda: self.get(account, task_id) or self._download(key, url)
+        )
+        return video
+
+    def _download(self, key: str, url: str) -> CachedVideo:
+        part_path = os.path.join(self.cache_dir, f"{key}.{os.getpid()}.part")
+        digest = hashlib.sha256()
+        size = 0
+        mime_type = "video/mp4"
+        try:
+            with open(part_path, "wb") as part:
+                for attempt in range(self.resume_attempts + 1):
+                    headers = {"Range": f"bytes={size}-"} if size else {}
+                    try:
+                        with get_session().get(
+                            url, headers=headers, stream=True, timeout=self.timeout
+                        ) as response:
+                            if size and response.status_code != 206:
+                                # 服务端不支持续传，从头开始
+                                part.seek(0)
+                                part.truncate()
+                                digest, size = hashlib.sha256(), 0
+                            if response.status_code not in (200, 206):
+                                raise VideoDownloadError(
+                                    f"下载视频失败，状态码: {response.status_code}"
+                                )
+                            content_type = response.headers.get("Content-Type", "")
+                            if content_type.startswith("video/"):
+                                mime_type = content_type.split(";")[0]
+                            for chunk in response.iter_content(_CHUNK_SIZE):
+                                size += len(chunk)
+                                if size > self.max_bytes:
+                                    raise VideoDownloadError(
+                                        f"视频超过大小上限 {self.max_bytes/1024/1024:.0f}MB"
+                                    )
+                                digest.update(chunk)
+                                part.write(chunk)
+                        break
+                    except (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError) as e:
+                        if attempt == self.resume_attempts:
+                            raise VideoDownloadError(f"下载视频失败: {str(e)}") from e
+            if size == 0:
+                raise VideoDownloadError("视频数据为空")
+            sha256 = digest.hexdigest()
+            data_path = self._data_path(sha256)
+            os.replace(part_path, data_path)
+        finally:
+            self._remove(part_path)
+
+        self._save_index(key, {"sha256": sha256, "size": size, "mime_type": mime_type})
+        self._evict()
+        return CachedVideo(data_path, size, sha256, mime_type)
+
+    def _data_path(self, sha256: str) -> str:
+        return os.path.join(self.cache_dir, f"{sha256}.mp4")
+
+    def _index_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.task.json")
+
+    def _load_index(self, account: str, task_id: str) -> Optional[dict]:
+        try:
+            with open(self._index_path(_task_key(account, task_id)), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _save_index(self, key: str, index: dict):
+        path = self._index_path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(index, f)
+            os.replace(tmp_path, path)
+        except OSError:
+            self._remove(tmp_path)
+
+    def _evict(self):
+        """Remove least recently used videos until the cache fits its budget"""
+        with self._lock:
+            entries = []
+            total = 0
+            for name in os.listdir(self.cache_dir):
+                if not name.endswith(".mp4"):
+                    continue
+                path = os.path.join(self.cache_dir, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+                total += stat.st_size
+            entries.sort()
+            # 最新写入的视频保留，即使单个文件超出预算
+            for _, size, path in entries[:-1]:
+                if total <= self.cache_bytes:
+                    break
+                # 对应的任务索引在下次读取时发现数据缺失会自动失效
+                self._remove(path)
+                total -= size
+
+    @staticmethod
+    def _remove(path: str):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+_default_video_cache: Optional[VideoCache] = None
+_default_video_cache_lock = threading.Lock()
+
+
+def get_default_video_cache() -> VideoCache:
+    """Return the shared video cache, creating it on first use"""
+    global _default_video_cache
+    if _default_video_cache is None:
+        with _default_video_cache_lock:
+            if _default_video_cache is None:
+                _default_video_cache = VideoCache()
+    return _default_video_cache
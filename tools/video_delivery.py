@@ -0,0 +1,113 @@
+from collections.abc import Generator
+from typing import TYPE_CHECKING, Any, Dict, Optional
+
+from tools.memory_budget import MemoryBudgetTimeout, Reservation, get_memory_budget
+from tools.metrics import Trace
+from tools.video_cache import (
+    VIDEO_OUTPUT_BLOB,
+    VIDEO_OUTPUT_URL,
+    CachedVideo,
+    VideoDownloadError,
+    get_default_video_cache,
+)
+
+if TYPE_CHECKING:
+    from dify_plugin import Tool
+    from dify_plugin.entities.tool import ToolInvokeMessage
+
+    from tools.doubao_app import DoubaoApp
+
+
+class VideoDelivery:
+    """
+    Returns finished task videos in the way a tool call asked for.
+
+    "url" sends the task's link. "local" downloads the video into the shared
+    cache and sends its path; "blob" also sends the file itself. A failed
+    download falls back to the link; a blob that cannot get payload memory
+    falls back to the local path. While a blob is sent it is charged to the
+    invocation's reservation on top of what that already holds. Every
+    outcome ends with the same JSON payload.
+    """
+
+    def __init__(
+        self,
+        tool: "Tool",
+        client: "DoubaoApp",
+        video_output: str,
+        trace: Trace,
+        admission: Optional[Reservation] = None,
+    ):
+        """
+        Args:
+            tool: Tool whose message factories are used
+            client: Client whose account owns the tasks
+            video_output: "url", "blob" or "local"
+            trace: Trace of the invocation
+            admission: The invocation's payload memory; a reservation of
+                its own is used without one
+        """
+        self.tool = tool
+        self.client = client
+        self.video_output = video_output
+        self.trace = trace
+        self.admission = admission if admission is not None else get_memory_budget().reservation()
+
+    def emit(
+        self,
+        task_id: str,
+        url: Optional[str] = None,
+        model: Optional[str] = None,
+        video: Optional[CachedVideo] = None,
+    ) -> Generator["ToolInvokeMessage", None, None]:
+        """
+        Yield the messages for a succeeded task's video.
+
+        Args:
+            task_id: Task ID
+            url: Video URL from the task; may be None when ``video`` is
+                already cached
+            model: Model of the task, if known
+            video: The task's cached video, to skip the download
+        """
+        if video is None and url and self.video_output != VIDEO_OUTPUT_URL:
+            # 链接 24 小时后失效：流式下载到本地缓存，重复获取直接读取磁盘
+            try:
+                with self.trace.stage("video_download"):
+                    video = get_default_video_cache().fetch(self.client.account, task_id, url)
+                self.trace.size("video", video.size)
+            except VideoDownloadError as e:
+                yield self.tool.create_text_message(f"{str(e)}，改为返回视频链接")
+
+        if video is not None and self.video_output == VIDEO_OUTPUT_BLOB:
+            sent = yield from self._emit_blob(video)
+            if sent:
+                return
+
+        result: Dict[str, Any] = {"task_id": task_id, "status": "succeeded", "type": "video"}
+        if model:
+            result["model"] = model
+        if url:
+            result["url"] = url
+        if video is not None:
+            result.update({"path": video.path, "sha256": video.sha256, "size": video.size})
+            yield self.tool.create_text_message(f"视频已保存到本地缓存: {video.path}")
+        else:
+            yield self.tool.create_text_message(f"视频链接: {url}（有效期 24 小时，如需保存请及时下载）")
+        yield self.tool.create_json_message(result)
+
+    def _emit_blob(self, video: CachedVideo) -> Generator["ToolInvokeMessage", None, bool]:
+        """Yield the video file; False when payload memory was not available"""
+        # 整个视频读入内存后发送，发送期间在本次调用已占用的额度之外再占用视频大小的额度
+        held = self.admission.charged
+        try:
+            with self.trace.stage("admission"):
+                self.admission.charge(held + video.size)
+        except MemoryBudgetTimeout as e:
+            yield self.tool.create_text_message(f"{str(e)}，改为返回本地缓存路径")
+            return False
+        try:
+            yield self.tool.create_blob_message(blob=video.read(), meta={"mime_type": video.mime_type})
+        finally:
+            self.admission.charge(held)
+        return True
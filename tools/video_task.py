@@ -0,0 +1,60 @@
+from typing import Any, Dict, NamedTuple, Optional
+
+from tools.task_poller import TERMINAL_STATUSES
+
+TASKS_PATH = "/contents/generations/tasks"
+
+
+class VideoTaskError(Exception):
+    """
+    Raised when the Ark task API rejects a request.
+
+    The message is ready to show to the user; ``status_code`` is None when
+    the response was not an HTTP error (e.g. a missing task ID).
+    """
+
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class VideoTask(NamedTuple):
+    id: str
+    status: Optional[str] = None
+    model: Optional[str] = None
+    video_url: Optional[str] = None
+    # 失败任务的错误信息
+    error: Optional[str] = None
+    raw: Optional[Dict[str, Any]] = None
+
+    @classmethod
+    def from_response(cls, data: Dict[str, Any]) -> "VideoTask":
+        """Build a task from an Ark task object"""
+        error = data.get("error") or None
+        if isinstance(error, dict):
+            error = error.get("message") or "未知错误"
+        return cls(
+            id=data.get("id", ""),
+            status=data.get("status"),
+            model=data.get("model"),
+            video_url=(data.get("content") or {}).get("video_url"),
+            error=error,
+            raw=data,
+        )
+
+    @property
+    def finished(self) -> bool:
+        return self.status in TERMINAL_STATUSES
+
+    @property
+    def succeeded(self) -> bool:
+        return self.status == "succeeded" and bool(self.video_url)
+
+    @property
+    def duration(self) -> Optional[float]:
+        """Seconds from creation to the last update, as reported by the server"""
+        raw = self.raw or {}
+        created, updated = raw.get("created_at"), raw.get("updated_at")
+        if not isinstance(created, (int, float)) or not isinstance(updated, (int, float)):
+            return None
+        return float(updated - created) if updated >= created else None
@@ -0,0 +1,98 @@
+from collections.abc import Generator
+from dify_plugin.entities.tool import ToolInvokeMessage
+from dify_plugin import Tool
+from tools.doubao_app import DEFAULT_BASE_URLS, DoubaoApp
+from tools.metrics import Trace, get_metrics
+from tools.task_poller import DEFAULT_DEADLINE
+from tools.video_cache import DEFAULT_VIDEO_OUTPUT, VIDEO_OUTPUT_URL, VIDEO_OUTPUTS, get_default_video_cache
+from tools.video_delivery import VideoDelivery
+from tools.video_task import VideoTaskError
+
+
+class VideoTaskStatusTool(Tool):
+    def _invoke(
+        self, tool_parameters: dict
+    ) -> Generator[ToolInvokeMessage, None, None]:
+        """
+        Check or collect the result of a video task submitted in submit-only mode
+
+        Parameters:
+            tool_parameters (dict): Dictionary containing:
+                - task_id (str): Task ID returned by text2video/image2video
+                - wait (bool): Keep polling until the task finishes
+                - max_wait (number): Maximum seconds to wait when wait is set
+                - video_output (str): "url", "blob" or "local"
+        """
+        trace = get_metrics().trace("video_task_status")
+        try:
+            yield from self._check(tool_parameters, trace)
+        finally:
+            trace.finish()
+
+    def _check(
+        self, tool_parameters: dict, trace: Trace
+    ) -> Generator[ToolInvokeMessage, None, None]:
+        # 初始化客户端（共享连接池）
+        client = DoubaoApp(
+            api_key=self.runtime.credentials.get("api_key"),
+            base_url=DEFAULT_BASE_URLS,
+        )
+
+        # 获取参数
+        task_id = (tool_parameters.get("task_id") or "").strip()
+        if not task_id:
+            yield self.create_text_message("请输入任务ID")
+            return
+
+        wait = bool(tool_parameters.get("wait", False))
+        max_wait = float(tool_parameters.get("max_wait") or DEFAULT_DEADLINE)
+        video_output = tool_parameters.get("video_output")
+        if video_output not in VIDEO_OUTPUTS:
+            video_output = DEFAULT_VIDEO_OUTPUT
+        delivery = VideoDelivery(self, client, video_output, trace)
+
+        try:
+            # 本账号已缓存的视频直接返回，即使服务端链接已失效
+            video = None
+            if video_output != VIDEO_OUTPUT_URL:
+                video = get_default_video_cache().get(client.account, task_id)
+            if video is not None:
+                yield from delivery.emit(task_id, video=video)
+                return
+
+            task = client.get_task(task_id)
+
+            # 需要等待且任务未结束时，继续轮询
+            if wait and not task.finished:
+                yield self.create_text_message(f"任务 {task_id} 当前状态: {task.status}，等待生成完成...")
+                waited = client.wait_task(task_id, task.model or "", deadline=max_wait)
+                if waited.status is not None:
+                    task = waited
+
+            if task.succeeded:
+                yield self.create_text_message("视频生成成功！")
+                yield from delivery.emit(task_id, task.video_url, task.model)
+                return
+
+            result = {
+                "task_id": task_id,
+                "status": task.status,
+                "model": task.model,
+            }
+            if task.status == "failed":
+                result["error"] = task.error or "未知错误"
+                yield self.create_text_message(f"视频生成任务失败: {result['error']}")
+            elif task.status == "canceled":
+                yield self.create_text_message("视频生成任务已被取消")
+            else:
+                yield self.create_text_message(f"任务 {task_id} 仍在生成中，当前状态: {task.status}")
+
+            yield self.create_json_message(result)
+
+        except VideoTaskError as e:
+            trace.set(outcome="error", error=str(e))
+            yield self.create_text_message(str(e))
+        except Exception as e:
+            # 处理异常
+            trace.set(outcome="error", error=str(e))
+            yield self.create_text_message(f"查询视频生成任务时出错: {str(e)}")